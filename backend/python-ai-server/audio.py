@@ -0,0 +1,125 @@
+"""
+K-MaaS 오디오 디코딩
+- 업로드 바이트를 임시 파일 없이 ffmpeg stdin/stdout 파이프로 디코딩
+- 16kHz mono float32 numpy 버퍼 (Whisper 입력 형식)
+- 포맷 판별(매직 바이트) + 디코딩 전 길이 확인 (MAX_AUDIO_LENGTH)
+"""
+import json
+import logging
+import subprocess
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger("ai-server.audio")
+
+SAMPLE_RATE = 16000
+
+
+class AudioError(ValueError):
+    """디코딩할 수 없는 오디오"""
+
+
+class AudioTooLongError(AudioError):
+    """오디오 길이가 제한을 초과"""
+
+    def __init__(self, duration: float, limit: float):
+        self.duration = duration
+        self.limit = limit
+        super().__init__(f"오디오 길이 {duration:.1f}초가 제한({limit:.0f}초)을 초과했습니다")
+
+
+def sniff_format(data: bytes) -> Optional[str]:
+    """매직 바이트로 오디오 컨테이너 판별 (ffmpeg 입력 포맷명)"""
+    head = data[:16]
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if len(head) > 1 and head[0] == 0xFF and head[1] & 0xF6 == 0xF0:
+        # ADTS AAC: MPEG 오디오와 같은 동기 비트지만 layer 비트가 00
+        return "aac"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0 and head[1] & 0x06):
+        return "mp3"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    return None
+
+
+def _wav_duration(data: bytes) -> Optional[float]:
+    """WAV 헤더에서 길이 계산 (fmt/data 청크 탐색)"""
+    import struct
+
+    pos, byte_rate = 12, None
+    while pos + 8 <= len(data):
+        chunk_id, size = data[pos:pos + 4], struct.unpack("<I", data[pos + 4:pos + 8])[0]
+        if chunk_id == b"fmt " and pos + 20 <= len(data):
+            byte_rate = struct.unpack("<I", data[pos + 16:pos + 20])[0]
+        elif chunk_id == b"data" and byte_rate:
+            # 스트리밍 WAV는 data 크기가 0xFFFFFFFF일 수 있으므로 실제 길이로 제한
+            return min(size, len(data) - pos - 8) / byte_rate
+        pos += 8 + size + (size & 1)
+    return None
+
+
+def probe_duration(data: bytes, fmt: Optional[str] = None) -> Optional[float]:
+    """
+    디코딩 없이 길이(초) 확인
+
+    WAV는 헤더에서 바로 계산하고, 그 외는 ffprobe에 stdin으로 전달해 컨테이너 정보만 읽습니다.
+    """
+    if fmt == "wav":
+        duration = _wav_duration(data)
+        if duration is not None:
+            return duration
+
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json"]
+    if fmt:
+        cmd += ["-f", fmt]
+    cmd += ["-i", "pipe:0"]
+    try:
+        proc = subprocess.run(cmd, input=data, capture_output=True, timeout=30)
+        duration = json.loads(proc.stdout or b"{}").get("format", {}).get("duration")
+        return float(duration) if duration not in (None, "N/A") else None
+    except (OSError, subprocess.TimeoutExpired, ValueError) as e:
+        logger.warning(f"ffprobe 길이 확인 실패: {e}")
+        return None
+
+
+def decode_audio(data: bytes, max_seconds: Optional[float] = None,
+                 sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    오디오 바이트 → mono float32 PCM (-1.0 ~ 1.0)
+
+    max_seconds가 주어지면 디코딩 전에 길이를 확인해 초과 시 AudioTooLongError를 발생시키고,
+    길이를 알 수 없는 스트림도 ffmpeg -t 로 잘라 메모리 사용을 제한합니다.
+    """
+    if not data:
+        raise AudioError("빈 오디오 파일입니다")
+
+    fmt = sniff_format(data)
+    if max_seconds:
+        duration = probe_duration(data, fmt)
+        if duration is not None and duration > max_seconds:
+            raise AudioTooLongError(duration, max_seconds)
+
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0", "-v", "error"]
+    if fmt:
+        cmd += ["-f", fmt]
+    cmd += ["-i", "pipe:0"]
+    if max_seconds:
+        cmd += ["-t", str(max_seconds)]
+    cmd += ["-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "pipe:1"]
+
+    try:
+        proc = subprocess.run(cmd, input=data, capture_output=True, check=True)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg가 설치되어 있지 않습니다") from None
+    except subprocess.CalledProcessError as e:
+        raise AudioError(f"오디오 디코딩 실패: {e.stderr.decode(errors='ignore').strip()}") from None
+
+    return np.frombuffer(proc.stdout, np.int16).astype(np.float32) / 32768.0
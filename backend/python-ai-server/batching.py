@@ -0,0 +1,198 @@
+"""
+K-MaaS 동적 마이크로 배칭 스케줄러
+- 동시에 들어온 추론 요청을 하나의 배치로 묶어 처리
+- 배치가 가득 차거나 최대 대기 시간이 지나면 즉시 실행
+- 배치 결과를 각 요청의 Future로 되돌려 줌
+- 배치를 만들 때 마감 시각이 지난 요청은 제외
+- 실행기가 스케줄러를 쓰면 우선순위 클래스별로 따로 배치를 만들어 클래스 슬롯을 받음
+  (batch 클래스 배치가 슬롯을 기다리는 동안에도 critical 요청은 자기 배치로 먼저 실행)
+"""
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import deadline as request_deadline
+from deadline import Deadline, DeadlineExceeded
+from scheduler import current_priority
+
+logger = logging.getLogger("ai-server.batching")
+
+
+class _PendingItem:
+    """배치 대기 중인 단일 요청"""
+    __slots__ = ("item", "future", "enqueued_at", "deadline")
+
+    def __init__(self, item: Any, future: asyncio.Future, enqueued_at: float,
+                 deadline: Optional[Deadline] = None):
+        self.item = item
+        self.future = future
+        self.enqueued_at = enqueued_at
+        self.deadline = deadline
+
+
+class MicroBatcher:
+    """
+    동시 요청을 모아 batch_fn 한 번으로 처리하는 스케줄러
+
+    batch_fn은 입력 리스트를 받아 같은 길이·같은 순서의 결과 리스트를 반환해야 합니다.
+    블로킹 함수이므로 이벤트 루프가 아닌 executor 스레드에서 실행됩니다.
+    대기열과 동시 배치 수(max_concurrent_batches)는 우선순위 클래스별로 따로 관리합니다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        max_concurrent_batches: int = 1,
+        executor: Optional[Executor] = None,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self.executor = executor
+
+        self._pending: Dict[str, List[_PendingItem]] = {}
+        self._running: Dict[str, int] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        # 통계
+        self._batches = 0
+        self._items = 0
+        self._max_observed_batch = 0
+        self._expired = 0
+
+    async def submit(self, item: Any) -> Any:
+        """단일 입력을 배치 큐에 넣고 결과를 기다림"""
+        (result,) = await self.submit_many([item])
+        return result
+
+    async def submit_many(self, items: Sequence[Any]) -> List[Any]:
+        """여러 입력을 한 번에 큐에 넣고 입력 순서대로 결과를 반환"""
+        if not items:
+            return []
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        deadline = request_deadline.current_deadline.get()
+        priority = current_priority.get()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            self._pending.setdefault(priority, []).append(_PendingItem(item, future, now, deadline))
+            futures.append(future)
+        self._maybe_dispatch()
+        return list(await asyncio.gather(*futures))
+
+    def stats(self) -> dict:
+        """배칭 통계"""
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": sum(len(pending) for pending in self._pending.values()),
+            "running_batches": sum(self._running.values()),
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0,
+            "max_observed_batch": self._max_observed_batch,
+            "expired": self._expired,
+        }
+
+    # ==================== 내부 스케줄링 ====================
+
+    def _maybe_dispatch(self):
+        """배치 조건(가득 참 / 대기 시간 초과)을 만족하면 실행, 아니면 타이머 예약"""
+        loop = asyncio.get_running_loop()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        wake_at = None
+        for priority, pending in self._pending.items():
+            while pending and self._running.get(priority, 0) < self.max_concurrent_batches:
+                full = len(pending) >= self.max_batch_size
+                expired = loop.time() - pending[0].enqueued_at >= self.max_wait
+                if not (full or expired):
+                    at = pending[0].enqueued_at + self.max_wait
+                    wake_at = at if wake_at is None else min(wake_at, at)
+                    break
+                self._dispatch(loop, priority)
+
+        if wake_at is not None:
+            self._timer = loop.call_at(wake_at, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._maybe_dispatch()
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop, priority: str):
+        pending = self._pending[priority]
+        batch = pending[:self.max_batch_size]
+        del pending[:self.max_batch_size]
+
+        self._running[priority] = self._running.get(priority, 0) + 1
+        task = loop.create_task(self._run_batch(priority, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, priority: str, batch: List[_PendingItem]):
+        # 배치는 여러 요청의 것이므로 배치를 만든 요청의 마감을 executor에 넘기지 않음
+        request_deadline.current_deadline.set(None)
+        scheduler = getattr(self.executor, "scheduler", None)
+        try:
+            if scheduler is not None:
+                slot = scheduler.slot(self.executor.name, priority)
+            else:
+                slot = nullcontext()
+            async with slot:
+                # 이미 취소되었거나 (슬롯을 기다리는 동안) 마감이 지난 요청은 배치에서 제외
+                for p in batch:
+                    if p.deadline is not None and p.deadline.expired and not p.future.done():
+                        p.future.set_exception(DeadlineExceeded(p.deadline.reason, self.name))
+                        self._expired += 1
+                batch = [p for p in batch if not p.future.done()]
+                if not batch:
+                    return
+                await self._execute(batch)
+        finally:
+            self._running[priority] -= 1
+            # 배치가 실행되는 동안 쌓인 요청을 이어서 처리
+            self._maybe_dispatch()
+
+    async def _execute(self, batch: List[_PendingItem]):
+        """batch_fn을 executor에서 실행하고 결과를 각 Future로 전달"""
+        items = [p.item for p in batch]
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self.batch_fn, items)
+            results = list(results)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name} 배치 결과 개수 불일치: {len(results)} != {len(items)}"
+                )
+        except Exception as e:
+            logger.warning(f"{self.name} 배치 실패 (size={len(items)}): {e}")
+            for p in batch:
+                if not p.future.done():
+                    p.future.set_exception(e)
+            return
+
+        for p, result in zip(batch, results):
+            if not p.future.done():
+                p.future.set_result(result)
+
+        self._batches += 1
+        self._items += len(items)
+        self._max_observed_batch = max(self._max_observed_batch, len(items))
+        logger.debug(
+            f"{self.name} 배치 처리 - size={len(items)}, "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        )
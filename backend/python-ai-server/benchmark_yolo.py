@@ -0,0 +1,212 @@
+"""
+K-MaaS YOLO 백엔드 벤치마크 (torch / onnx / openvino, FP32 / INT8)
+
+- 지연 시간: 배치 1, 이미지별 추론 p50 / p95 / 평균 (ms)
+- 처리량: --batch 크기 배치 추론 (images/s)
+- 정확도 변화:
+  - 기본: torch 예측을 정답으로 본 mAP@0.5 (백엔드 간 일치도, 라벨 불필요)
+  - --data coco128.yaml 등 지정 시: ultralytics val로 실제 mAP50 / mAP50-95 비교
+
+실행 예:
+    python benchmark_yolo.py --images ./samples --variants torch,onnx,onnx-int8,openvino,openvino-int8
+    python benchmark_yolo.py --data coco128.yaml --json result.json
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from yolo_backend import YoloBackendConfig, load_yolo
+
+
+def parse_variant(name: str) -> YoloBackendConfig:
+    backend, _, quant = name.partition("-")
+    return YoloBackendConfig(backend=backend, int8=quant == "int8")
+
+
+def load_images(directory: Optional[str], limit: int) -> List[Image.Image]:
+    """벤치마크 이미지 (미지정 시 ultralytics 기본 예제 이미지)"""
+    if directory is None:
+        from ultralytics.utils import ASSETS
+        directory = str(ASSETS)
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith((".jpg", ".jpeg", ".png"))
+    )[:limit]
+    if not paths:
+        raise SystemExit(f"이미지가 없습니다: {directory}")
+    return [Image.open(path).convert("RGB") for path in paths]
+
+
+def predictions(model, images: List[Image.Image], imgsz: int) -> List[Dict[str, np.ndarray]]:
+    """이미지별 예측 (boxes xyxy, scores, classes)"""
+    outputs = []
+    for image in images:
+        boxes = model(image, imgsz=imgsz, verbose=False)[0].boxes
+        outputs.append({
+            "boxes": boxes.xyxy.cpu().numpy(),
+            "scores": boxes.conf.cpu().numpy(),
+            "classes": boxes.cls.cpu().numpy().astype(int),
+        })
+    return outputs
+
+
+def iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def agreement_map50(reference: List[Dict], candidate: List[Dict]) -> Optional[float]:
+    """reference(torch) 예측을 정답으로 본 candidate의 mAP@0.5 (클래스별 AP 평균)"""
+    classes = {int(c) for ref in reference for c in ref["classes"]}
+    if not classes:
+        return None
+
+    aps = []
+    for cls in classes:
+        scored = []  # (score, is_true_positive)
+        total = 0
+        for ref, cand in zip(reference, candidate):
+            gt = ref["boxes"][ref["classes"] == cls]
+            total += len(gt)
+            matched = np.zeros(len(gt), dtype=bool)
+            mask = cand["classes"] == cls
+            for i in np.argsort(-cand["scores"][mask]):
+                box = cand["boxes"][mask][i]
+                hit = False
+                if len(gt):
+                    overlaps = iou(box, gt)
+                    best = int(np.argmax(overlaps))
+                    if overlaps[best] >= 0.5 and not matched[best]:
+                        matched[best] = hit = True
+                scored.append((float(cand["scores"][mask][i]), hit))
+
+        scored.sort(key=lambda item: -item[0])
+        hits = np.array([hit for _, hit in scored], dtype=float)
+        if not len(hits):
+            aps.append(0.0)
+            continue
+        tp = np.cumsum(hits)
+        recall = np.concatenate([[0], tp / total, [1]])
+        precision = np.concatenate([[1], tp / np.arange(1, len(hits) + 1), [0]])
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        aps.append(float(np.sum(np.diff(recall) * precision[1:])))
+    return round(float(np.mean(aps)), 4)
+
+
+def benchmark(name: str, images: List[Image.Image], args) -> Dict:
+    config = parse_variant(name)
+    config.model_path = args.model
+    config.imgsz = args.imgsz
+    config.calibration = args.calibration
+    if args.export_dir:
+        config.export_dir = args.export_dir
+
+    load_started = time.perf_counter()
+    model = load_yolo(config)
+    load_s = time.perf_counter() - load_started
+
+    for image in images[:args.warmup]:
+        model(image, imgsz=args.imgsz, verbose=False)
+
+    latencies = []
+    for _ in range(args.runs):
+        for image in images:
+            started = time.perf_counter()
+            model(image, imgsz=args.imgsz, verbose=False)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    batch = (images * (args.batch // len(images) + 1))[:args.batch]
+    started = time.perf_counter()
+    for _ in range(args.runs):
+        model(batch, imgsz=args.imgsz, verbose=False)
+    throughput = args.batch * args.runs / (time.perf_counter() - started)
+
+    result = {
+        "variant": name,
+        "version": config.version,
+        "load_s": round(load_s, 2),
+        "latency_p50_ms": round(statistics.median(latencies), 2),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "latency_mean_ms": round(statistics.fmean(latencies), 2),
+        "throughput_ips": round(throughput, 2),
+        "predictions": predictions(model, images, args.imgsz),
+    }
+    if args.data:
+        metrics = model.val(data=args.data, imgsz=args.imgsz, batch=1, verbose=False, plots=False)
+        result["map50"] = round(float(metrics.box.map50), 4)
+        result["map50_95"] = round(float(metrics.box.map), 4)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO 추론 백엔드 벤치마크")
+    parser.add_argument("--model", default=os.getenv("YOLO_MODEL_PATH") or "yolov8n.pt")
+    parser.add_argument("--variants", default="torch,onnx,onnx-int8,openvino,openvino-int8")
+    parser.add_argument("--images", default=None, help="벤치마크 이미지 디렉터리")
+    parser.add_argument("--limit", type=int, default=32, help="사용할 이미지 수")
+    parser.add_argument("--data", default=None, help="ultralytics 데이터셋 yaml (실제 mAP 측정)")
+    parser.add_argument("--calibration", default=os.getenv("YOLO_CALIBRATION_DATA"),
+                        help="INT8 보정 데이터 (onnx: 이미지 디렉터리, openvino: 데이터셋 yaml)")
+    parser.add_argument("--export-dir", default=os.getenv("YOLO_EXPORT_DIR"))
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None, help="추론 스레드 수 (OMP_NUM_THREADS, torch)")
+    parser.add_argument("--json", default=None, help="결과 저장 경로")
+    args = parser.parse_args()
+
+    if args.threads:
+        os.environ["OMP_NUM_THREADS"] = str(args.threads)
+        import torch
+        torch.set_num_threads(args.threads)
+
+    images = load_images(args.images, args.limit)
+    names = [name.strip() for name in args.variants.split(",") if name.strip()]
+    if "torch" not in names:
+        names.insert(0, "torch")  # 정확도 변화 기준
+
+    results = []
+    for name in names:
+        try:
+            results.append(benchmark(name, images, args))
+        except Exception as e:
+            print(f"[{name}] 실패: {e}")
+
+    reference = next((r for r in results if r["variant"] == "torch"), None)
+    header = f"{'variant':<16}{'p50 ms':>9}{'p95 ms':>9}{'img/s':>9}{'speedup':>9}{'agree mAP50':>13}"
+    if args.data:
+        header += f"{'mAP50':>8}{'mAP50-95':>10}{'Δ mAP':>8}"
+    print(f"\n이미지 {len(images)}장, imgsz={args.imgsz}, batch={args.batch}, runs={args.runs}")
+    print(header)
+    for result in results:
+        if reference is not None:
+            result["speedup"] = round(reference["latency_p50_ms"] / result["latency_p50_ms"], 2)
+            result["agreement_map50"] = agreement_map50(reference["predictions"], result["predictions"])
+        line = (f"{result['variant']:<16}{result['latency_p50_ms']:>9}{result['latency_p95_ms']:>9}"
+                f"{result['throughput_ips']:>9}{result.get('speedup', '-'):>9}{str(result.get('agreement_map50')):>13}")
+        if args.data:
+            drift = round(result["map50_95"] - reference["map50_95"], 4) if reference else "-"
+            result["map_drift"] = drift
+            line += f"{result['map50']:>8}{result['map50_95']:>10}{drift:>8}"
+        print(line)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([{k: v for k, v in r.items() if k != "predictions"} for r in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
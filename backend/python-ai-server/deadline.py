@@ -0,0 +1,202 @@
+"""
+K-MaaS 요청 마감 시각(deadline) 전파 / 조기 취소
+- X-Request-Deadline (Unix epoch ms, 절대 시각) 또는 X-Request-Timeout (ms, 상대 시간) 헤더로 마감 시각 지정
+  (둘 다 있으면 이른 쪽, 없으면 DEFAULT_REQUEST_TIMEOUT_S)
+- 클라이언트 연결이 끊기면 (Spring 타임아웃 등) 같은 요청의 마감도 즉시 만료
+- 모델 실행기/배치 스케줄러는 대기열에서 꺼낼 때 만료된 작업을 실행하지 않고 버림
+- 파이프라인 단계 사이에서 check_deadline()으로 남은 단계(크롭, OCR 등)를 건너뜀
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from typing import List, Optional
+
+logger = logging.getLogger("ai-server.deadline")
+
+
+class DeadlineExceeded(Exception):
+    """요청 마감 시각이 지났거나 클라이언트 연결이 끊겨 처리를 중단함"""
+
+    def __init__(self, reason: str, stage: Optional[str] = None):
+        self.reason = reason
+        self.stage = stage
+        where = f" ({stage} 단계 전)" if stage else ""
+        super().__init__(f"요청 처리 중단{where} - {reason}")
+
+
+class Deadline:
+    """
+    요청 하나의 마감 시각 (time.monotonic 기준)
+
+    - expires_at: None 이면 시간 제한 없음 (연결 끊김만 감지)
+    - cancel(): 클라이언트 연결 끊김 등으로 즉시 만료
+    모델 스레드에서도 읽으므로 상태는 단순 속성 대입으로만 바꿉니다.
+    """
+
+    def __init__(self, expires_at: Optional[float] = None):
+        self.expires_at = expires_at
+        self.cancelled: Optional[str] = None
+
+    @classmethod
+    def after(cls, seconds: Optional[float]) -> "Deadline":
+        return cls(time.monotonic() + seconds if seconds is not None else None)
+
+    def cancel(self, reason: str = "client_disconnected"):
+        self.cancelled = reason
+
+    def remaining(self) -> Optional[float]:
+        """남은 시간 (초, 제한 없으면 None)"""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    @property
+    def reason(self) -> Optional[str]:
+        """만료 사유 (만료되지 않았으면 None)"""
+        if self.cancelled:
+            return self.cancelled
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            return "deadline_exceeded"
+        return None
+
+    @property
+    def expired(self) -> bool:
+        return self.reason is not None
+
+    def check(self, stage: Optional[str] = None):
+        """만료되었으면 DeadlineExceeded"""
+        reason = self.reason
+        if reason is not None:
+            raise DeadlineExceeded(reason, stage)
+
+
+class DeadlineGroup(Deadline):
+    """
+    여러 요청이 공유하는 작업의 마감 (동일 요청 병합)
+
+    기다리는 요청이 하나라도 유효하면 계속 진행: 가장 늦은 마감까지, 모두 끊겨야 취소
+    """
+
+    def __init__(self, members: List[Deadline]):
+        super().__init__()
+        self.members = list(members)
+
+    def join(self, member: Deadline):
+        self.members.append(member)
+
+    def remaining(self) -> Optional[float]:
+        remaining = [m.remaining() for m in self.members if not m.cancelled]
+        if not remaining or None in remaining:
+            return None if remaining else 0.0
+        return max(remaining)
+
+    @property
+    def reason(self) -> Optional[str]:
+        reasons = [m.reason for m in self.members]
+        if reasons and all(reasons):
+            # 한 요청이라도 시간 초과면 시간 초과로, 모두 연결 끊김이면 연결 끊김으로
+            return "deadline_exceeded" if "deadline_exceeded" in reasons else reasons[0]
+        return None
+
+
+# 현재 요청의 마감 (미들웨어에서 설정)
+current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "current_deadline", default=None
+)
+
+
+def check_deadline(stage: Optional[str] = None):
+    """현재 요청이 만료되었으면 DeadlineExceeded (마감이 없는 요청은 통과)"""
+    deadline = current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def parse_deadline(headers, default_timeout: Optional[float] = None) -> Deadline:
+    """
+    요청 헤더 → Deadline
+
+    X-Request-Deadline은 호출 측 벽시계 기준이므로 현재 시각과의 차이만 monotonic으로 옮깁니다.
+    """
+    candidates = []
+    absolute = headers.get("x-request-deadline")
+    if absolute:
+        try:
+            candidates.append(float(absolute) / 1000 - time.time())
+        except ValueError:
+            logger.warning(f"잘못된 X-Request-Deadline 무시: {absolute}")
+    relative = headers.get("x-request-timeout")
+    if relative:
+        try:
+            candidates.append(float(relative) / 1000)
+        except ValueError:
+            logger.warning(f"잘못된 X-Request-Timeout 무시: {relative}")
+    if not candidates and default_timeout:
+        candidates.append(default_timeout)
+    return Deadline.after(min(candidates) if candidates else None)
+
+
+class DeadlineMiddleware:
+    """
+    요청마다 Deadline 설정 + 클라이언트 연결 끊김 감지 (ASGI 미들웨어)
+
+    요청 본문을 다 읽은 뒤에는 감시 태스크가 receive()를 대신 기다리다가
+    http.disconnect가 오면 응답 전이라도 마감을 즉시 만료시킵니다.
+    (본문 수신 중에는 끼어들지 않으므로 업로드 흐름 제어는 그대로)
+    """
+
+    def __init__(self, app, default_timeout: Optional[float] = None):
+        self.app = app
+        self.default_timeout = default_timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        deadline = parse_deadline(headers, self.default_timeout)
+        token = current_deadline.set(deadline)
+
+        watcher: Optional[asyncio.Task] = None
+        response_complete = False
+
+        async def watch():
+            message = await receive()
+            if message["type"] == "http.disconnect" and not response_complete:
+                deadline.cancel("client_disconnected")
+                logger.info(f"클라이언트 연결 끊김 - {scope.get('path')} 처리 중단 요청")
+            return message
+
+        async def wrapped_receive():
+            nonlocal watcher
+            if watcher is not None:
+                # 여러 곳에서 기다리다 취소되어도 감시 태스크는 유지
+                return await asyncio.shield(watcher)
+            message = await receive()
+            if message["type"] == "http.request" and not message.get("more_body", False):
+                watcher = asyncio.create_task(watch())
+            elif message["type"] == "http.disconnect":
+                deadline.cancel("client_disconnected")
+            return message
+
+        async def wrapped_send(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        try:
+            await self.app(scope, wrapped_receive, wrapped_send)
+        finally:
+            if watcher is not None and not watcher.done():
+                watcher.cancel()
+            current_deadline.reset(token)
+
+    @classmethod
+    def default_timeout_from_env(cls) -> Optional[float]:
+        """DEFAULT_REQUEST_TIMEOUT_S (0 = 헤더가 없으면 제한 없음)"""
+        value = float(os.getenv("DEFAULT_REQUEST_TIMEOUT_S", "0"))
+        return value or None
@@ -0,0 +1,213 @@
+"""
+K-MaaS 모델별 추론 실행기 (Bounded Executor)
+- 블로킹 모델 호출을 이벤트 루프 밖의 전용 스레드 풀에서 실행
+- 모델별 동시 실행 수 / 대기열 길이 제한
+- 대기열이 가득 차면 즉시 QueueFullError (429/503으로 변환)
+- 대기열 깊이, 대기 시간 통계 제공
+- 마감 시각이 지난 요청(대기 중 만료, 클라이언트 연결 끊김)은 실행하지 않고 버림
+- 스케줄러가 주어지면 우선순위 클래스별 가중 공정 큐잉으로 실행 순서 결정
+"""
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+import deadline as request_deadline
+from deadline import check_deadline
+
+logger = logging.getLogger("ai-server.executors")
+
+
+class QueueFullError(Exception):
+    """모델 대기열이 가득 차 요청을 받을 수 없음"""
+
+    def __init__(self, model: str, inflight: int, limit: int, retry_after: int = 1):
+        self.model = model
+        self.inflight = inflight
+        self.limit = limit
+        self.retry_after = retry_after
+        super().__init__(f"{model} 대기열 포화 ({inflight}/{limit})")
+
+
+class ModelExecutor(Executor):
+    """
+    모델 전용 스레드 풀
+
+    - max_workers: 동시에 실행되는 모델 호출 수
+    - max_queue: 실행 대기 가능한 요청 수 (초과 시 QueueFullError)
+    - scheduler: 워커 공용 WeightedFairScheduler (있으면 run()이 슬롯을 받은 뒤 실행)
+    """
+
+    # 대기 시간 지수 이동 평균 가중치
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, name: str, max_workers: int = 1, max_queue: int = 16, scheduler=None):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"model-{name}",
+        )
+        self._lock = threading.Lock()
+        self.scheduler = scheduler
+        if scheduler is not None:
+            scheduler.register(name, self.max_workers)
+
+        # 요청 단위 (이벤트 루프에서만 갱신)
+        self._inflight = 0
+        self._rejected = 0
+        self._expired = 0
+
+        # 작업 단위 (스레드에서 갱신 → lock 보호)
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_ewma_ms = 0.0
+        self._wait_max_ms = 0.0
+        self._run_ewma_ms = 0.0
+
+    @classmethod
+    def from_env(cls, name: str, max_workers: int = 1, max_queue: int = 16, scheduler=None) -> "ModelExecutor":
+        """환경 변수 {NAME}_CONCURRENCY / {NAME}_MAX_QUEUE 로 제한값 설정"""
+        prefix = name.upper().replace("-", "_")
+        return cls(
+            name,
+            max_workers=int(os.getenv(f"{prefix}_CONCURRENCY", str(max_workers))),
+            max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", str(max_queue))),
+            scheduler=scheduler,
+        )
+
+    @property
+    def limit(self) -> int:
+        """동시에 받아들일 수 있는 최대 요청 수 (실행 + 대기)"""
+        return self.max_workers + self.max_queue
+
+    # ==================== 요청 수락 제어 ====================
+
+    @asynccontextmanager
+    async def admission(self):
+        """
+        요청 단위 수락 제어
+
+        대기열이 가득 차 있으면 기다리지 않고 QueueFullError를 발생시킵니다.
+        이미 만료된 요청은 자리를 차지하지 않도록 DeadlineExceeded로 거절합니다.
+        배치 스케줄러처럼 실행 단위와 요청 단위가 다른 경로에서 사용합니다.
+        """
+        check_deadline(self.name)
+        if self._inflight >= self.limit:
+            self._rejected += 1
+            raise QueueFullError(self.name, self._inflight, self.limit, self._retry_after())
+        self._inflight += 1
+        try:
+            yield
+        finally:
+            self._inflight -= 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """수락 제어를 거쳐 fn을 모델 스레드 풀에서 실행"""
+        async with self.admission():
+            return await self.execute(fn, *args, **kwargs)
+
+    async def execute(self, fn: Callable[..., Any], *args, priority: Optional[str] = None, **kwargs) -> Any:
+        """
+        스케줄러 슬롯을 받아 fn 실행 (수락 제어 없음)
+
+        priority를 생략하면 현재 요청의 우선순위 클래스를 사용합니다.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        if self.scheduler is None:
+            return await loop.run_in_executor(self, call)
+        async with self.scheduler.slot(self.name, priority):
+            return await loop.run_in_executor(self, call)
+
+    def estimated_wait_ms(self) -> float:
+        """
+        지금 들어오는 요청의 예상 대기 시간 (앞선 요청 수 / 동시 실행 수 × 평균 실행 시간)
+
+        배치로 묶이는 경로에서는 여러 요청이 한 번에 처리되므로 실제보다 크게 잡힙니다 (보수적).
+        """
+        ahead = self._inflight - self.max_workers + 1
+        if ahead <= 0:
+            return 0.0
+        return ahead / self.max_workers * self._run_ewma_ms
+
+    def _retry_after(self) -> int:
+        """대기열이 비워질 때까지 예상 시간 (초)"""
+        estimate_ms = self._run_ewma_ms * self.limit / self.max_workers
+        return max(1, int(estimate_ms / 1000 + 0.999))
+
+    # ==================== Executor 인터페이스 ====================
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        enqueued = time.perf_counter()
+        # run_in_executor는 이벤트 루프 스레드에서 submit을 호출하므로 현재 요청의 마감을 여기서 잡아 둠
+        deadline = request_deadline.current_deadline.get()
+        with self._lock:
+            self._queued += 1
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._record_wait((started - enqueued) * 1000)
+                if deadline is not None and deadline.expired:
+                    # 대기하는 동안 만료된 요청: 기다리는 쪽이 없으므로 모델을 돌리지 않음
+                    self._expired += 1
+                    deadline.check(self.name)
+                self._running += 1
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with self._lock:
+                    self._running -= 1
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+                    self._run_ewma_ms += self.EWMA_ALPHA * (elapsed_ms - self._run_ewma_ms)
+
+        return self._pool.submit(job)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def _record_wait(self, wait_ms: float):
+        self._wait_ewma_ms += self.EWMA_ALPHA * (wait_ms - self._wait_ewma_ms)
+        self._wait_max_ms = max(self._wait_max_ms, wait_ms)
+
+    # ==================== 통계 ====================
+
+    @property
+    def avg_wait_ms(self) -> float:
+        """최근 대기 시간 (지수 이동 평균)"""
+        return self._wait_ewma_ms
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "inflight": self._inflight,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "expired": self._expired,
+                "avg_wait_ms": round(self._wait_ewma_ms, 2),
+                "max_wait_ms": round(self._wait_max_ms, 2),
+                "avg_run_ms": round(self._run_ewma_ms, 2),
+            }
@@ -0,0 +1,237 @@
+"""
+K-MaaS 카메라별 유사 프레임 억제
+- 고정 카메라가 같은 장면을 반복 전송할 때 YOLO + OCR을 건너뜀
+- 축소 그레이스케일 차분 해시(dHash, 64bit)로 직전 처리 프레임과 비교
+- 해밍 거리가 임계값 이하이고 결과가 충분히 최근이면 이전 결과 재사용
+- 직전 프레임 상태 저장소: sqlite (/dev/shm 파일, gunicorn 워커 간 공유) / memory (워커별)
+  → 같은 카메라의 연속 프레임이 다른 워커로 분산되어도 적중
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("ai-server.dedup")
+
+# dHash 크기: (HASH_SIZE + 1) x HASH_SIZE 그레이스케일 → HASH_SIZE² 비트
+HASH_SIZE = 8
+
+
+def dhash(image) -> int:
+    """
+    PIL 이미지의 차분 해시 (64bit)
+
+    인접 픽셀 밝기 차이의 부호만 사용하므로 조명 변화·JPEG 노이즈에 강하고,
+    차량이 들어오거나 나가면 크게 달라집니다.
+    """
+    from PIL import Image
+
+    small = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def frame_hash(contents: bytes) -> int:
+    """
+    JPEG 바이트의 dHash
+
+    draft 모드로 DCT 단계에서 1/8 축소 디코딩하므로 4K 프레임도 원본 디코딩 없이 계산됩니다.
+    """
+    import io
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(contents))
+    image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+    return dhash(image)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+# 직전 프레임 상태: (해시, 결과, 처리 시각)
+Frame = Tuple[int, Dict[str, Any], float]
+
+
+class MemoryFrames:
+    """워커 프로세스 내부 저장소 (카메라 수 상한 LRU)"""
+
+    name = "memory"
+
+    def __init__(self, max_cameras: int):
+        self.max_cameras = max_cameras
+        self._frames: "OrderedDict[str, Frame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Frame]:
+        with self._lock:
+            return self._frames.get(key)
+
+    def set(self, key: str, frame: Frame, max_age: float):
+        with self._lock:
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_cameras:
+                self._frames.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._frames)
+
+
+class SqliteFrames:
+    """
+    SQLite 파일 저장소 (gunicorn 워커 간 공유)
+
+    해시는 64bit 부호 없는 정수이므로 SQLite INTEGER(부호 있는 64bit) 범위로 변환해 저장합니다.
+    """
+
+    name = "sqlite"
+
+    # 몇 번의 쓰기마다 max_age가 지난 카메라 상태 정리
+    PRUNE_EVERY = 256
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS frame_dedup ("
+            " key TEXT PRIMARY KEY,"
+            " hash INTEGER NOT NULL,"
+            " result TEXT NOT NULL,"
+            " processed_at REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # 연결은 스레드(및 fork된 워커)별로 생성
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Frame]:
+        row = self._conn().execute(
+            "SELECT hash, result, processed_at FROM frame_dedup WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0] & 0xFFFFFFFFFFFFFFFF, json.loads(row[1]), row[2]
+
+    def set(self, key: str, frame: Frame, max_age: float):
+        frame_hash, result, processed_at = frame
+        signed = frame_hash - (1 << 64) if frame_hash >= 1 << 63 else frame_hash
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO frame_dedup (key, hash, result, processed_at) VALUES (?, ?, ?, ?)",
+            (key, signed, json.dumps(result, ensure_ascii=False), processed_at),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM frame_dedup WHERE processed_at < ?", (processed_at - max_age,))
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM frame_dedup").fetchone()[0]
+
+
+class FrameDeduplicator:
+    """
+    (카메라 ID, 티어) → (직전 처리 프레임 해시, 결과, 처리 시각)
+
+    - threshold: 같은 프레임으로 볼 최대 해밍 거리 (0~64)
+    - max_age: 이 시간(초)이 지난 결과는 재사용하지 않음 (장면 변화 누락 방지)
+    - backend: sqlite (워커 간 공유, 기본) / memory (워커별)
+    조회/저장은 SQLite I/O이므로 스레드 풀에서 호출합니다. 저장소 오류는 미스로 처리합니다.
+    """
+
+    def __init__(self, threshold: int = 4, max_age: float = 10.0, max_cameras: int = 1024,
+                 backend: str = "sqlite", path: Optional[str] = None):
+        self.threshold = threshold
+        self.max_age = max_age
+        if backend == "sqlite":
+            path = path or os.path.join(
+                "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                "kmaas-result-cache.db",
+            )
+            try:
+                self.store = SqliteFrames(path)
+            except sqlite3.Error as e:
+                logger.warning(f"SQLite 프레임 저장소 초기화 실패 ({path}) - 워커별 메모리로 대체: {e}")
+                self.store = MemoryFrames(max_cameras)
+        elif backend == "memory":
+            self.store = MemoryFrames(max_cameras)
+        else:
+            raise ValueError(f"알 수 없는 프레임 저장소 backend: {backend}")
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> "FrameDeduplicator":
+        # 기본 경로는 결과 캐시와 같은 SQLite 파일 (테이블만 분리)
+        return cls(
+            threshold=int(os.getenv("FRAME_DEDUP_THRESHOLD", "4")),
+            max_age=float(os.getenv("FRAME_DEDUP_MAX_AGE_S", "10")),
+            backend=os.getenv("FRAME_DEDUP_BACKEND", "sqlite"),
+            path=os.getenv("FRAME_DEDUP_PATH") or os.getenv("RESULT_CACHE_PATH") or None,
+        )
+
+    @staticmethod
+    def _key(camera_id: str, tier: Optional[str]) -> str:
+        # 티어마다 모델이 다르므로 다른 티어의 결과는 재사용하지 않음
+        return f"{camera_id}|{tier or ''}"
+
+    def lookup(self, camera_id: str, frame_hash: int, tier: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """직전 프레임과 충분히 비슷하면 이전 결과 반환"""
+        try:
+            last = self.store.get(self._key(camera_id, tier))
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"프레임 상태 조회 실패: {e}")
+            last = None
+        if last is not None:
+            last_hash, result, processed_at = last
+            if (time.time() - processed_at <= self.max_age
+                    and hamming(last_hash, frame_hash) <= self.threshold):
+                self.hits += 1
+                return result
+        self.misses += 1
+        return None
+
+    def remember(self, camera_id: str, frame_hash: int, result: Dict[str, Any], tier: Optional[str] = None):
+        """처리한 프레임의 해시와 결과 저장"""
+        try:
+            self.store.set(self._key(camera_id, tier), (frame_hash, result, time.time()), self.max_age)
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"프레임 상태 저장 실패: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        stats = {
+            "backend": self.store.name,
+            "threshold": self.threshold,
+            "max_age_s": self.max_age,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }
+        try:
+            stats["cameras"] = self.store.size()
+        except sqlite3.Error:
+            pass
+        return stats
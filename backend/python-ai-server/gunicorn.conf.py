@@ -0,0 +1,98 @@
+"""
+K-MaaS AI Server gunicorn 설정
+
+- MODEL_SHARING=preload (기본): 마스터가 앱과 모델 가중치를 한 번 로드한 뒤 fork
+  → 워커들이 가중치 페이지를 copy-on-write로 공유 (워커 수만큼 메모리가 늘지 않음)
+- MODEL_SHARING=worker: 워커마다 각자 모델 로드 (기존 방식)
+- Prometheus 메트릭: 워커별 파일(PROMETHEUS_MULTIPROC_DIR)을 /metrics에서 합산
+- Whisper 프로세스 풀 (/transcribe/long): 마스터가 호스트에 하나 시작, 워커들은 Unix 소켓으로 공유
+  (WHISPER_POOL_SHARED=false 이면 워커마다 자체 풀)
+
+실행: gunicorn main:app -c gunicorn.conf.py
+"""
+import gc
+import logging
+import os
+import secrets
+import shutil
+import subprocess
+import tempfile
+
+logger = logging.getLogger("ai-server.gunicorn")
+
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("WORKERS", "4"))
+# 워커별 CPU 스레드 계획(thread_plan.py)이 같은 워커 수로 코어를 나누도록 전달
+os.environ["WORKERS"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120
+keepalive = 5
+accesslog = "-"
+errorlog = "-"
+
+MODEL_SHARING = os.getenv("MODEL_SHARING", "preload")
+
+# 마스터에서 main 모듈을 import (fork 전 모델 로딩의 전제 조건)
+preload_app = MODEL_SHARING == "preload"
+
+# prometheus_client는 import 시점에 이 값을 읽으므로 앱 import 전에 설정
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/kmaas-prometheus")
+
+# 공유 Whisper 풀 주소 / 인증 키: 앱 import(preload) 전에 설정해 워커가 상속
+WHISPER_POOL_SHARED = os.getenv("WHISPER_POOL_SHARED", "true").lower() == "true"
+if WHISPER_POOL_SHARED:
+    os.environ.setdefault("WHISPER_POOL_SOCKET", os.path.join(tempfile.gettempdir(), f"kmaas-whisper-{os.getpid()}.sock"))
+    os.environ.setdefault("WHISPER_POOL_AUTHKEY", secrets.token_hex(16))
+
+
+def on_starting(server):
+    """마스터 시작: 이전 실행의 메트릭 파일 정리"""
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def when_ready(server):
+    """마스터 준비 완료 (워커 fork 직전): 공유 Whisper 풀 서버 시작 + 공유할 모델 가중치 로드"""
+    if WHISPER_POOL_SHARED:
+        from long_audio import start_pool_server
+        server.whisper_pool = start_pool_server(
+            os.environ["WHISPER_POOL_SOCKET"],
+            os.environ["WHISPER_POOL_AUTHKEY"].encode(),
+            processes=int(os.getenv("WHISPER_PROCESSES", "2")),
+            threads_per_process=int(os.getenv("WHISPER_PROCESS_THREADS", "1")),
+            max_models=int(os.getenv("WHISPER_PROCESS_MAX_MODELS", "1")),
+        )
+        server.log.info(f"Whisper 공유 풀 서버 pid={server.whisper_pool.pid} ({os.environ['WHISPER_POOL_SOCKET']})")
+    if not preload_app:
+        return
+    import main
+    main.preload_shared_models()
+    # 로드된 객체를 GC 추적 대상에서 제외 → 워커의 GC가 페이지를 건드려 복제되는 것을 방지
+    gc.freeze()
+
+
+def on_exit(server):
+    """마스터 종료: 공유 Whisper 풀 서버 종료"""
+    process = getattr(server, "whisper_pool", None)
+    if process is not None and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    address = os.environ.get("WHISPER_POOL_SOCKET")
+    if address and os.path.exists(address):
+        os.unlink(address)
+
+
+def post_worker_init(worker):
+    """워커 시작 직후 메모리 구성 기록 (공유 전/후 비교용)"""
+    from model_registry import process_memory
+    worker.log.info(f"워커 {worker.pid} 시작 - 모드={MODEL_SHARING}, 메모리(MB)={process_memory()}")
+
+
+def child_exit(server, worker):
+    """종료된 워커의 livesum 게이지 파일 정리"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,161 @@
+"""
+K-MaaS 이미지 디코딩
+- JPEG DCT 단계 축소 디코딩(PIL draft)으로 모델 입력 크기 근처까지만 디코딩
+- 원본 해상도 버퍼는 OCR 크롭에 실제로 필요할 때만 디코딩
+- 탐지 좌표 ↔ 원본 좌표 변환
+- 결과 이미지 인코딩 (PNG / WebP) + Accept 헤더 기반 형식 선택
+"""
+import io
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+Box = Tuple[int, int, int, int]
+
+
+class DecodedImage:
+    """
+    축소 디코딩된 이미지
+
+    - image: 모델 입력용 PIL 이미지 (긴 변이 target_size 이상인 가장 작은 1/2^n 스케일)
+    - full_size: 원본 (너비, 높이)
+    - to_full(): 축소 이미지 좌표 → 원본 좌표
+    - crops(): 원본 좌표 박스 크롭 (축소 이미지로 충분하지 않을 때만 원본 디코딩)
+    """
+
+    def __init__(self, contents: bytes, target_size: Optional[int] = 640):
+        self._contents = contents
+        image = Image.open(io.BytesIO(contents))
+        self.format = image.format
+        self.full_size = image.size
+
+        if target_size and image.format == "JPEG":
+            w, h = image.size
+            # YOLO는 긴 변을 target_size로 맞추므로 긴 변 기준으로 요청 크기 계산
+            ratio = target_size / max(w, h)
+            if ratio < 1:
+                image.draft("RGB", (max(1, int(w * ratio)), max(1, int(h * ratio))))
+
+        self.image = image.convert("RGB") if image.mode != "RGB" else image
+        self.image.load()
+        self.scale_x = self.full_size[0] / self.image.width
+        self.scale_y = self.full_size[1] / self.image.height
+
+        self._array: Optional[np.ndarray] = None
+        self._full_array: Optional[np.ndarray] = None
+
+    @property
+    def reduced(self) -> bool:
+        """원본보다 작게 디코딩되었는지"""
+        return self.image.size != self.full_size
+
+    @property
+    def full_decoded(self) -> bool:
+        """원본 해상도 버퍼를 디코딩했는지"""
+        return self._full_array is not None or not self.reduced
+
+    def array(self) -> np.ndarray:
+        """축소 이미지 numpy 버퍼"""
+        if self._array is None:
+            self._array = np.asarray(self.image)
+        return self._array
+
+    def full_array(self) -> np.ndarray:
+        """원본 해상도 numpy 버퍼 (최초 호출 시 디코딩)"""
+        if not self.reduced:
+            return self.array()
+        if self._full_array is None:
+            self._full_array = np.asarray(Image.open(io.BytesIO(self._contents)).convert("RGB"))
+        return self._full_array
+
+    def to_full(self, box: Sequence[float]) -> List[float]:
+        """축소 이미지 좌표 (x1, y1, x2, y2) → 원본 좌표"""
+        x1, y1, x2, y2 = box
+        return [x1 * self.scale_x, y1 * self.scale_y, x2 * self.scale_x, y2 * self.scale_y]
+
+    def crops(self, boxes: Sequence[Box], min_size: Tuple[int, int] = (0, 0)) -> List[np.ndarray]:
+        """
+        원본 좌표 박스들을 크롭
+
+        축소 이미지에서 잘라낸 크롭이 min_size (너비, 높이) 이상이면 축소 버퍼를 쓰고,
+        하나라도 작으면 원본을 디코딩해 원본 해상도로 자릅니다.
+        """
+        min_w, min_h = min_size
+        use_full = self.reduced and any(
+            (x2 - x1) / self.scale_x < min_w or (y2 - y1) / self.scale_y < min_h
+            for x1, y1, x2, y2 in boxes
+        )
+        if use_full or not self.reduced:
+            source = self.full_array()
+            return [source[y1:y2, x1:x2] for x1, y1, x2, y2 in boxes]
+
+        source = self.array()
+        crops = []
+        for x1, y1, x2, y2 in boxes:
+            rx1, ry1 = int(x1 / self.scale_x), int(y1 / self.scale_y)
+            rx2, ry2 = int(x2 / self.scale_x), int(y2 / self.scale_y)
+            crops.append(source[ry1:ry2, rx1:rx2])
+        return crops
+
+
+def decode_image(contents: bytes, target_size: Optional[int] = 640) -> DecodedImage:
+    """업로드 바이트 → 모델 입력 크기 근처로 축소 디코딩된 이미지"""
+    return DecodedImage(contents, target_size)
+
+
+def open_image(contents: bytes) -> Image.Image:
+    """업로드 바이트 → 원본 크기 / 원본 모드 그대로 디코딩 (RGBA 알파·팔레트 투명도 유지 - 배경 제거 입력)"""
+    image = Image.open(io.BytesIO(contents))
+    image.load()
+    return image
+
+
+# ==================== 결과 이미지 인코딩 ====================
+
+IMAGE_MEDIA_TYPES = {"png": "image/png", "webp": "image/webp"}
+
+
+def encode_image(image: Image.Image, fmt: str = "png") -> bytes:
+    """
+    PIL 이미지 → PNG / WebP 바이트
+
+    PNG는 압축 수준을 낮춰(1) 인코딩 시간을 줄이고, WebP는 알파 채널을 보존하는 무손실로 저장합니다.
+    """
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        image.save(buffer, "WEBP", lossless=True, method=0)
+    else:
+        image.save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def negotiate_image_format(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """
+    응답 형식 선택 → "json" / "png" / "webp"
+
+    requested(쿼리 파라미터)가 있으면 우선하고, 없으면 Accept 헤더에서 q 값이 가장 높은
+    지원 형식을 고릅니다. application/json 이 더 높거나 명시가 없으면 기존 JSON(base64) 응답.
+    """
+    if requested:
+        requested = requested.lower()
+        if requested not in ("json", *IMAGE_MEDIA_TYPES):
+            raise ValueError(f"지원하지 않는 형식: {requested}")
+        return requested
+
+    best, best_q = "json", 0.0
+    for part in (accept or "").split(","):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        for fmt, image_type in IMAGE_MEDIA_TYPES.items():
+            if media_type == image_type and q > best_q:
+                best, best_q = fmt, q
+        if media_type == "application/json" and q >= best_q:
+            best, best_q = "json", q
+    return best
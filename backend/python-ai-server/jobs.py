@@ -0,0 +1,516 @@
+"""
+K-MaaS 비동기 작업(Job) 큐
+- 오래 걸리는 요청(캡션, 장시간 음성, 대용량 배경 제거)은 작업으로 접수하고 job_id를 바로 응답
+  → 상태 폴링(GET /api/v1/jobs/{job_id}) 또는 완료 시 콜백 URL로 결과 전달
+- 작업은 SQLite 파일에 저장: 워커가 재시작되어도 남고, gunicorn 워커들이 같은 큐를 나눠 처리
+- 종류별 동시 실행 상한 (워커 전체 기준), 실패 시 지수 백오프 재시도, 끝난 작업은 TTL 후 삭제
+- 실행 중 워커가 죽으면 임대(lease) 만료 후 다시 대기열로
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+import httpx
+
+from deadline import Deadline, current_deadline
+from scheduler import current_priority
+
+logger = logging.getLogger("ai-server.jobs")
+
+# 작업 처리 함수: (입력 바이트, 파라미터) → JSON으로 저장할 결과
+JobHandler = Callable[[bytes, Dict[str, Any]], Awaitable[Any]]
+
+
+class PermanentJobError(Exception):
+    """재시도해도 결과가 같은 오류 (잘못된 입력 등) - 바로 실패 처리"""
+
+
+@dataclass
+class JobKind:
+    name: str
+    handler: JobHandler
+    concurrency: int = 1
+    max_attempts: int = 3
+    timeout_s: Optional[float] = None
+
+
+class JobStore:
+    """
+    작업 테이블 (SQLite, gunicorn 워커 간 공유)
+
+    상태: queued → running → succeeded / failed (대기 중 취소 시 cancelled)
+
+    작업 선점(claim)은 BEGIN IMMEDIATE 트랜잭션 안에서 하므로
+    여러 워커가 같은 작업을 가져가거나 종류별 동시 실행 상한을 넘지 않습니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " payload BLOB,"
+            " params TEXT NOT NULL,"
+            " result TEXT,"
+            " error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL,"
+            " callback_url TEXT,"
+            " callback_status TEXT,"
+            " worker TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " run_after REAL NOT NULL,"
+            " lease_until REAL,"
+            " expires_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, kind, run_after)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs(expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # 연결은 스레드(및 fork된 워커)별로 생성
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def insert(self, job_id: str, kind: str, payload: bytes, params: Dict[str, Any],
+               max_attempts: int, callback_url: Optional[str] = None):
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, status, payload, params, max_attempts, callback_url,"
+            " created_at, updated_at, run_after) VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, payload, json.dumps(params), max_attempts, callback_url, now, now, now),
+        )
+
+    def claim(self, limits: Dict[str, int], worker: str, lease_s: float) -> Optional[sqlite3.Row]:
+        """실행 가능한 가장 오래된 작업 하나를 running으로 바꾸고 반환 (없으면 None)"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._recover_expired_leases(conn, now)
+            running = dict(conn.execute(
+                "SELECT kind, COUNT(*) FROM jobs WHERE status = 'running' GROUP BY kind"
+            ).fetchall())
+            kinds = [kind for kind, limit in limits.items() if running.get(kind, 0) < limit]
+            if not kinds:
+                conn.execute("COMMIT")
+                return None
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ?"
+                f" AND kind IN ({','.join('?' * len(kinds))}) ORDER BY run_after LIMIT 1",
+                (now, *kinds),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?,"
+                " lease_until = ?, updated_at = ? WHERE id = ?",
+                (worker, now + lease_s, now, row["id"]),
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            conn.execute("COMMIT")
+            return job
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _recover_expired_leases(self, conn: sqlite3.Connection, now: float):
+        """임대가 만료된 실행 중 작업 (워커 종료 등) → 재시도 또는 실패"""
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, lease_until = NULL, run_after = ?, updated_at = ?"
+            " WHERE status = 'running' AND lease_until < ? AND attempts < max_attempts",
+            (now, now, now),
+        )
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = '작업 임대 만료 (워커 종료)', payload = NULL,"
+            " lease_until = NULL, updated_at = ?"
+            " WHERE status = 'running' AND lease_until < ?",
+            (now, now),
+        )
+
+    def renew(self, job_id: str, worker: str, lease_s: float):
+        now = time.time()
+        self._conn().execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (now + lease_s, job_id, worker),
+        )
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None,
+               ttl: float = 3600):
+        """성공/실패 기록 (입력 바이트는 더 필요 없으므로 삭제)"""
+        now = time.time()
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, lease_until = NULL,"
+            " updated_at = ?, expires_at = ? WHERE id = ?",
+            (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error,
+             now, now + ttl, job_id),
+        )
+
+    def retry(self, job_id: str, error: str, run_after: float):
+        self._conn().execute(
+            "UPDATE jobs SET status = 'queued', error = ?, worker = NULL, lease_until = NULL,"
+            " run_after = ?, updated_at = ? WHERE id = ?",
+            (error, run_after, time.time(), job_id),
+        )
+
+    def cancel(self, job_id: str, ttl: float) -> bool:
+        """대기 중인 작업만 취소 가능 (실행 중이면 False)"""
+        now = time.time()
+        cursor = self._conn().execute(
+            "UPDATE jobs SET status = 'cancelled', payload = NULL, updated_at = ?, expires_at = ?"
+            " WHERE id = ? AND status = 'queued'",
+            (now, now + ttl, job_id),
+        )
+        return cursor.rowcount > 0
+
+    def set_callback_status(self, job_id: str, status: str):
+        self._conn().execute("UPDATE jobs SET callback_status = ? WHERE id = ?", (status, job_id))
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        return self._conn().execute(
+            "SELECT id, kind, status, params, result, error, attempts, max_attempts, callback_url,"
+            " callback_status, created_at, updated_at, run_after, expires_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+
+    def prune(self) -> int:
+        """TTL이 지난 완료 작업 삭제"""
+        cursor = self._conn().execute("DELETE FROM jobs WHERE expires_at <= ?", (time.time(),))
+        return max(0, cursor.rowcount)
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        counts: Dict[str, Dict[str, int]] = {}
+        for kind, status, count in self._conn().execute(
+            "SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status"
+        ).fetchall():
+            counts.setdefault(kind, {})[status] = count
+        return counts
+
+
+class JobQueue:
+    """
+    작업 접수 + 워커 풀 (gunicorn 워커마다 하나, 저장소는 공유)
+
+    - workers: 이 프로세스에서 작업을 꺼내 실행하는 태스크 수
+    - lease_s: 실행 중 작업 임대 시간 (실행 중에는 주기적으로 연장, 워커가 죽으면 만료 후 재시도)
+    - result_ttl: 끝난 작업(결과)을 보관하는 시간 (초)
+    - retry_backoff_s: 재시도 대기 시간 기준값 (시도마다 2배)
+    - callback_hosts: 콜백을 허용하는 호스트 (내부 서비스만, 외부 주소로의 요청 위조 방지)
+    - priority: 작업이 모델 호출 슬롯을 받을 때 쓰는 스케줄러 우선순위 클래스
+    """
+
+    # 콜백 전송 시도 횟수
+    CALLBACK_ATTEMPTS = 3
+
+    def __init__(self, store: Optional[JobStore], workers: int = 2, poll_interval: float = 0.5,
+                 lease_s: float = 60, result_ttl: float = 3600, retry_backoff_s: float = 5,
+                 callback_hosts: str = "localhost,127.0.0.1,spring-api", priority: str = "batch"):
+        self.store = store
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.lease_s = lease_s
+        self.result_ttl = result_ttl
+        self.retry_backoff_s = retry_backoff_s
+        self.callback_hosts = {host.strip() for host in callback_hosts.split(",") if host.strip()}
+        self.priority = priority
+        self.kinds: Dict[str, JobKind] = {}
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._tasks: List[asyncio.Task] = []
+        self._callback_tasks: Set[asyncio.Task] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # 통계 (워커별)
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.callbacks_failed = 0
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        store = None
+        if os.getenv("JOBS_ENABLED", "true").lower() == "true":
+            path = os.getenv("JOB_DB_PATH") or os.path.join(tempfile.gettempdir(), "kmaas-jobs.db")
+            try:
+                store = JobStore(path)
+            except sqlite3.Error as e:
+                logger.warning(f"작업 저장소 초기화 실패 ({path}) - 작업 API 비활성화: {e}")
+        return cls(
+            store,
+            workers=int(os.getenv("JOB_WORKERS", "2")),
+            poll_interval=float(os.getenv("JOB_POLL_INTERVAL_S", "0.5")),
+            lease_s=float(os.getenv("JOB_LEASE_S", "60")),
+            result_ttl=float(os.getenv("JOB_RESULT_TTL_S", "3600")),
+            retry_backoff_s=float(os.getenv("JOB_RETRY_BACKOFF_S", "5")),
+            callback_hosts=os.getenv("JOB_CALLBACK_HOSTS", "localhost,127.0.0.1,spring-api"),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    def register(self, name: str, handler: JobHandler, concurrency: int = 1, max_attempts: int = 3,
+                 timeout_s: Optional[float] = None):
+        """
+        작업 종류 등록
+
+        concurrency는 워커 전체에서 동시에 실행되는 작업 수 ({NAME}_JOB_CONCURRENCY 로 조정)
+        """
+        env = name.upper().replace("-", "_")
+        self.kinds[name] = JobKind(
+            name, handler,
+            concurrency=max(1, int(os.getenv(f"{env}_JOB_CONCURRENCY", str(concurrency)))),
+            max_attempts=max(1, int(os.getenv(f"{env}_JOB_MAX_ATTEMPTS", str(max_attempts)))),
+            timeout_s=float(os.getenv(f"{env}_JOB_TIMEOUT_S", str(timeout_s or 0))) or None,
+        )
+
+    # ==================== 접수 / 조회 ====================
+
+    def validate_callback(self, url: Optional[str]) -> Optional[str]:
+        """콜백 URL 검증 (http/https + 허용 호스트만, 아니면 ValueError)"""
+        if not url:
+            return None
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or parsed.hostname not in self.callback_hosts:
+            raise ValueError(
+                f"허용되지 않은 콜백 URL입니다 (허용 호스트: {', '.join(sorted(self.callback_hosts))})"
+            )
+        return url
+
+    async def submit(self, kind: str, payload: bytes, params: Dict[str, Any],
+                     callback_url: Optional[str] = None) -> Dict[str, Any]:
+        callback_url = self.validate_callback(callback_url)
+        job_id = uuid.uuid4().hex
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.store.insert, job_id, kind, payload, params, self.kinds[kind].max_attempts, callback_url
+        )
+        self.submitted += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        logger.info(f"작업 접수 - {kind} {job_id} ({len(payload)} bytes)")
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = await asyncio.get_running_loop().run_in_executor(None, self.store.get, job_id)
+        return self._view(row) if row is not None else None
+
+    async def cancel(self, job_id: str) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(None, self.store.cancel, job_id, self.result_ttl)
+
+    @staticmethod
+    def _view(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "params": json.loads(row["params"]),
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "max_attempts": row["max_attempts"],
+            "callback_url": row["callback_url"],
+            "callback_status": row["callback_status"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "expires_at": row["expires_at"],
+        }
+
+    # ==================== 워커 ====================
+
+    def start(self):
+        """워커 태스크 시작 (서버 수명 주기에서 호출)"""
+        if not self.enabled or not self.kinds or self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._janitor()))
+        logger.info(f"작업 워커 시작 - {self.workers}개, 종류: {', '.join(self.kinds)}")
+
+    async def stop(self):
+        """워커 종료 (실행 중이던 작업은 임대 만료 후 다른 워커가 재시도, 보내지 못한 콜백은 폴링으로 조회)"""
+        tasks = self._tasks + list(self._callback_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._callback_tasks.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _worker(self, index: int):
+        loop = asyncio.get_running_loop()
+        limits = {name: kind.concurrency for name, kind in self.kinds.items()}
+        while True:
+            try:
+                job = await loop.run_in_executor(None, self.store.claim, limits, self.worker_id, self.lease_s)
+            except sqlite3.Error as e:
+                logger.warning(f"작업 선점 실패: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 결과 기록 실패 등 - 워커는 계속 실행, 작업은 임대 만료 후 다시 선점됨
+                logger.error(f"작업 처리 중 오류 - {job['kind']} {job['id']}: {e!r}")
+            # 같은 종류의 다음 작업이 상한에 막혀 있던 다른 워커 태스크도 깨움
+            self._wakeup.set()
+
+    async def _run(self, job: sqlite3.Row):
+        loop = asyncio.get_running_loop()
+        kind = self.kinds.get(job["kind"])
+        job_id = job["id"]
+        if kind is None:
+            await loop.run_in_executor(None, functools.partial(
+                self.store.finish, job_id, "failed", error=f"알 수 없는 작업 종류: {job['kind']}", ttl=self.result_ttl
+            ))
+            return
+
+        # 작업은 요청이 아니므로 마감/우선순위를 직접 설정 (모델 호출은 batch 클래스로 스케줄)
+        deadline_token = current_deadline.set(Deadline.after(kind.timeout_s))
+        priority_token = current_priority.set(self.priority)
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        started = time.perf_counter()
+        try:
+            # 마감은 모델 대기열에서만 확인되므로 핸들러 전체에도 제한 시간 적용 (멈춘 작업이 워커를 점유하지 않도록)
+            result = await asyncio.wait_for(kind.handler(job["payload"], json.loads(job["params"])), kind.timeout_s)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                error = f"작업 제한 시간 초과 ({kind.timeout_s:g}s)"
+            else:
+                error = str(e) or type(e).__name__
+            if not isinstance(e, PermanentJobError) and job["attempts"] < job["max_attempts"]:
+                delay = self.retry_backoff_s * 2 ** (job["attempts"] - 1)
+                await loop.run_in_executor(None, self.store.retry, job_id, error, time.time() + delay)
+                self.retried += 1
+                logger.warning(f"작업 실패, {delay:g}초 후 재시도 ({job['attempts']}/{job['max_attempts']})"
+                               f" - {kind.name} {job_id}: {error}")
+                return
+            await loop.run_in_executor(None, functools.partial(
+                self.store.finish, job_id, "failed", error=error, ttl=self.result_ttl
+            ))
+            self.failed += 1
+            logger.error(f"작업 실패 - {kind.name} {job_id}: {error}")
+        else:
+            await loop.run_in_executor(None, functools.partial(
+                self.store.finish, job_id, "succeeded", result=result, ttl=self.result_ttl
+            ))
+            self.succeeded += 1
+            logger.info(f"작업 완료 - {kind.name} {job_id} ({(time.perf_counter() - started) * 1000:.0f}ms)")
+        finally:
+            heartbeat.cancel()
+            current_priority.reset(priority_token)
+            current_deadline.reset(deadline_token)
+
+        if job["callback_url"]:
+            # 콜백 재시도(백오프 대기)가 작업 워커를 붙잡지 않도록 별도 태스크로 전송
+            task = asyncio.create_task(self._send_callback(job_id, job["callback_url"]))
+            self._callback_tasks.add(task)
+            task.add_done_callback(self._callback_tasks.discard)
+
+    async def _heartbeat(self, job_id: str):
+        """실행 중 임대 연장 (임대 시간의 1/3마다)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.lease_s / 3)
+            try:
+                await loop.run_in_executor(None, self.store.renew, job_id, self.worker_id, self.lease_s)
+            except sqlite3.Error as e:
+                logger.warning(f"작업 임대 연장 실패 - {job_id}: {e}")
+
+    async def _send_callback(self, job_id: str, url: str):
+        """완료/실패한 작업 상태를 콜백 URL로 POST (실패 시 백오프 재시도, 폴링으로도 조회 가능)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, connect=3.0))
+        try:
+            job = await self.get(job_id)
+        except sqlite3.Error as e:
+            self.callbacks_failed += 1
+            logger.warning(f"콜백 전송 실패 (작업 조회 오류) - {job_id}: {e}")
+            return
+        status = "failed"
+        for attempt in range(self.CALLBACK_ATTEMPTS):
+            try:
+                response = await self._client.post(url, json=job)
+                if response.status_code < 500:
+                    status = "delivered" if response.is_success else f"rejected_{response.status_code}"
+                    break
+            except httpx.HTTPError as e:
+                logger.warning(f"콜백 전송 실패 ({attempt + 1}/{self.CALLBACK_ATTEMPTS}) - {job_id}: {e}")
+            if attempt + 1 < self.CALLBACK_ATTEMPTS:
+                await asyncio.sleep(self.retry_backoff_s * 2 ** attempt)
+        if status != "delivered":
+            self.callbacks_failed += 1
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.store.set_callback_status, job_id, status)
+        except sqlite3.Error as e:
+            logger.warning(f"콜백 상태 기록 실패 - {job_id} ({status}): {e}")
+
+    async def _janitor(self):
+        """TTL이 지난 작업 정리"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(max(60.0, self.result_ttl / 10))
+            try:
+                removed = await loop.run_in_executor(None, self.store.prune)
+                if removed:
+                    logger.info(f"만료된 작업 {removed}개 삭제")
+            except sqlite3.Error as e:
+                logger.warning(f"작업 정리 실패: {e}")
+
+    # ==================== 통계 ====================
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "enabled": self.enabled,
+            "workers": self.workers if self._tasks else 0,
+            "kinds": {
+                name: {"concurrency": kind.concurrency, "max_attempts": kind.max_attempts,
+                       "timeout_s": kind.timeout_s}
+                for name, kind in self.kinds.items()
+            },
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "callbacks_failed": self.callbacks_failed,
+        }
+        if self.store is not None:
+            try:
+                stats["store"] = {"path": self.store.path, "jobs": self.store.counts()}
+            except sqlite3.Error:
+                pass
+        return stats
@@ -0,0 +1,222 @@
+"""
+K-MaaS 키워드 추출 (코퍼스 TF-IDF / BM25)
+- 토큰 정규식과 불용어 집합은 모듈 로드 시 한 번만 생성
+- 문서 빈도(DF) 색인은 SQLite 파일에 저장: 재시작 후에도 유지, gunicorn 워커 간 공유
+- 요청으로 들어온 문서를 색인에 점진적으로 추가 (같은 내용은 한 번만 집계 - 재시도 중복 방지)
+- 키워드 점수: 문서 내 빈도 × 코퍼스 희소성 (TF-IDF 또는 BM25)
+  → 모든 리뷰에 나오는 흔한 단어보다 이 문서를 특징짓는 단어가 위로
+- 배치: 토큰화 한 번, 색인 갱신 트랜잭션 한 번, DF 조회 한 번으로 여러 문서 처리
+"""
+import hashlib
+import logging
+import math
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Literal, Optional
+
+logger = logging.getLogger("ai-server.keywords")
+
+# 단어 추출 (한글 2자 이상 + 영문 3자 이상)
+TOKEN_PATTERN = re.compile(r'[가-힣]{2,}|[a-zA-Z]{3,}')
+
+# 불용어 (한국어 + 영어)
+STOPWORDS = frozenset({
+    '이', '그', '저', '것', '수', '등', '들', '및', '에', '의', '을', '를',
+    '이다', '하다', '있다', '되다', '않다', '없다', '같다', '보다', '위해',
+    'the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
+    'should', 'may', 'might', 'must', 'can', 'to', 'of', 'in', 'for',
+    'on', 'with', 'at', 'by', 'from', 'as', 'into', 'through', 'during',
+    'and', 'or', 'but', 'if', 'then', 'else', 'when', 'up', 'down', 'out',
+    'it', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'they', 'we'
+})
+
+ScoringMethod = Literal["tfidf", "bm25"]
+
+# BM25 파라미터 (빈도 포화 / 문서 길이 정규화)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# SQLite IN (...) 한 번에 넣는 최대 변수 수
+_LOOKUP_CHUNK = 500
+
+
+def tokenize(text: str) -> List[str]:
+    """소문자 토큰 목록 (불용어 제외, 등장 순서 유지)"""
+    return [word for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+
+class DocumentFrequencyIndex:
+    """
+    단어별 문서 빈도 색인 (SQLite)
+
+    - terms: 단어 → 그 단어가 나온 문서 수
+    - documents: 집계한 문서의 내용 해시 (같은 문서 재전송은 다시 세지 않음)
+    - meta: 전체 문서 수 / 전체 토큰 수 (BM25 평균 문서 길이)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS documents (hash BLOB PRIMARY KEY) WITHOUT ROWID")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('documents', 0), ('tokens', 0)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # 연결은 스레드(및 fork된 워커)별로 생성
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add(self, documents: List[List[str]], hashes: List[bytes]) -> int:
+        """문서(토큰 목록)들을 한 트랜잭션으로 색인에 추가 → 새로 집계된 문서 수"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            df: Counter = Counter()
+            added = tokens = 0
+            for doc_tokens, doc_hash in zip(documents, hashes):
+                if conn.execute("INSERT OR IGNORE INTO documents (hash) VALUES (?)", (doc_hash,)).rowcount == 0:
+                    continue
+                df.update(set(doc_tokens))
+                added += 1
+                tokens += len(doc_tokens)
+            if added:
+                conn.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, ?)"
+                    " ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                    df.items(),
+                )
+                conn.execute("UPDATE meta SET value = value + ? WHERE key = 'documents'", (added,))
+                conn.execute("UPDATE meta SET value = value + ? WHERE key = 'tokens'", (tokens,))
+            conn.execute("COMMIT")
+            return added
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def lookup(self, terms: Iterable[str]) -> Dict[str, int]:
+        """단어별 문서 빈도 (색인에 없으면 생략)"""
+        terms = list(terms)
+        conn = self._conn()
+        found: Dict[str, int] = {}
+        for i in range(0, len(terms), _LOOKUP_CHUNK):
+            chunk = terms[i:i + _LOOKUP_CHUNK]
+            found.update(conn.execute(
+                f"SELECT term, df FROM terms WHERE term IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return found
+
+    def totals(self) -> Dict[str, int]:
+        return dict(self._conn().execute("SELECT key, value FROM meta").fetchall())
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+
+
+class KeywordExtractor:
+    """
+    코퍼스 가중치 키워드 추출
+
+    - index: 문서 빈도 색인 (None 이면 문서 내 빈도만으로 순위 - 기존 방식)
+    - learn: 추출하면서 문서를 색인에 추가할지 (요청별로 끌 수 있음)
+    색인 오류는 경고만 남기고 빈도 기반 결과로 응답합니다.
+    """
+
+    def __init__(self, index: Optional[DocumentFrequencyIndex] = None):
+        self.index = index
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> "KeywordExtractor":
+        index = None
+        if os.getenv("KEYWORD_INDEX_ENABLED", "true").lower() == "true":
+            path = os.getenv("KEYWORD_INDEX_PATH") or os.path.join(tempfile.gettempdir(), "kmaas-keywords.db")
+            try:
+                index = DocumentFrequencyIndex(path)
+            except sqlite3.Error as e:
+                logger.warning(f"키워드 색인 초기화 실패 ({path}) - 문서 내 빈도로만 추출: {e}")
+        return cls(index)
+
+    def extract(self, text: str, top_k: int = 10, method: ScoringMethod = "tfidf",
+                learn: bool = True) -> List[Dict[str, Any]]:
+        return self.extract_batch([text], top_k, method, learn)[0]
+
+    def extract_batch(self, texts: List[str], top_k: int = 10, method: ScoringMethod = "tfidf",
+                      learn: bool = True) -> List[List[Dict[str, Any]]]:
+        """
+        여러 문서 키워드 추출 (문서 순서 유지)
+
+        색인 갱신 후 조회하므로 새 문서도 자기 자신을 포함한 코퍼스 기준으로 점수가 매겨집니다.
+        """
+        documents = [tokenize(text) for text in texts]
+        df: Dict[str, int] = {}
+        totals = {"documents": 0, "tokens": 0}
+        if self.index is not None:
+            try:
+                if learn:
+                    hashes = [hashlib.sha256(text.encode()).digest()[:16] for text in texts]
+                    self.index.add(documents, hashes)
+                df = self.index.lookup({token for doc in documents for token in doc})
+                totals = self.index.totals()
+            except sqlite3.Error as e:
+                self.errors += 1
+                logger.warning(f"키워드 색인 사용 실패 - 문서 내 빈도로 추출: {e}")
+                df, totals = {}, {"documents": 0, "tokens": 0}
+
+        n_docs = totals["documents"]
+        avg_length = totals["tokens"] / n_docs if n_docs else 0.0
+        return [self._rank(doc, df, n_docs, avg_length, top_k, method) for doc in documents]
+
+    @staticmethod
+    def _rank(tokens: List[str], df: Dict[str, int], n_docs: int, avg_length: float, top_k: int,
+              method: ScoringMethod) -> List[Dict[str, Any]]:
+        if not tokens:
+            return []
+        counts = Counter(tokens)
+        length = len(tokens)
+        scored = []
+        for word, count in counts.items():
+            term_df = min(df.get(word, 0), n_docs)
+            if method == "bm25":
+                idf = math.log(1 + (n_docs - term_df + 0.5) / (term_df + 0.5))
+                norm = 1 - BM25_B + BM25_B * (length / avg_length if avg_length else 1)
+                weight = idf * count * (BM25_K1 + 1) / (count + BM25_K1 * norm)
+            else:
+                # 평활 IDF: 색인이 비어 있으면 모든 단어가 같은 IDF → 빈도 순위와 같음
+                idf = math.log((n_docs + 1) / (term_df + 1)) + 1
+                weight = count / length * idf
+            scored.append((weight, word, count, term_df))
+        # 동점은 문서 내 등장 순서 (안정 정렬, Counter 삽입 순서)
+        scored.sort(key=lambda item: -item[0])
+        return [
+            {"word": word, "count": count, "score": round(weight, 6), "df": term_df}
+            for weight, word, count, term_df in scored[:top_k]
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        if self.index is None:
+            return {"enabled": False, "errors": self.errors}
+        try:
+            totals = self.index.totals()
+            return {
+                "enabled": True,
+                "path": self.index.path,
+                "documents": totals["documents"],
+                "terms": self.index.size(),
+                "avg_document_tokens": round(totals["tokens"] / totals["documents"], 2) if totals["documents"] else 0,
+                "errors": self.errors,
+            }
+        except sqlite3.Error as e:
+            return {"enabled": True, "path": self.index.path, "errors": self.errors, "error": str(e)}
@@ -0,0 +1,225 @@
+"""
+K-MaaS 감성 사전 엔진 (Aho-Corasick)
+- 긍정/부정 용어와 가중치를 서버 시작 시 한 번 Aho-Corasick 오토마톤으로 컴파일
+  (요청마다 단어 목록을 만들고 단어별로 부분 문자열을 찾던 O(용어 수 × 텍스트 길이) → O(텍스트 길이))
+- 사전 파일: 한 줄에 "용어<TAB>가중치" (양수 = 긍정, 음수 = 부정, # 주석), 수만 개 용어 가능
+- 겹치는 용어는 가장 긴 것만 인정 ("안 좋아" 가 있으면 그 안의 "좋아"는 세지 않음)
+- 영문 용어는 단어 경계에서만 일치 ("sad" 가 "crusade" 안에서 잡히지 않도록), 한글은 어미가 붙으므로 부분 일치
+- 배치: 컴파일된 오토마톤 하나로 요청의 모든 텍스트를 한 번의 호출에서 채점
+"""
+import logging
+import os
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("ai-server.lexicon")
+
+# 기본 내장 사전 (가중치 ±1)
+DEFAULT_POSITIVE = ['좋아', '훌륭', '최고', '감사', '행복', '사랑',
+                    'good', 'great', 'excellent', 'happy', 'love', 'amazing', 'wonderful']
+DEFAULT_NEGATIVE = ['싫어', '나쁜', '최악', '짜증', '화나', '슬퍼',
+                    'bad', 'terrible', 'awful', 'hate', 'angry', 'sad', 'horrible']
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+class AhoCorasick:
+    """
+    다중 패턴 검색 오토마톤
+
+    상태 전이는 노드별 dict (유니코드 문자 집합이 커서 전체 전이표 대신 실패 링크 사용),
+    출력은 실패 링크를 따라 합쳐 두어 검색 중에는 노드당 한 번만 읽습니다.
+    word_boundary=True 이면 영문/숫자로 시작·끝나는 패턴은 단어 경계에서만 일치합니다.
+    """
+
+    def __init__(self, patterns: Iterable[str], word_boundary: bool = False):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+        self._lengths = [len(pattern) for pattern in self.patterns]
+        self._bounded = [
+            (word_boundary and _is_word_char(pattern[0]), word_boundary and _is_word_char(pattern[-1]))
+            for pattern in self.patterns
+        ]
+
+    def _add(self, pattern: str):
+        node = 0
+        for ch in pattern:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = next_node
+        self._out[node] += (len(self.patterns),)
+        self.patterns.append(pattern)
+
+    def _build(self):
+        """BFS로 실패 링크 계산 + 출력 병합"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    @property
+    def size(self) -> int:
+        return len(self._goto)
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        """
+        (시작, 끝(미포함), 패턴 번호) 목록 - 겹치는 일치도 모두, 끝 위치 순서
+
+        문자마다 실행되는 경로이므로 제너레이터/메서드 호출 없이 한 루프에서 처리합니다.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        lengths, bounded = self._lengths, self._bounded
+        last = len(text) - 1
+        matches = []
+        node = 0
+        for end, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            for pattern_id in out[node]:
+                start = end - lengths[pattern_id] + 1
+                left, right = bounded[pattern_id]
+                if left and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if right and end < last and _is_word_char(text[end + 1]):
+                    continue
+                matches.append((start, end + 1, pattern_id))
+        return matches
+
+
+class SentimentLexicon:
+    """
+    가중치 감성 사전
+
+    - terms: 용어 → 가중치 (양수 = 긍정, 음수 = 부정, 소문자로 정규화)
+    점수 규칙은 기존 키워드 방식과 같음: 일치 없음 → neutral 0.5,
+    긍정 가중치 합이 크면 positive (긍정 / 전체), 아니면 negative (부정 / 전체)
+    """
+
+    def __init__(self, terms: Dict[str, float], sources: Optional[List[str]] = None):
+        self.terms = {term.lower(): weight for term, weight in terms.items() if term and weight}
+        self.sources = sources or []
+        self._automaton = AhoCorasick(self.terms, word_boundary=True)
+        self._weights = [self.terms[term] for term in self._automaton.patterns]
+
+    @classmethod
+    def from_env(cls) -> "SentimentLexicon":
+        """SENTIMENT_LEXICON_PATHS (쉼표 구분 파일) + SENTIMENT_BUILTIN_LEXICON (기본 사전 포함 여부)"""
+        terms: Dict[str, float] = {}
+        sources: List[str] = []
+        if os.getenv("SENTIMENT_BUILTIN_LEXICON", "true").lower() == "true":
+            terms.update({word: 1.0 for word in DEFAULT_POSITIVE})
+            terms.update({word: -1.0 for word in DEFAULT_NEGATIVE})
+            sources.append("builtin")
+        for path in filter(None, (p.strip() for p in os.getenv("SENTIMENT_LEXICON_PATHS", "").split(","))):
+            try:
+                loaded = cls.load_file(path)
+            except OSError as e:
+                logger.warning(f"감성 사전 로드 실패 ({path}): {e}")
+                continue
+            terms.update(loaded)
+            sources.append(path)
+        lexicon = cls(terms, sources)
+        logger.info(f"감성 사전 컴파일 - 용어 {len(lexicon.terms)}개, 노드 {lexicon._automaton.size}개 ({', '.join(sources)})")
+        return lexicon
+
+    @staticmethod
+    def load_file(path: str) -> Dict[str, float]:
+        """
+        "용어<TAB>가중치" 파일 로드 (탭이 없으면 마지막 공백 기준, 가중치 생략 시 잘못된 줄로 무시)
+
+        용어에 공백이 들어갈 수 있어 ("안 좋아") 가중치는 항상 줄의 마지막 필드입니다.
+        """
+        terms: Dict[str, float] = {}
+        skipped = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                term, _, weight = line.rpartition("\t") if "\t" in line else line.rpartition(" ")
+                try:
+                    terms[term.strip()] = float(weight)
+                except ValueError:
+                    skipped += 1
+        if skipped:
+            logger.warning(f"감성 사전 {path}: 잘못된 줄 {skipped}개 무시")
+        return terms
+
+    # ==================== 채점 ====================
+
+    def _result(self, matches: List[Tuple[int, int, int]], text_length: int) -> Dict[str, Any]:
+        # 겹치는 일치는 왼쪽부터 가장 긴 것만
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        positive = negative = 0.0
+        positive_count = negative_count = 0
+        covered = 0
+        for start, end, pattern_id in matches:
+            if start < covered:
+                continue
+            covered = end
+            weight = self._weights[pattern_id]
+            if weight > 0:
+                positive += weight
+                positive_count += 1
+            else:
+                negative -= weight
+                negative_count += 1
+
+        total = positive + negative
+        if total == 0:
+            label, score = "neutral", 0.5
+        elif positive > negative:
+            label, score = "positive", positive / total
+        else:
+            label, score = "negative", negative / total
+        return {
+            "label": label,
+            "score": round(score, 4),
+            "details": {
+                "positive_indicators": positive_count,
+                "negative_indicators": negative_count,
+                "positive_weight": round(positive, 4),
+                "negative_weight": round(negative, 4),
+                "text_length": text_length,
+            },
+        }
+
+    def score(self, text: str) -> Dict[str, Any]:
+        """텍스트 하나 채점 → SentimentResult 형식 dict"""
+        return self._result(self._automaton.find_all(text.lower()), len(text))
+
+    def score_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """여러 텍스트 채점 (스레드 풀에서 한 번에 호출, 텍스트 순서 유지)"""
+        find_all, result = self._automaton.find_all, self._result
+        return [result(find_all(text.lower()), len(text)) for text in texts]
+
+    def stats(self) -> Dict[str, Any]:
+        positive = sum(1 for weight in self.terms.values() if weight > 0)
+        return {
+            "terms": len(self.terms),
+            "positive": positive,
+            "negative": len(self.terms) - positive,
+            "automaton_nodes": self._automaton.size,
+            "sources": self.sources,
+        }
@@ -0,0 +1,163 @@
+"""
+K-MaaS OpenAI 호환 Chat API 클라이언트
+- 앱 전체에서 공유하는 httpx.AsyncClient (keep-alive 연결 풀, HTTP/2)
+- 요청마다 TCP/TLS 연결을 새로 맺지 않음
+- 스트리밍(SSE) 응답을 토큰 단위로 전달
+- OPENAI_BASE_URL로 로컬 OpenAI 호환 서버(테스트용 스텁, vLLM 등) 지정 가능
+"""
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger("ai-server.llm")
+
+
+class ChatAPIError(Exception):
+    """Chat API 호출 실패"""
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ChatClient:
+    """
+    Chat Completions 클라이언트
+
+    - max_connections / max_keepalive: 연결 풀 크기
+    - keepalive_expiry: 유휴 연결 유지 시간 (초)
+    - http2: h2 패키지가 없으면 HTTP/1.1 keep-alive로 동작
+    - transport: httpx 전송 계층 교체 (테스트용 MockTransport 등)
+    - 응답 대기 시간 초과(httpx.TimeoutException)는 ChatAPIError로 변환
+    """
+
+    def __init__(
+        self,
+        base_url: str = "https://api.openai.com/v1",
+        api_key: Optional[str] = None,
+        model: str = "gpt-3.5-turbo",
+        timeout: float = 30.0,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            logger.warning("h2 패키지가 없어 HTTP/1.1 keep-alive로 동작합니다 (pip install httpx[http2])")
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_env(cls) -> "ChatClient":
+        return cls(
+            base_url=os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1",
+            api_key=os.getenv("OPENAI_API_KEY"),
+            model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),
+            timeout=float(os.getenv("OPENAI_TIMEOUT_S", "30")),
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "20")),
+            max_keepalive=int(os.getenv("HTTP_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", "30")),
+            http2=os.getenv("HTTP2_ENABLED", "true").lower() == "true",
+        )
+
+    @property
+    def configured(self) -> bool:
+        """API 키가 설정되어 있는지 (없으면 에코 모드)"""
+        return bool(self.api_key) and self.api_key != "sk-your-openai-api-key-here"
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """공유 클라이언트 (최초 사용 시 생성)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=self.limits,
+                http2=self.http2,
+                transport=self.transport,
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _payload(self, messages: List[Dict[str, str]], stream: bool, **params: Any) -> Dict[str, Any]:
+        payload = {"model": self.model, "messages": messages, **params}
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    @staticmethod
+    def _error_message(body: bytes) -> str:
+        try:
+            return json.loads(body).get("error", {}).get("message", "Unknown error")
+        except (ValueError, AttributeError):
+            return body.decode(errors="ignore")[:200] or "Unknown error"
+
+    async def complete(self, messages: List[Dict[str, str]], **params: Any) -> Dict[str, Any]:
+        """전체 응답을 기다려 반환 (OpenAI 응답 JSON)"""
+        try:
+            response = await self.client.post("/chat/completions", json=self._payload(messages, False, **params))
+        except httpx.TimeoutException as e:
+            raise ChatAPIError(f"OpenAI API 시간 초과: {type(e).__name__}") from e
+        if response.status_code != 200:
+            raise ChatAPIError(f"OpenAI API 오류: {self._error_message(response.content)}")
+        return response.json()
+
+    async def stream(self, messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+        """
+        스트리밍 응답의 토큰(delta content)을 도착하는 대로 반환
+
+        OpenAI SSE 형식: "data: {json}" 줄이 이어지고 "data: [DONE]"으로 끝납니다.
+        """
+        try:
+            async with self.client.stream(
+                "POST", "/chat/completions", json=self._payload(messages, True, **params)
+            ) as response:
+                if response.status_code != 200:
+                    raise ChatAPIError(f"OpenAI API 오류: {self._error_message(await response.aread())}")
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    for choice in chunk.get("choices", []):
+                        content = (choice.get("delta") or {}).get("content")
+                        if content:
+                            yield content
+        except httpx.TimeoutException as e:
+            raise ChatAPIError(f"OpenAI API 시간 초과: {type(e).__name__}") from e
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "model": self.model,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive": self.limits.max_keepalive_connections,
+            "connected": self._client is not None and not self._client.is_closed,
+        }
@@ -0,0 +1,425 @@
+"""
+K-MaaS 장시간 음성 인식
+- 에너지 기반 VAD로 무음 구간에서 분할 (경계에서 단어가 잘리지 않도록)
+- 분할 구간을 프로세스 풀에서 병렬 Whisper 인식 (모델은 요청 tier 기준)
+- gunicorn: 풀은 호스트에 하나 (마스터가 시작한 풀 서버에 워커들이 Unix 소켓으로 요청)
+  → 워커 수만큼 풀 × 모델이 늘지 않음
+- 구간별 타임스탬프를 원본 기준으로 보정해 이어 붙임
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.connection import AuthenticationError, Client, Connection, Listener
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("ai-server.long-audio")
+
+SAMPLE_RATE = 16000
+
+
+# ==================== 에너지 기반 VAD ====================
+
+def frame_energies(samples: np.ndarray, frame_len: int) -> np.ndarray:
+    """프레임별 RMS 에너지"""
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    return np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+
+
+def split_on_silence(
+    samples: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    target_chunk_s: float = 30.0,
+    max_chunk_s: float = 45.0,
+    min_silence_ms: int = 300,
+    frame_ms: int = 30,
+) -> List[Tuple[int, int]]:
+    """
+    무음 경계 기준 분할 → [(시작 샘플, 끝 샘플)]
+
+    - 잡음 바닥(하위 10% 에너지)의 2배(+6dB)보다 낮은 프레임을 무음으로 판단
+      (단, 음성 레벨(상위 10%)의 절반을 넘지 않음)
+    - min_silence_ms 이상 이어진 무음의 가운데를 분할 후보로 사용
+    - 구간 길이가 target_chunk_s를 넘으면 가장 가까운 후보에서 자르고,
+      max_chunk_s까지 후보가 없으면 강제로 자름
+    - 전체가 무음인 구간은 인식 대상에서 제외
+    """
+    frame_len = int(sample_rate * frame_ms / 1000)
+    energies = frame_energies(samples, frame_len)
+    if len(energies) == 0:
+        return [(0, len(samples))] if len(samples) else []
+
+    noise_floor = float(np.percentile(energies, 10))
+    speech_level = float(np.percentile(energies, 90))
+    # 무음 구간이 거의 없는 녹음에서는 음성 레벨의 절반을 상한으로 사용
+    threshold = max(min(noise_floor * 2, speech_level * 0.5), 1e-4)
+    silent = energies < threshold
+
+    # 무음 구간 중앙 → 분할 후보 (샘플 단위)
+    min_run = max(1, min_silence_ms // frame_ms)
+    cut_points = []
+    run_start = None
+    for i, is_silent in enumerate(np.append(silent, False)):
+        if is_silent and run_start is None:
+            run_start = i
+        elif not is_silent and run_start is not None:
+            if i - run_start >= min_run:
+                cut_points.append(((run_start + i) // 2) * frame_len)
+            run_start = None
+
+    target, limit = int(target_chunk_s * sample_rate), int(max_chunk_s * sample_rate)
+    segments = []
+    start, total = 0, len(samples)
+    while start < total:
+        if total - start <= limit:
+            end = total
+        else:
+            candidates = [c for c in cut_points if start + target <= c <= start + limit]
+            earlier = [c for c in cut_points if start < c < start + target]
+            if candidates:
+                end = candidates[0]
+            elif earlier:
+                end = earlier[-1]
+            else:
+                end = start + limit
+        segments.append((start, end))
+        start = end
+
+    # 음성이 전혀 없는 구간 제외
+    def has_speech(seg):
+        first, last = seg[0] // frame_len, max(seg[0] // frame_len + 1, seg[1] // frame_len)
+        return bool((~silent[first:last]).any())
+
+    return [seg for seg in segments if has_speech(seg)]
+
+
+# ==================== 프로세스 풀 Whisper ====================
+
+# 풀 프로세스에 상주하는 모델 (모델명 → 모델, 최근 사용 순)
+_worker_models: "OrderedDict[str, Any]" = OrderedDict()
+_worker_max_models = 1
+
+
+def _init_worker(threads: int, max_models: int):
+    """풀 프로세스 초기화: PyTorch 스레드 수 설정 (모델은 요청된 이름으로 처음 쓸 때 로드)"""
+    global _worker_max_models
+    import torch
+
+    torch.set_num_threads(max(1, threads))
+    _worker_max_models = max(1, max_models)
+
+
+def _worker_model(model_name: str):
+    """요청 tier의 모델 (상주 모델 수 상한을 넘으면 가장 오래 쓰지 않은 모델 해제)"""
+    model = _worker_models.get(model_name)
+    if model is None:
+        import gc
+        import whisper
+
+        while len(_worker_models) >= _worker_max_models:
+            _worker_models.popitem(last=False)
+            gc.collect()
+        model = _worker_models[model_name] = whisper.load_model(model_name)
+    _worker_models.move_to_end(model_name)
+    return model
+
+
+def _transcribe_segment(model_name: str, samples: np.ndarray, language: Optional[str]) -> Dict[str, Any]:
+    result = _worker_model(model_name).transcribe(samples, language=language, fp16=False)
+    return {
+        "text": result["text"].strip(),
+        "language": result.get("language"),
+        "segments": [
+            {"start": s["start"], "end": s["end"], "text": s["text"].strip()}
+            for s in result.get("segments", [])
+        ],
+    }
+
+
+def process_usage(pids: List[int]) -> Dict[str, Any]:
+    """프로세스들의 RSS / 스레드 수 합계 (/proc/<pid>/status 기준)"""
+    rss_kb = threads = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    if key == "VmRSS":
+                        rss_kb += int(value.split()[0])
+                    elif key == "Threads":
+                        threads += int(value)
+        except (OSError, ValueError, IndexError):
+            continue
+    return {"pids": pids, "rss_bytes": rss_kb * 1024, "threads": threads}
+
+
+class WhisperPool:
+    """
+    Whisper 프로세스 풀 (첫 사용 시 시작)
+
+    - processes: 풀 프로세스 수
+    - threads_per_process: 프로세스당 PyTorch 스레드 수 (과다 구독 방지)
+    - max_models: 프로세스당 상주 모델 수 (tier별 모델이 섞이면 초과분은 LRU 해제)
+    """
+
+    def __init__(self, processes: int = 2, threads_per_process: int = 1, max_models: int = 1):
+        self.processes = max(1, processes)
+        self.threads_per_process = threads_per_process
+        self.max_models = max_models
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # 모델/스레드가 이미 올라간 프로세스에서 fork하면 교착될 수 있으므로 spawn 사용
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.threads_per_process, self.max_models),
+                )
+                logger.info(f"Whisper 프로세스 풀 시작 - {self.processes}개 × 스레드 {self.threads_per_process}")
+            return self._pool
+
+    def submit(self, model_name: str, samples: np.ndarray, language: Optional[str]) -> Future:
+        return self._get_pool().submit(_transcribe_segment, model_name, samples, language)
+
+    def pids(self) -> List[int]:
+        pool = self._pool
+        return sorted(getattr(pool, "_processes", None) or {}) if pool is not None else []
+
+    def stats(self) -> Dict[str, Any]:
+        usage = process_usage(self.pids())
+        return {
+            "processes": self.processes,
+            "threads_per_process": self.threads_per_process,
+            "max_models": self.max_models,
+            "started": self._pool is not None,
+            "pids": usage["pids"],
+            "rss_mb": round(usage["rss_bytes"] / (1024 * 1024), 1),
+            "threads": usage["threads"],
+        }
+
+    def resident_bytes(self) -> int:
+        return process_usage(self.pids())["rss_bytes"]
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+# ==================== 호스트 공유 풀 서버 ====================
+
+def serve_pool(address: str, authkey: bytes, processes: int, threads_per_process: int, max_models: int):
+    """
+    호스트 공유 풀 서버 (gunicorn 마스터가 별도 프로세스로 시작)
+
+    gunicorn 워커들이 Unix 소켓으로 구간 인식을 요청 → 워커 수와 관계없이 풀은 호스트에 하나
+    요청: ("transcribe", 모델명, 샘플, 언어) / ("stats",) → 응답: ("ok", 값) / ("error", 메시지)
+    """
+    pool = WhisperPool(processes, threads_per_process, max_models)
+
+    def stop(signum, frame):
+        pool.shutdown()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    if os.path.exists(address):
+        os.unlink(address)
+    with Listener(address, family="AF_UNIX", authkey=authkey) as listener:
+        logger.info(f"Whisper 공유 풀 서버 시작 - {address} (프로세스 {processes}개)")
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, AuthenticationError) as e:
+                logger.warning(f"Whisper 공유 풀 연결 거부: {e}")
+                continue
+            threading.Thread(target=_serve_connection, args=(pool, conn), daemon=True).start()
+
+
+def _serve_connection(pool: WhisperPool, conn: Connection):
+    with conn:
+        try:
+            request = conn.recv()
+            if request[0] == "stats":
+                conn.send(("ok", pool.stats()))
+            else:
+                _, model_name, samples, language = request
+                conn.send(("ok", pool.submit(model_name, samples, language).result()))
+        except (EOFError, OSError):
+            return
+        except Exception as e:
+            try:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+            except OSError:
+                pass
+
+
+def start_pool_server(address: str, authkey: bytes, processes: int, threads_per_process: int,
+                      max_models: int = 1) -> subprocess.Popen:
+    """
+    공유 풀 서버 프로세스 시작 (종료는 호출 측에서 terminate)
+
+    multiprocessing.Process가 아닌 별도 인터프리터로 실행 → gunicorn이 fork한 워커가
+    마스터의 자식 프로세스 목록을 물려받아 종료 시 join을 시도하지 않도록
+    authkey는 명령줄(ps에 노출)이 아닌 환경변수로 전달
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "long_audio", address, str(processes), str(threads_per_process), str(max_models)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "WHISPER_POOL_AUTHKEY": authkey.decode()},
+    )
+    # 워커가 처음 요청하기 전에 소켓이 생기도록 잠시 대기
+    deadline = time.monotonic() + 10
+    while not os.path.exists(address) and process.poll() is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return process
+
+
+class PoolClient:
+    """공유 풀 서버 클라이언트 (요청마다 연결, 블로킹 - 전용 스레드 풀에서 호출)"""
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+
+    def call(self, request: Tuple, timeout: Optional[float] = None) -> Any:
+        with Client(self.address, family="AF_UNIX", authkey=self.authkey) as conn:
+            conn.send(request)
+            if timeout is not None and not conn.poll(timeout):
+                raise TimeoutError(f"Whisper 공유 풀 응답 없음 ({timeout:g}s)")
+            status, value = conn.recv()
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+
+class ParallelTranscriber:
+    """
+    VAD 분할 구간을 프로세스 풀에서 병렬 인식
+
+    - address가 있으면 호스트 공유 풀 서버 사용 (gunicorn), 연결할 수 없으면 이 프로세스의 풀로 대체
+    - address가 없으면 이 프로세스의 풀 사용 (uvicorn 단독 실행)
+    - 구간마다 요청 tier의 모델명을 전달 (풀 프로세스가 모델명별로 로드)
+    """
+
+    def __init__(self, processes: int = 2, threads_per_process: int = 1, max_models: int = 1,
+                 address: Optional[str] = None, authkey: Optional[bytes] = None):
+        self.local = WhisperPool(processes, threads_per_process, max_models)
+        self.client = PoolClient(address, authkey) if address else None
+        self._remote_threads: Optional[ThreadPoolExecutor] = None
+        self._fallback_warned = False
+
+    @property
+    def shared(self) -> bool:
+        return self.client is not None
+
+    async def _run_segment(self, model_name: str, samples: np.ndarray, language: Optional[str]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        if self.client is not None:
+            if self._remote_threads is None:
+                # 응답을 기다리는 동안 블로킹되므로 기본 스레드 풀과 분리 (구간 수만큼 스레드를 점유하지 않도록 풀 크기로)
+                self._remote_threads = ThreadPoolExecutor(self.local.processes, thread_name_prefix="whisper-pool")
+            try:
+                return await loop.run_in_executor(
+                    self._remote_threads, self.client.call, ("transcribe", model_name, samples, language)
+                )
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                if not self._fallback_warned:
+                    self._fallback_warned = True
+                    logger.warning(f"Whisper 공유 풀 연결 실패 - 이 워커의 프로세스 풀 사용: {e}")
+        return await asyncio.wrap_future(self.local.submit(model_name, samples, language))
+
+    async def transcribe(
+        self,
+        samples: np.ndarray,
+        language: Optional[str] = None,
+        model_name: str = "base",
+        sample_rate: int = SAMPLE_RATE,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        구간 인식 결과를 완료되는 순서대로 반환
+
+        각 결과: {index, start, end, text, language, segments(원본 기준 타임스탬프)}
+        """
+        segments = split_on_silence(samples, sample_rate)
+        logger.info(f"장시간 음성 분할 - {len(samples) / sample_rate:.1f}초 → {len(segments)}구간 (모델={model_name})")
+
+        async def run(index: int, start: int, end: int) -> Dict[str, Any]:
+            result = await self._run_segment(model_name, samples[start:end], language)
+            offset = start / sample_rate
+            return {
+                "index": index,
+                "start": round(offset, 2),
+                "end": round(end / sample_rate, 2),
+                "text": result["text"],
+                "language": result["language"],
+                "segments": [
+                    {"start": round(s["start"] + offset, 2), "end": round(s["end"] + offset, 2), "text": s["text"]}
+                    for s in result["segments"]
+                ],
+            }
+
+        tasks = [asyncio.ensure_future(run(i, start, end)) for i, (start, end) in enumerate(segments)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def resident_bytes(self) -> int:
+        """이 프로세스가 소유한 풀 프로세스 RSS (공유 풀은 호스트 단위이므로 워커 모델 예산에서 제외)"""
+        return self.local.resident_bytes()
+
+    def stats(self) -> Dict[str, Any]:
+        """풀 구성 / 프로세스 RSS·스레드 수 (공유 풀은 서버에 조회)"""
+        stats: Dict[str, Any] = {"mode": "shared" if self.shared else "local"}
+        if self.client is not None:
+            stats["address"] = self.client.address
+            try:
+                stats["shared_pool"] = self.client.call(("stats",), timeout=2.0)
+            except (OSError, EOFError, TimeoutError, RuntimeError) as e:
+                stats["error"] = str(e)
+        if not self.shared or self.local.pids():
+            stats["local_pool"] = self.local.stats()
+        return stats
+
+    def shutdown(self):
+        self.local.shutdown()
+        if self._remote_threads is not None:
+            self._remote_threads.shutdown(wait=False, cancel_futures=True)
+            self._remote_threads = None
+
+
+def stitch(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """구간 결과를 시간 순으로 이어 붙임"""
+    ordered = sorted(results, key=lambda r: r["index"])
+    languages = [r["language"] for r in ordered if r.get("language")]
+    return {
+        "text": " ".join(r["text"] for r in ordered if r["text"]),
+        "language": max(set(languages), key=languages.count) if languages else None,
+        "segments": [s for r in ordered for s in r["segments"]],
+    }
+
+
+if __name__ == "__main__":
+    # start_pool_server가 실행: python -m long_audio <소켓> <프로세스 수> <프로세스당 스레드> <최대 모델 수>
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(name)s] %(message)s')
+    serve_pool(sys.argv[1], os.environ["WHISPER_POOL_AUTHKEY"].encode(),
+               int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]))
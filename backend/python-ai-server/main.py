@@ -7,19 +7,52 @@ K-MaaS FastAPI AI Server
 
 Spring Boot와 연동되는 AI 처리 서버
 """
-from fastapi import FastAPI, UploadFile, File, HTTPException, Header
+# CPU 스레드 계획: BLAS/OpenMP 스레드 환경 변수는 numpy/torch import 전에 설정해야 적용됨
+from thread_plan import ThreadPlan
+thread_plan = ThreadPlan.from_env()
+if ThreadPlan.enabled():
+    thread_plan.apply_env()
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from PIL import UnidentifiedImageError
+from typing import Annotated, Dict, List, Optional
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import replace
+import asyncio
+import functools
 import io
 import base64
-import tempfile
 import os
 import time
+import json
 import logging
 import uuid
 
+from batching import MicroBatcher
+from executors import ModelExecutor, QueueFullError
+from model_registry import ModelRegistry, process_memory
+from result_cache import ResultCache
+from frame_dedup import FrameDeduplicator, frame_hash
+from singleflight import CoalesceTimeoutError, SingleFlight
+from deadline import DeadlineExceeded, DeadlineMiddleware, check_deadline
+from scheduler import WeightedFairScheduler, current_priority
+from tiers import Tier, TierPolicy
+from imaging import IMAGE_MEDIA_TYPES, decode_image, encode_image, negotiate_image_format, open_image
+from audio import AudioError, AudioTooLongError, decode_audio
+from long_audio import ParallelTranscriber, stitch
+from jobs import JobQueue, PermanentJobError
+from llm_client import ChatClient
+from lexicon import SentimentLexicon
+from keywords import KeywordExtractor, ScoringMethod
+import metrics
+from metrics import stage
+from profiling import Profiler
+from yolo_backend import YoloBackendConfig, load_yolo
+
 # 로깅 설정
 logging.basicConfig(
     level=logging.INFO,
@@ -27,10 +60,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger("ai-server")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """서버 수명 주기: 시작 시 스레드 계획 적용 + 모델 사전 로딩 + 워밍업"""
+    if ThreadPlan.enabled():
+        # 워밍업(첫 병렬 연산) 전에 적용해야 torch inter-op 스레드 수도 바뀜
+        await run_in_threadpool(thread_plan.apply_runtime)
+    preload_task = asyncio.create_task(preload_models())
+    sampler_task = asyncio.create_task(sample_runtime_metrics())
+    job_queue.start()
+    yield
+    preload_task.cancel()
+    sampler_task.cancel()
+    await job_queue.stop()
+    long_transcriber.shutdown()
+    await chat_client.aclose()
+
+
 app = FastAPI(
     title="K-MaaS AI Server",
     description="번호판 인식, 객체 탐지, 음성 인식 API",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS 설정 (Spring Boot 연동용)
@@ -42,42 +93,404 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 요청 마감 시각 전파: X-Request-Deadline(epoch ms) / X-Request-Timeout(ms) 헤더,
+# 없으면 DEFAULT_REQUEST_TIMEOUT_S. 만료되거나 클라이언트 연결이 끊긴 요청은 대기열·단계 사이에서 중단
+app.add_middleware(DeadlineMiddleware, default_timeout=DeadlineMiddleware.default_timeout_from_env())
+
 # ==================== 모델 관리 ====================
 
-# 모델 로딩 (지연 로딩)
-yolo_model = None
-whisper_model = None
-ocr_reader = None
-
-def get_yolo_model():
-    """YOLO 모델 로드 (싱글톤)"""
-    global yolo_model
-    if yolo_model is None:
-        logger.info("YOLO 모델 로딩 중...")
-        from ultralytics import YOLO
-        yolo_model = YOLO("yolov8n.pt")
-        logger.info("YOLO 모델 로딩 완료")
-    return yolo_model
-
-def get_whisper_model():
-    """Whisper 모델 로드 (싱글톤)"""
-    global whisper_model
-    if whisper_model is None:
-        logger.info("Whisper 모델 로딩 중...")
-        import whisper
-        whisper_model = whisper.load_model("base")
-        logger.info("Whisper 모델 로딩 완료")
-    return whisper_model
+# 모델 레지스트리 (지연 로딩 + 메모리 예산 LRU 해제)
+# MODEL_MEMORY_BUDGET_MB: 상주 모델 크기 합 상한 (0이면 무제한)
+registry = ModelRegistry(memory_budget_mb=int(os.getenv("MODEL_MEMORY_BUDGET_MB", "3072")))
+
+# YOLO 추론 백엔드: YOLO_BACKEND=torch(기본)/onnx/openvino, YOLO_INT8=true 로 INT8 양자화
+# (YOLO_MODEL_PATH가 .onnx / *_openvino_model 이면 해당 백엔드로 바로 로드)
+yolo_backend_config = YoloBackendConfig.from_env()
+
+# 지연 시간 등급(tier)별 변형: YOLO_TIERS / WHISPER_TIERS 로 조정 (standard = 기존 기본 모델)
+YOLO_TIER_MODELS = TierPolicy.parse_variants(os.getenv("YOLO_TIERS", ""), {
+    "fast": yolo_backend_config.model_path,
+    "standard": yolo_backend_config.model_path,
+    "accurate": os.path.join(os.path.dirname(yolo_backend_config.model_path), "yolov8s.pt"),
+})
+WHISPER_TIER_MODELS = TierPolicy.parse_variants(os.getenv("WHISPER_TIERS", ""), {
+    "fast": "tiny",
+    "standard": "base",
+    "accurate": "small",
+})
+# fast tier는 같은 가중치라도 더 작은 입력 크기로 추론 (연산량 ∝ 입력 크기², 640 → 480이면 약 56%)
+# 디코딩은 tier와 관계없이 YOLO_INPUT_SIZE (번호판 크롭을 같은 버퍼에서 잘라내므로)
+YOLO_FAST_INPUT_SIZE = int(os.getenv("YOLO_FAST_INPUT_SIZE", "480"))
+yolo_tier_configs = {
+    tier: replace(yolo_backend_config, model_path=path,
+                  imgsz=YOLO_FAST_INPUT_SIZE if tier == "fast" else yolo_backend_config.imgsz)
+    for tier, path in YOLO_TIER_MODELS.items()
+}
+# 레지스트리 버전 → 추론 입력 크기 (버전 생략 = standard)
+yolo_input_sizes = {config.version: config.imgsz for config in yolo_tier_configs.values()}
+
+def _load_yolo(config=yolo_backend_config):
+    return load_yolo(config)
+
+def _load_whisper(name="base"):
+    import whisper
+    return whisper.load_model(name)
+
+def _load_ocr():
+    import easyocr
+    return easyocr.Reader(['ko', 'en'])
+
+def _load_blip():
+    from transformers import BlipProcessor, BlipForConditionalGeneration
+    processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
+    model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
+    return processor, model
+
+def _load_rembg():
+    from rembg import new_session
+    return new_session("u2net")
+
+# 번호판 인식 경로(YOLO, OCR)는 고정, 나머지 무거운 모델은 LRU 해제 대상
+registry.register("yolo", _load_yolo, version=yolo_backend_config.version, pinned=True)
+registry.register("ocr", _load_ocr, version="easyocr-ko-en", pinned=True)
+registry.register("whisper", functools.partial(_load_whisper, WHISPER_TIER_MODELS["standard"]),
+                  version=WHISPER_TIER_MODELS["standard"])
+registry.register("blip", _load_blip, version="blip-image-captioning-base")
+registry.register("rembg", _load_rembg, version="u2net")
+
+# tier 변형은 기본 버전(standard) 외 추가 버전으로 등록 (강등 대상인 YOLO fast는 해제하지 않음)
+for tier, config in yolo_tier_configs.items():
+    if config.version != yolo_backend_config.version:
+        registry.register("yolo", functools.partial(_load_yolo, config), version=config.version,
+                          pinned=tier == "fast", default=False)
+for name in set(WHISPER_TIER_MODELS.values()) - {WHISPER_TIER_MODELS["standard"]}:
+    registry.register("whisper", functools.partial(_load_whisper, name), version=name, default=False)
+
+def get_yolo_model(version: Optional[str] = None):
+    """YOLO 모델 로드 (레지스트리 캐시, version 생략 시 standard tier)"""
+    return registry.get("yolo", version)
+
+def get_whisper_model(version: Optional[str] = None):
+    """Whisper 모델 로드 (레지스트리 캐시, version 생략 시 standard tier)"""
+    return registry.get("whisper", version)
 
 def get_ocr_reader():
-    """EasyOCR 리더 로드 (싱글톤)"""
-    global ocr_reader
-    if ocr_reader is None:
-        logger.info("OCR 리더 로딩 중...")
-        import easyocr
-        ocr_reader = easyocr.Reader(['ko', 'en'])
-        logger.info("OCR 리더 로딩 완료")
-    return ocr_reader
+    """EasyOCR 리더 로드 (레지스트리 캐시)"""
+    return registry.get("ocr")
+
+def get_blip_model():
+    """BLIP 캡션 모델 로드 (processor, model)"""
+    return registry.get("blip")
+
+def get_rembg_session():
+    """rembg 세션 로드 (요청마다 재생성하지 않음)"""
+    return registry.get("rembg")
+
+
+# ==================== 모델 실행기 (이벤트 루프 분리 + 백프레셔) ====================
+
+# 우선순위 클래스별 가중 공정 큐잉: 번호판(critical)이 캡션/배경 제거(batch) 폭주에 밀리지 않도록
+# SCHEDULER_SLOTS(동시 모델 호출 수) 중 normal/batch 클래스는 상한만큼만 사용 → critical 자리 확보
+cpu_scheduler = WeightedFairScheduler.from_env()
+
+# 모델별 전용 스레드 풀: {NAME}_CONCURRENCY / {NAME}_MAX_QUEUE 로 조정
+yolo_executor = ModelExecutor.from_env("yolo", max_workers=1, max_queue=32, scheduler=cpu_scheduler)
+ocr_executor = ModelExecutor.from_env("ocr", max_workers=1, max_queue=32, scheduler=cpu_scheduler)
+whisper_executor = ModelExecutor.from_env("whisper", max_workers=1, max_queue=4, scheduler=cpu_scheduler)
+rembg_executor = ModelExecutor.from_env("rembg", max_workers=1, max_queue=8, scheduler=cpu_scheduler)
+blip_executor = ModelExecutor.from_env("blip", max_workers=1, max_queue=4, scheduler=cpu_scheduler)
+# 장시간 음성: 실제 인식은 프로세스 풀에서 수행하고, 여기서는 동시 요청 수만 제한
+whisper_long_executor = ModelExecutor.from_env("whisper-long", max_workers=1, max_queue=2)
+
+model_executors = [yolo_executor, ocr_executor, whisper_executor, rembg_executor, blip_executor,
+                   whisper_long_executor]
+
+# 요청 tier 선택 + 부하 시 강등: 실행기 예상 대기 시간이 {NAME}_DEGRADE_WAIT_MS를 넘으면 fast 변형 사용
+yolo_tiers = TierPolicy(
+    "yolo", {tier: config.version for tier, config in yolo_tier_configs.items()}, yolo_executor,
+    degrade_wait_ms=float(os.getenv("YOLO_DEGRADE_WAIT_MS", "150")),
+)
+whisper_tiers = TierPolicy(
+    "whisper", WHISPER_TIER_MODELS, whisper_executor,
+    degrade_wait_ms=float(os.getenv("WHISPER_DEGRADE_WAIT_MS", "3000")),
+)
+# 장시간 음성은 같은 tier 매핑을 프로세스 풀에서 사용 (기본은 강등 안 함 - 대기는 수락 제어가 담당)
+whisper_long_tiers = TierPolicy(
+    "whisper-long", WHISPER_TIER_MODELS, whisper_long_executor,
+    degrade_wait_ms=float(os.getenv("WHISPER_LONG_DEGRADE_WAIT_MS", "0")),
+)
+tier_policies = [yolo_tiers, whisper_tiers, whisper_long_tiers]
+
+# 대기열 포화 시 응답 코드 (429 또는 503)
+OVERLOAD_STATUS_CODE = int(os.getenv("OVERLOAD_STATUS_CODE", "503"))
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request, exc: QueueFullError):
+    """대기열 포화 → 즉시 거절 (Retry-After 포함)"""
+    logger.warning(f"요청 거절 - {exc}")
+    request.state.error_type = type(exc).__name__
+    return JSONResponse(
+        status_code=OVERLOAD_STATUS_CODE,
+        content={"detail": str(exc), "model": exc.model},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(CoalesceTimeoutError)
+async def coalesce_timeout_handler(request, exc: CoalesceTimeoutError):
+    """병합된 요청 대기 시간 초과 → 504"""
+    logger.warning(f"동일 요청 대기 시간 초과 - {exc.key}")
+    request.state.error_type = type(exc).__name__
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request, exc: DeadlineExceeded):
+    """마감 초과 → 504, 클라이언트 연결 끊김 → 499 (응답은 전달되지 않고 메트릭/로그용)"""
+    logger.warning(f"요청 처리 중단 - {request.url.path}: {exc}")
+    request.state.error_type = f"{type(exc).__name__}:{exc.reason}"
+    status_code = 499 if exc.reason == "client_disconnected" else 504
+    return JSONResponse(status_code=status_code, content={"detail": str(exc), "reason": exc.reason})
+
+
+# ==================== 추론 스케줄러 (마이크로 배칭) ====================
+
+# 동시 요청을 모아 한 번의 YOLO forward로 처리
+YOLO_BATCH_SIZE = int(os.getenv("YOLO_BATCH_SIZE", "8"))
+YOLO_BATCH_WAIT_MS = float(os.getenv("YOLO_BATCH_WAIT_MS", "5"))
+
+def run_yolo_batch(items):
+    """YOLO 배치 추론 ((버전, 이미지) 리스트 → 이미지별 Results 리스트, tier 변형별로 나눠 실행)"""
+    results = [None] * len(items)
+    by_version: Dict[Optional[str], List[int]] = {}
+    for index, (version, _) in enumerate(items):
+        by_version.setdefault(version, []).append(index)
+    for version, indices in by_version.items():
+        imgsz = yolo_input_sizes.get(version, yolo_backend_config.imgsz)
+        outputs = get_yolo_model(version)([items[i][1] for i in indices], imgsz=imgsz)
+        for index, output in zip(indices, outputs):
+            results[index] = output
+    return results
+
+yolo_batcher = MicroBatcher(
+    "yolo",
+    run_yolo_batch,
+    max_batch_size=YOLO_BATCH_SIZE,
+    max_wait_ms=YOLO_BATCH_WAIT_MS,
+    max_concurrent_batches=yolo_executor.max_workers,
+    executor=yolo_executor,
+)
+
+async def run_yolo(image, version: Optional[str] = None):
+    """YOLO 추론 (수락 제어 → 마이크로 배칭, version: tier 변형)"""
+    async with yolo_executor.admission():
+        return await yolo_batcher.submit((version, image))
+
+
+# 번호판 크롭들을 모아 한 번의 EasyOCR 배치 호출로 인식
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "16"))
+OCR_BATCH_WAIT_MS = float(os.getenv("OCR_BATCH_WAIT_MS", "5"))
+# 배치 OCR 입력 크기 (너비, 높이) - 번호판 비율에 맞춘 고정 캔버스
+OCR_CROP_SIZE = (480, 160)
+# 축소 디코딩 크롭의 번호판 높이가 이 값(픽셀) 미만일 때만 원본 해상도로 다시 디코딩
+# (캔버스 크기까지는 fit_plate_crop에서 확대 - EasyOCR 인식기 입력 높이는 64px)
+OCR_MIN_PLATE_HEIGHT = int(os.getenv("OCR_MIN_PLATE_HEIGHT", "32"))
+
+def fit_plate_crop(region, size=OCR_CROP_SIZE):
+    """번호판 크롭을 비율을 유지한 채 고정 크기 캔버스에 배치 (가장자리 픽셀로 패딩)"""
+    from PIL import Image
+    import numpy as np
+
+    target_w, target_h = size
+    h, w = region.shape[:2]
+    scale = min(target_w / w, target_h / h)
+    new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+    resized = np.array(Image.fromarray(region).resize((new_w, new_h), Image.BILINEAR))
+
+    pad_y, pad_x = target_h - new_h, target_w - new_w
+    pad = [(pad_y // 2, pad_y - pad_y // 2), (pad_x // 2, pad_x - pad_x // 2)]
+    pad += [(0, 0)] * (resized.ndim - 2)
+    return np.pad(resized, pad, mode="edge")
+
+def run_ocr_batch(regions):
+    """EasyOCR 배치 인식 (크롭 리스트 → 크롭별 readtext 결과 리스트)"""
+    crops = [fit_plate_crop(region) for region in regions]
+    return get_ocr_reader().readtext_batched(crops, batch_size=len(crops))
+
+ocr_batcher = MicroBatcher(
+    "ocr",
+    run_ocr_batch,
+    max_batch_size=OCR_BATCH_SIZE,
+    max_wait_ms=OCR_BATCH_WAIT_MS,
+    max_concurrent_batches=ocr_executor.max_workers,
+    executor=ocr_executor,
+)
+
+async def run_ocr(regions):
+    """번호판 크롭 OCR (수락 제어 → 이미지 간 마이크로 배칭)"""
+    async with ocr_executor.admission():
+        return await ocr_batcher.submit_many(regions)
+
+
+# ==================== 모델 사전 로딩 / 워밍업 ====================
+
+# 시작 시 미리 로드할 모델 (쉼표 구분: yolo,ocr,whisper)
+PRELOAD_MODELS = [m.strip() for m in os.getenv("PRELOAD_MODELS", "yolo,ocr").split(",") if m.strip()]
+# 로드 후 합성 입력으로 1회 추론해 커널/메모리 할당을 미리 끝냄
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"
+
+def warmup_yolo():
+    """640x640 검은 이미지로 YOLO 워밍업 (부하 시 강등 대상인 fast 변형 포함)"""
+    import numpy as np
+    image = np.zeros((640, 640, 3), dtype=np.uint8)
+    for version in dict.fromkeys([yolo_tiers.variants["standard"], yolo_tiers.variants["fast"]]):
+        get_yolo_model(version)(image, imgsz=yolo_input_sizes[version])
+
+def warmup_ocr():
+    """빈 번호판 크롭으로 배치 OCR 경로 워밍업"""
+    import numpy as np
+    run_ocr_batch([np.full((40, 160, 3), 255, dtype=np.uint8)])
+
+def warmup_whisper():
+    """1초 무음으로 Whisper 워밍업"""
+    import numpy as np
+    get_whisper_model().transcribe(np.zeros(16000, dtype=np.float32))
+
+# 모델명 → (로더, 워밍업 함수, 실행기)
+PRELOADERS = {
+    "yolo": (get_yolo_model, warmup_yolo, yolo_executor),
+    "ocr": (get_ocr_reader, warmup_ocr, ocr_executor),
+    "whisper": (get_whisper_model, warmup_whisper, whisper_executor),
+}
+
+async def preload_models():
+    """설정된 모델을 순서대로 로드·워밍업 (실패해도 서버는 계속 동작)"""
+    for name in PRELOAD_MODELS:
+        if name not in PRELOADERS:
+            logger.warning(f"알 수 없는 사전 로딩 모델: {name}")
+            continue
+        loader, warmup, executor = PRELOADERS[name]
+        loop = asyncio.get_running_loop()
+        # 사전 로딩 모델은 항상 상주해야 하므로 LRU 해제 대상에서 제외
+        registry.pin(name)
+        try:
+            await loop.run_in_executor(executor, loader)
+            warmup_time_ms = None
+            if MODEL_WARMUP:
+                started = time.perf_counter()
+                await loop.run_in_executor(executor, warmup)
+                warmup_time_ms = int((time.perf_counter() - started) * 1000)
+            registry.mark_ready(name, warmup_time_ms)
+            logger.info(f"{name} 사전 로딩 완료 - {registry.entry(name).to_dict()}")
+        except Exception as e:
+            registry.mark_failed(name, str(e))
+            logger.error(f"{name} 사전 로딩 실패: {e}")
+
+# ==================== 워커 간 모델 가중치 공유 ====================
+
+# preload: gunicorn 마스터에서 fork 전에 로드 → 워커가 copy-on-write로 공유
+# worker: 워커마다 각자 로드 (기존 방식)
+MODEL_SHARING = os.getenv("MODEL_SHARING", "preload")
+
+def preload_shared_models():
+    """
+    gunicorn 마스터에서 fork 전에 호출 (gunicorn.conf.py의 when_ready)
+
+    가중치만 로드하고 워밍업 추론은 하지 않습니다. 마스터에서 추론을 돌리면
+    PyTorch/OpenMP 스레드 풀이 만들어져 fork된 워커에서 교착될 수 있기 때문입니다.
+    워밍업은 각 워커의 lifespan preload_models()에서 수행됩니다.
+    """
+    started = time.perf_counter()
+    for name in PRELOAD_MODELS:
+        if name not in PRELOADERS:
+            continue
+        registry.pin(name)
+        try:
+            PRELOADERS[name][0]()
+        except Exception as e:
+            logger.error(f"{name} 공유 로딩 실패 (워커에서 재시도): {e}")
+    logger.info(
+        f"공유 모델 로딩 완료 - {int((time.perf_counter() - started) * 1000)}ms, "
+        f"마스터 메모리 {process_memory()}"
+    )
+
+
+# ==================== 업로드 / 디코딩 ====================
+
+# 이미지 업로드 최대 크기 (바이트, compose의 MAX_IMAGE_SIZE)
+MAX_IMAGE_SIZE = int(os.getenv("MAX_IMAGE_SIZE") or 10 * 1024 * 1024)
+# YOLO 입력 크기: 이 크기 근처까지만 JPEG 축소 디코딩
+YOLO_INPUT_SIZE = 640
+BLIP_INPUT_SIZE = 384
+
+async def read_image_upload(file: UploadFile) -> bytes:
+    """이미지 업로드 읽기 (MAX_IMAGE_SIZE 초과 시 413)"""
+    with stage("upload_read"):
+        contents = await file.read(MAX_IMAGE_SIZE + 1)
+    if len(contents) > MAX_IMAGE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"이미지 크기가 제한({MAX_IMAGE_SIZE} bytes)을 초과했습니다"
+        )
+    return contents
+
+async def read_audio_upload(file: UploadFile, limit: int) -> bytes:
+    """음성 업로드 읽기 (limit 바이트 초과 시 413)"""
+    with stage("upload_read"):
+        contents = await file.read(limit + 1)
+    if len(contents) > limit:
+        raise HTTPException(
+            status_code=413,
+            detail=f"음성 파일 크기가 제한({limit} bytes)을 초과했습니다"
+        )
+    return contents
+
+# 음성 최대 길이 (초, compose의 MAX_AUDIO_LENGTH) - 초과 시 디코딩 전에 413
+MAX_AUDIO_LENGTH = float(os.getenv("MAX_AUDIO_LENGTH") or 300)
+# 음성 업로드 최대 크기 (바이트) - 기본은 MAX_AUDIO_LENGTH 초 분량의 48kHz 16bit 스테레오 PCM (가장 큰 일반 포맷)
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES") or MAX_AUDIO_LENGTH * 48000 * 2 * 2)
+
+# 장시간 음성 (/transcribe/long) - 무음 경계로 분할 후 프로세스 풀에서 병렬 인식
+MAX_LONG_AUDIO_LENGTH = float(os.getenv("MAX_LONG_AUDIO_LENGTH") or 3600)
+# 장시간 음성 업로드 최대 크기 (바이트) - 길이 확인은 읽은 뒤에야 가능하므로 메모리 상한은 크기로
+MAX_LONG_AUDIO_BYTES = int(os.getenv("MAX_LONG_AUDIO_BYTES") or 200 * 1024 * 1024)
+# 모델은 요청 tier 기준 (WHISPER_TIERS), 풀은 gunicorn 마스터가 시작한 호스트 공유 풀 (WHISPER_POOL_SOCKET)
+long_transcriber = ParallelTranscriber(
+    processes=int(os.getenv("WHISPER_PROCESSES", "2")),
+    threads_per_process=int(os.getenv("WHISPER_PROCESS_THREADS", "1")),
+    max_models=int(os.getenv("WHISPER_PROCESS_MAX_MODELS", "1")),
+    address=os.getenv("WHISPER_POOL_SOCKET") or None,
+    authkey=os.getenv("WHISPER_POOL_AUTHKEY", "").encode() or None,
+)
+# 풀 프로세스 메모리를 모델 예산에 반영 (이 워커가 소유한 풀만 - 공유 풀은 보고만)
+registry.attach("whisper-pool", long_transcriber.resident_bytes, long_transcriber.stats)
+
+
+# ==================== SSE ====================
+
+# 프록시(nginx) 버퍼링 없이 이벤트를 바로 전달
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Server-Sent Events 메시지 한 건"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# ==================== 인식 결과 캐시 ====================
+
+# 같은 이미지 재전송(카메라 재시도, Spring 타임아웃 재시도)은 캐시된 결과로 응답
+# RESULT_CACHE_BACKEND: sqlite (워커 간 공유, 기본) / memory / off
+result_cache = ResultCache.from_env()
+
+# 고정 카메라의 유사 프레임 억제 (X-Camera-ID 헤더가 있는 요청만)
+# FRAME_DEDUP_BACKEND: sqlite (직전 프레임 상태를 워커 간 공유, 기본) / memory
+FRAME_DEDUP_ENABLED = os.getenv("FRAME_DEDUP_ENABLED", "true").lower() == "true"
+frame_dedup = FrameDeduplicator.from_env()
+
+# 처리 중인 동일 요청(같은 내용 + 엔드포인트 + 파라미터)은 새로 추론하지 않고 결과를 함께 대기
+# 응답 헤더 X-Coalesced: true
+single_flight = SingleFlight.from_env()
 
 
 # ==================== Pydantic 모델 (Spring DTO와 매핑) ====================
@@ -109,6 +522,8 @@ class LicensePlateResponse(BaseModel):
     processing_time_ms: Optional[int] = None
     plates: Optional[List[PlateInfo]] = Field(default=[], description="탐지된 모든 번호판")
     error_message: Optional[str] = None
+    tier: Optional[str] = Field(None, description="사용한 모델 tier (fast/standard/accurate, 부하 시 강등 반영)")
+    timings: Optional[Dict[str, float]] = Field(None, description="단계별 처리 시간 ms (X-Timings: 1 요청 시)")
 
     class Config:
         json_schema_extra = {
@@ -135,12 +550,27 @@ class DetectionResponse(BaseModel):
     success: bool
     detections: List[Detection]
     count: int
+    tier: Optional[str] = Field(None, description="사용한 모델 tier (fast/standard/accurate, 부하 시 강등 반영)")
+    timings: Optional[Dict[str, float]] = Field(None, description="단계별 처리 시간 ms (X-Timings: 1 요청 시)")
 
 class TranscriptionResponse(BaseModel):
     """음성 인식 응답"""
     success: bool
     text: str
     language: Optional[str] = None
+    tier: Optional[str] = Field(None, description="사용한 모델 tier (fast/standard/accurate, 부하 시 강등 반영)")
+
+
+class TranscriptionSegment(BaseModel):
+    """음성 인식 구간 (원본 기준 초)"""
+    start: float
+    end: float
+    text: str
+
+class LongTranscriptionResponse(TranscriptionResponse):
+    """장시간 음성 인식 응답"""
+    duration_s: float
+    segments: List[TranscriptionSegment] = []
 
 
 class TextAnalysisRequest(BaseModel):
@@ -163,10 +593,61 @@ class SentimentResponse(BaseModel):
     error_message: Optional[str] = None
 
 
+# 배치 감성 분석 요청당 최대 텍스트 수
+SENTIMENT_BATCH_MAX_ITEMS = int(os.getenv("SENTIMENT_BATCH_MAX_ITEMS", "5000"))
+
+
+class SentimentBatchRequest(BaseModel):
+    """배치 감성 분석 요청"""
+    texts: List[Annotated[str, Field(max_length=10000)]] = Field(
+        ..., min_length=1, max_length=SENTIMENT_BATCH_MAX_ITEMS, description="분석할 텍스트 목록 (리뷰 등)"
+    )
+
+
+class SentimentBatchResponse(BaseModel):
+    """배치 감성 분석 응답 (results는 texts와 같은 순서)"""
+    success: bool
+    results: List[SentimentResult] = []
+    count: int = 0
+    summary: Optional[Dict[str, int]] = Field(None, description="레이블별 개수")
+    processing_time_ms: Optional[int] = None
+    error_message: Optional[str] = None
+
+
+class KeywordsRequest(TextAnalysisRequest):
+    """키워드 추출 요청 (text 외 필드는 생략 가능)"""
+    method: ScoringMethod = Field("tfidf", description="점수 방식 (tfidf / bm25, 코퍼스 문서 빈도 기준)")
+    top_k: int = Field(10, ge=1, le=100, description="반환할 키워드 수")
+    learn: bool = Field(True, description="이 문서를 코퍼스 색인에 추가")
+
+
 class KeywordsResponse(BaseModel):
     """키워드 추출 응답"""
     success: bool
-    keywords: List[dict] = Field(default=[], description="추출된 키워드 목록")
+    keywords: List[dict] = Field(default=[], description="추출된 키워드 목록 (word, count, score, df)")
+    processing_time_ms: Optional[int] = None
+    error_message: Optional[str] = None
+
+
+# 배치 키워드 추출 요청당 최대 문서 수
+KEYWORDS_BATCH_MAX_ITEMS = int(os.getenv("KEYWORDS_BATCH_MAX_ITEMS", "5000"))
+
+
+class KeywordsBatchRequest(BaseModel):
+    """배치 키워드 추출 요청"""
+    texts: List[Annotated[str, Field(max_length=10000)]] = Field(
+        ..., min_length=1, max_length=KEYWORDS_BATCH_MAX_ITEMS, description="키워드를 추출할 문서 목록"
+    )
+    method: ScoringMethod = "tfidf"
+    top_k: int = Field(10, ge=1, le=100)
+    learn: bool = True
+
+
+class KeywordsBatchResponse(BaseModel):
+    """배치 키워드 추출 응답 (results는 texts와 같은 순서)"""
+    success: bool
+    results: List[List[dict]] = []
+    count: int = 0
     processing_time_ms: Optional[int] = None
     error_message: Optional[str] = None
 
@@ -177,6 +658,7 @@ class ChatRequest(BaseModel):
     system_prompt: Optional[str] = Field(None, description="시스템 프롬프트")
     max_tokens: Optional[int] = Field(500, ge=1, le=4000, description="최대 토큰 수")
     temperature: Optional[float] = Field(0.7, ge=0, le=2, description="창의성 수준")
+    stream: bool = Field(False, description="true면 토큰을 SSE(text/event-stream)로 전달")
 
 
 class ChatResponse(BaseModel):
@@ -216,13 +698,418 @@ def health():
     """헬스체크 엔드포인트"""
     return {"status": "healthy", "service": "ai-server"}
 
+@app.get("/ready")
+def ready():
+    """
+    준비 상태 엔드포인트 (오케스트레이터 트래픽 라우팅용)
+
+    PRELOAD_MODELS에 지정된 모델이 모두 로드·워밍업되면 200, 아니면 503
+    (워커별 CPU 스레드 계획 포함)
+    """
+    models = registry.status()
+    is_ready = all(models[name]["state"] == "ready" for name in PRELOAD_MODELS if name in models)
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={
+            "ready": is_ready,
+            "preload": PRELOAD_MODELS,
+            "models": models,
+            "thread_plan": thread_plan.report() if ThreadPlan.enabled() else None,
+            "whisper_pool": long_transcriber.stats(),
+        }
+    )
+
+@app.get("/api/v1/system/cache")
+async def cache_stats():
+    """결과 캐시 적중률 / 항목 수 / 키워드 색인 크기 (적중 카운터는 워커별)"""
+    # 항목 수 / 색인 크기는 SQLite 조회이므로 스레드 풀에서
+    cache = await run_in_threadpool(result_cache.stats)
+    keyword_index = await run_in_threadpool(keyword_extractor.stats)
+    return {
+        **cache,
+        "frame_dedup": await run_in_threadpool(frame_dedup.stats),
+        "single_flight": single_flight.stats(),
+        "keyword_index": keyword_index,
+        "pid": os.getpid(),
+    }
+
+@app.get("/api/v1/system/models")
+async def model_stats():
+    """상주 모델 / 크기 / 메모리 예산 / 워커 메모리 구성 (Whisper 프로세스 풀 포함)"""
+    # 풀 상태는 /proc 및 공유 풀 서버 조회이므로 스레드 풀에서
+    return {**await run_in_threadpool(registry.report), "sharing_mode": MODEL_SHARING, "pid": os.getpid()}
+
+@app.get("/api/v1/system/queues")
+async def queue_stats():
+    """모델별 대기열 깊이 / 대기 시간 / 배칭 통계"""
+    return {
+        "executors": [e.stats() for e in model_executors],
+        "batchers": [yolo_batcher.stats(), ocr_batcher.stats()],
+        "scheduler": cpu_scheduler.stats(),
+        "tiers": [policy.stats() for policy in tier_policies],
+        "jobs": await run_in_threadpool(job_queue.stats),
+    }
+
+
+# ==================== 📈 Prometheus 메트릭 ====================
+
+# 대기열 / 모델 / 캐시 통계를 메트릭으로 옮기는 주기 (초)
+METRICS_SAMPLE_INTERVAL_S = float(os.getenv("METRICS_SAMPLE_INTERVAL_S", "5"))
+_metric_counters = metrics.CounterSync()
+
+
+async def collect_runtime_metrics():
+    """실행기 / 배처 / 모델 레지스트리 / 캐시 통계 → 메트릭 (워커별로 기록, 조회 시 합산)"""
+    for executor in model_executors:
+        stats = executor.stats()
+        metrics.EXECUTOR_QUEUE_DEPTH.labels(executor.name).set(stats["queue_depth"])
+        metrics.EXECUTOR_INFLIGHT.labels(executor.name).set(stats["inflight"])
+        _metric_counters.sync(metrics.EXECUTOR_REJECTED, stats["rejected"], executor.name)
+        _metric_counters.sync(metrics.EXPIRED_DROPPED, stats["expired"], executor.name)
+
+    for batcher in (yolo_batcher, ocr_batcher):
+        stats = batcher.stats()
+        metrics.BATCHER_PENDING.labels(stats["name"]).set(stats["pending"])
+        _metric_counters.sync(metrics.EXPIRED_DROPPED, stats["expired"], f"{stats['name']}-batch")
+
+    for name, stats in cpu_scheduler.stats()["classes"].items():
+        metrics.SCHEDULER_QUEUED.labels(name).set(stats["queued"])
+        metrics.SCHEDULER_RUNNING.labels(name).set(stats["running"])
+        _metric_counters.sync(metrics.EXPIRED_DROPPED, stats["expired"], f"scheduler-{name}")
+
+    for policy in tier_policies:
+        stats = policy.stats()
+        for tier, count in stats["chosen"].items():
+            _metric_counters.sync(metrics.TIER_SELECTED, count, policy.name, tier)
+        _metric_counters.sync(metrics.TIER_DEGRADED, stats["degraded"], policy.name)
+
+    # 작업 수는 SQLite 집계 조회이므로 스레드 풀에서
+    job_stats = await run_in_threadpool(job_queue.stats)
+    for event in ("submitted", "succeeded", "failed", "retried", "callbacks_failed"):
+        _metric_counters.sync(metrics.JOB_EVENTS, job_stats[event], event)
+    job_counts = job_stats.get("store", {}).get("jobs", {})
+    for kind in job_queue.kinds:
+        for status in ("queued", "running"):
+            metrics.JOBS.labels(kind, status).set(job_counts.get(kind, {}).get(status, 0))
+
+    for name, status in registry.status().items():
+        if status["load_time_ms"] is not None:
+            metrics.MODEL_LOAD_SECONDS.labels(name).set(status["load_time_ms"] / 1000)
+        if status["warmup_time_ms"] is not None:
+            metrics.MODEL_WARMUP_SECONDS.labels(name).set(status["warmup_time_ms"] / 1000)
+        metrics.MODEL_LOADED.labels(name).set(1 if status["state"] in ("loaded", "ready") else 0)
+
+    # 결과 캐시 / 프레임 억제는 stats() 대신 카운터만 읽음 (stats()의 항목 수는 SQLite COUNT 조회 - 이벤트 루프에서 실행됨)
+    flight = single_flight.stats()
+    for cache, hits, misses in (
+        ("result", result_cache.hits, result_cache.misses),
+        ("frame_dedup", frame_dedup.hits, frame_dedup.misses),
+        ("single_flight", flight["coalesced"], flight["leaders"]),
+    ):
+        _metric_counters.sync(metrics.CACHE_EVENTS, hits, cache, "hit")
+        _metric_counters.sync(metrics.CACHE_EVENTS, misses, cache, "miss")
+
+
+async def sample_runtime_metrics():
+    """워커 수명 동안 주기적으로 통계를 메트릭에 반영"""
+    while True:
+        try:
+            await collect_runtime_metrics()
+        except Exception as e:
+            logger.warning(f"메트릭 수집 실패: {e}")
+        await asyncio.sleep(METRICS_SAMPLE_INTERVAL_S)
+
+
+# 레이블로 쓸 엔드포인트 경로 (등록되지 않은 경로는 "other"로 묶어 레이블 폭증 방지)
+_metric_endpoints: set = set()
+
+
+@app.middleware("http")
+async def observe_requests(request, call_next):
+    """엔드포인트별 지연 / 처리 중 요청 수 / 오류 유형 기록"""
+    if not _metric_endpoints:
+        _metric_endpoints.update(getattr(route, "path", None) for route in app.routes)
+    path = request.url.path
+    if path == "/metrics":
+        return await call_next(request)
+    endpoint = path if path in _metric_endpoints else "other"
+
+    token = metrics.current_endpoint.set(endpoint)
+    priority_token = current_priority.set(cpu_scheduler.priority_for(endpoint))
+    metrics.REQUESTS_IN_FLIGHT.labels(endpoint).inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        if status >= 400:
+            error_type = getattr(request.state, "error_type", None) or f"http_{status}"
+            metrics.ERRORS.labels(endpoint, error_type).inc()
+        return response
+    except Exception as e:
+        metrics.ERRORS.labels(endpoint, type(e).__name__).inc()
+        raise
+    finally:
+        metrics.REQUEST_LATENCY.labels(endpoint, request.method, str(status)).observe(
+            time.perf_counter() - started
+        )
+        metrics.REQUESTS_IN_FLIGHT.labels(endpoint).dec()
+        metrics.current_endpoint.reset(token)
+        current_priority.reset(priority_token)
+
+
+# ==================== 🔬 요청 단위 프로파일링 ====================
+
+# X-Profile: 1 → collapsed stack 파일 저장 (X-Profile-File 헤더로 파일명 반환)
+# X-Profile: inline → 응답 대신 collapsed stack 텍스트 반환
+# PROFILE_ALLOWLIST (IP/CIDR, 쉼표 구분)에 있는 클라이언트만 허용, 비어 있으면 비활성
+profiler = Profiler.from_env()
+
+
+@app.middleware("http")
+async def profile_requests(request, call_next):
+    """허용된 클라이언트의 X-Profile 요청을 샘플링 프로파일러로 실행"""
+    mode = request.headers.get("X-Profile")
+    if not mode or mode == "0" or not profiler.allowed(request.client.host if request.client else None):
+        return await call_next(request)
+
+    name = request.headers.get("X-Request-ID") or request.headers.get("X-Camera-ID") or str(uuid.uuid4())
+    with profiler.sampler() as sampler:
+        response = await call_next(request)
+        # 응답 본문 생성까지 포함 (스트리밍 응답은 전송 완료까지)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+    logger.info(f"[{name}] 프로파일 - {sampler.sample_count} 샘플, {sampler.elapsed * 1000:.0f}ms")
+    if mode == "inline":
+        return Response(content=sampler.collapsed(), media_type="text/plain")
+
+    headers = dict(response.headers)
+    headers.pop("content-length", None)
+    headers["X-Profile-File"] = await run_in_threadpool(profiler.save, f"{request.url.path}-{name}", sampler)
+    return Response(content=body, status_code=response.status_code, headers=headers,
+                    media_type=response.media_type)
+
+
+@app.get("/api/v1/system/profiles/{filename}", include_in_schema=False)
+async def download_profile(request: Request, filename: str):
+    """저장된 collapsed stack 프로파일 (허용 목록 클라이언트만)"""
+    if not profiler.allowed(request.client.host if request.client else None):
+        raise HTTPException(status_code=403, detail="프로파일 조회가 허용되지 않은 클라이언트입니다")
+    path = profiler.path(filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail="프로파일을 찾을 수 없습니다")
+    return FileResponse(path, media_type="text/plain")
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus 수집 엔드포인트 (gunicorn 워커 전체 합산)"""
+    await collect_runtime_metrics()
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 
 # ==================== 🚗 번호판 인식 API (K-MaaS 핵심) ====================
 
+async def recognize_license_plate(
+    contents: bytes, request_id: str, start_time: float, yolo_version: Optional[str] = None
+) -> LicensePlateResponse:
+    """번호판 인식 파이프라인 (축소 디코딩 → YOLO → 후보 크롭 → 배치 OCR)"""
+    # 1. 이미지 로드 (YOLO 입력 크기 근처로 축소 디코딩, 스레드 풀에서)
+    with stage("decode"):
+        decoded = await run_in_threadpool(decode_image, contents, YOLO_INPUT_SIZE)
+
+    # 2. YOLO로 객체 탐지 (번호판 또는 차량) - 동시 요청과 배치 처리
+    check_deadline("yolo")
+    with stage("yolo"):
+        results = [await run_yolo(decoded.image, yolo_version)]
+
+    plates = []
+    main_plate = None
+    main_confidence = 0
+
+    # 3. 탐지된 객체에서 번호판 후보 영역 수집
+    candidates = []
+    for r in results:
+        for box in r.boxes:
+            class_name = r.names[int(box.cls)]
+            confidence = float(box.conf)
+
+            # 차량 또는 번호판 클래스인 경우 (좌표는 원본 해상도 기준)
+            if class_name in ['car', 'truck', 'bus', 'motorcycle', 'license_plate']:
+                x1, y1, x2, y2 = map(int, decoded.to_full(box.xyxy[0].tolist()))
+
+                # 번호판 영역 크롭 (차량 하단 30% 영역을 번호판으로 가정)
+                if class_name != 'license_plate':
+                    plate_box = (x1, y1 + int((y2 - y1) * 0.7), x2, y2)
+                else:
+                    plate_box = (x1, y1, x2, y2)
+
+                if plate_box[2] > plate_box[0] and plate_box[3] > plate_box[1]:
+                    candidates.append((plate_box, confidence, (x1, y1, x2, y2)))
+
+    # 4. 모든 후보를 한 번의 배치 OCR로 인식 후 박스별로 매핑
+    ocr_batches = []
+    if candidates:
+        # YOLO를 기다리는 동안 만료되었으면 크롭 디코딩·OCR 생략
+        check_deadline("ocr")
+        try:
+            # 글자를 읽기 어려울 만큼 작은 크롭이 있을 때만 원본 해상도를 디코딩
+            with stage("crop"):
+                regions = await run_in_threadpool(
+                    decoded.crops, [plate_box for plate_box, _, _ in candidates], (0, OCR_MIN_PLATE_HEIGHT)
+                )
+            check_deadline("ocr")
+            with stage("ocr"):
+                ocr_batches = await run_ocr(regions)
+        except (QueueFullError, DeadlineExceeded):
+            raise
+        except Exception as ocr_err:
+            logger.warning(f"[{request_id}] OCR 실패: {ocr_err}")
+
+    for (_, confidence, (x1, y1, x2, y2)), ocr_results in zip(candidates, ocr_batches):
+        if ocr_results:
+            # OCR 결과 조합
+            plate_text = ''.join([text for _, text, _ in ocr_results])
+            # 한국 번호판 형식으로 정규화 (간단 버전)
+            plate_text = plate_text.replace(' ', '').upper()
+
+            plate_info = PlateInfo(
+                plate_number=plate_text,
+                confidence=confidence,
+                bounding_box=BoundingBox(
+                    x=x1, y=y1,
+                    width=x2-x1, height=y2-y1
+                )
+            )
+            plates.append(plate_info)
+
+            # 가장 신뢰도 높은 것을 대표로
+            if confidence > main_confidence:
+                main_confidence = confidence
+                main_plate = plate_info
+
+    processing_time = int((time.time() - start_time) * 1000)
+
+    if main_plate:
+        logger.info(f"[{request_id}] 번호판 인식 성공 - {main_plate.plate_number} ({processing_time}ms)")
+        return LicensePlateResponse(
+            success=True,
+            request_id=request_id,
+            plate_number=main_plate.plate_number,
+            confidence=main_plate.confidence,
+            bounding_box=main_plate.bounding_box,
+            vehicle_type="승용차",  # TODO: 실제 분류 로직 추가
+            processing_time_ms=processing_time,
+            plates=plates
+        )
+    else:
+        logger.warning(f"[{request_id}] 번호판 탐지 실패 ({processing_time}ms)")
+        return LicensePlateResponse(
+            success=False,
+            request_id=request_id,
+            processing_time_ms=processing_time,
+            error_message="번호판을 찾을 수 없습니다"
+        )
+
+
+def cached_response(model_cls, cached: dict, **overrides):
+    """캐시된 결과 + 현재 요청 값(request_id, processing_time_ms 등)으로 응답 생성"""
+    return model_cls(**{**cached, **overrides})
+
+
+def with_timings(result: BaseModel, timings: Optional[Dict[str, float]], start_time: float):
+    """
+    단계별 처리 시간을 붙인 응답 사본
+
+    병합(single-flight)된 요청은 결과 객체를 공유하므로 원본을 수정하지 않습니다.
+    병합된 요청의 대기 시간은 단계에 잡히지 않고 total에만 포함됩니다.
+    """
+    if timings is None:
+        return result
+    return result.model_copy(update={
+        "timings": {**timings, "total": round((time.time() - start_time) * 1000, 2)}
+    })
+
+
+async def process_license_plate(
+    contents: bytes,
+    request_id: str,
+    start_time: float,
+    camera_id: Optional[str] = None,
+    headers: Optional[dict] = None,
+    tier: Optional[str] = None
+) -> LicensePlateResponse:
+    """
+    번호판 인식 (tier 선택 → 결과 캐시 → 카메라별 유사 프레임 → 동일 요청 병합 → 전체 파이프라인)
+
+    headers가 주어지면 X-Model-Tier / X-Cache / X-Frame-Dedup / X-Coalesced 값을 채워 줍니다.
+    """
+    headers = headers if headers is not None else {}
+
+    choice = yolo_tiers.select(tier)
+    headers.update(choice.headers())
+    cache_key = result_cache.make_key("license-plate", contents, model=choice.version)
+    with stage("cache"):
+        cached = await result_cache.aget(cache_key)
+    if cached is not None:
+        headers["X-Cache"] = "HIT"
+        processing_time = int((time.time() - start_time) * 1000)
+        logger.info(f"[{request_id}] 번호판 인식 캐시 적중 ({processing_time}ms)")
+        return cached_response(
+            LicensePlateResponse, cached,
+            request_id=request_id, processing_time_ms=processing_time, tier=choice.tier
+        )
+    if result_cache.enabled:
+        headers["X-Cache"] = "MISS"
+
+    # 카메라별 유사 프레임: 차량이 차단기 앞에 서 있는 동안의 반복 프레임
+    current_hash = None
+    if camera_id and FRAME_DEDUP_ENABLED:
+        try:
+            current_hash = await run_in_threadpool(frame_hash, contents)
+        except Exception as hash_err:
+            logger.warning(f"[{request_id}] 프레임 해시 실패: {hash_err}")
+        if current_hash is not None:
+            previous = await run_in_threadpool(frame_dedup.lookup, camera_id, current_hash, choice.tier)
+            if previous is not None:
+                headers["X-Frame-Dedup"] = "HIT"
+                processing_time = int((time.time() - start_time) * 1000)
+                logger.info(f"[{request_id}] 유사 프레임 - 카메라 {camera_id} 이전 결과 재사용 ({processing_time}ms)")
+                return cached_response(
+                    LicensePlateResponse, previous,
+                    request_id=request_id, processing_time_ms=processing_time
+                )
+            headers["X-Frame-Dedup"] = "MISS"
+
+    async def compute():
+        result = await recognize_license_plate(contents, request_id, start_time, choice.version)
+        with stage("serialize"):
+            result_data = result.model_dump(exclude={"request_id", "processing_time_ms"})
+            result_data["tier"] = choice.tier
+        await result_cache.aset(cache_key, result_data)
+        return result_data
+
+    result_data, shared = await single_flight.do(cache_key, compute)
+    if shared:
+        headers["X-Coalesced"] = "true"
+        logger.info(f"[{request_id}] 처리 중인 동일 이미지 결과 공유")
+    if current_hash is not None:
+        await run_in_threadpool(frame_dedup.remember, camera_id, current_hash, result_data, choice.tier)
+    return cached_response(
+        LicensePlateResponse, result_data,
+        request_id=request_id, processing_time_ms=int((time.time() - start_time) * 1000)
+    )
+
+
 @app.post("/api/v1/license-plate/detect", response_model=LicensePlateResponse)
 async def detect_license_plate(
+    response: Response,
     file: UploadFile = File(..., description="차량 이미지"),
-    x_request_id: Optional[str] = Header(None, alias="X-Request-ID")
+    x_request_id: Optional[str] = Header(None, alias="X-Request-ID"),
+    x_camera_id: Optional[str] = Header(None, alias="X-Camera-ID"),
+    x_timings: Optional[str] = Header(None, alias="X-Timings"),
+    tier: Optional[Tier] = None
 ):
     """
     🚗 K-MaaS 번호판 인식 API
@@ -230,110 +1117,165 @@ async def detect_license_plate(
     - YOLO로 번호판 영역 탐지
     - EasyOCR로 번호판 텍스트 인식
     - Spring Boot의 AiService.detectLicensePlate()에서 호출
+    - 동일 이미지 재요청은 결과 캐시로 응답 (X-Cache: HIT/MISS)
+    - X-Camera-ID가 있으면 직전 프레임과 거의 같은 프레임은 이전 결과 재사용 (X-Frame-Dedup)
+    - X-Timings: 1 이면 응답에 단계별 처리 시간(timings, ms) 포함
+    - tier: fast / standard(기본) / accurate - 대기열이 밀리면 fast로 강등 (응답 tier, X-Model-Tier)
 
     Returns:
         LicensePlateResponse: 번호판 인식 결과
     """
     start_time = time.time()
     request_id = x_request_id or str(uuid.uuid4())
+    timings = metrics.start_timings() if x_timings else None
 
     logger.info(f"[{request_id}] 번호판 인식 요청 - 파일: {file.filename}")
 
     try:
-        from PIL import Image
-        import numpy as np
-
-        # 1. 이미지 로드
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        image_np = np.array(image)
-
-        # 2. YOLO로 객체 탐지 (번호판 또는 차량)
-        model = get_yolo_model()
-        results = model(image)
-
-        plates = []
-        main_plate = None
-        main_confidence = 0
-
-        # 3. 탐지된 객체에서 번호판 영역 추출
-        for r in results:
-            for box in r.boxes:
-                class_name = r.names[int(box.cls)]
-                confidence = float(box.conf)
-
-                # 차량 또는 번호판 클래스인 경우
-                if class_name in ['car', 'truck', 'bus', 'motorcycle', 'license_plate']:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-
-                    # 번호판 영역 크롭 (차량 하단 30% 영역을 번호판으로 가정)
-                    if class_name != 'license_plate':
-                        plate_y1 = y1 + int((y2 - y1) * 0.7)
-                        plate_region = image_np[plate_y1:y2, x1:x2]
-                    else:
-                        plate_region = image_np[y1:y2, x1:x2]
-
-                    # 4. OCR로 번호판 텍스트 인식
-                    if plate_region.size > 0:
-                        try:
-                            reader = get_ocr_reader()
-                            ocr_results = reader.readtext(plate_region)
-
-                            if ocr_results:
-                                # OCR 결과 조합
-                                plate_text = ''.join([text for _, text, _ in ocr_results])
-                                # 한국 번호판 형식으로 정규화 (간단 버전)
-                                plate_text = plate_text.replace(' ', '').upper()
-
-                                plate_info = PlateInfo(
-                                    plate_number=plate_text,
-                                    confidence=confidence,
-                                    bounding_box=BoundingBox(
-                                        x=x1, y=y1,
-                                        width=x2-x1, height=y2-y1
-                                    )
-                                )
-                                plates.append(plate_info)
-
-                                # 가장 신뢰도 높은 것을 대표로
-                                if confidence > main_confidence:
-                                    main_confidence = confidence
-                                    main_plate = plate_info
-
-                        except Exception as ocr_err:
-                            logger.warning(f"[{request_id}] OCR 실패: {ocr_err}")
-
-        processing_time = int((time.time() - start_time) * 1000)
-
-        if main_plate:
-            logger.info(f"[{request_id}] 번호판 인식 성공 - {main_plate.plate_number} ({processing_time}ms)")
-            return LicensePlateResponse(
-                success=True,
-                request_id=request_id,
-                plate_number=main_plate.plate_number,
-                confidence=main_plate.confidence,
-                bounding_box=main_plate.bounding_box,
-                vehicle_type="승용차",  # TODO: 실제 분류 로직 추가
-                processing_time_ms=processing_time,
-                plates=plates
-            )
-        else:
-            logger.warning(f"[{request_id}] 번호판 탐지 실패 ({processing_time}ms)")
-            return LicensePlateResponse(
-                success=False,
-                request_id=request_id,
-                processing_time_ms=processing_time,
-                error_message="번호판을 찾을 수 없습니다"
-            )
+        contents = await read_image_upload(file)
+        result = await process_license_plate(
+            contents, request_id, start_time,
+            camera_id=x_camera_id, headers=response.headers, tier=tier
+        )
+        return with_timings(result, timings, start_time)
 
+    except (QueueFullError, CoalesceTimeoutError, DeadlineExceeded, HTTPException):
+        raise
     except Exception as e:
         processing_time = int((time.time() - start_time) * 1000)
         logger.error(f"[{request_id}] 처리 오류: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# 배치 엔드포인트: 요청당 최대 이미지 수 / 동시에 파이프라인에 올리는 이미지 수
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "500"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+# 요청당 메모리에 올리는 업로드 합계 상한 (zip 또는 multipart 이미지 합계, 바이트)
+BATCH_MAX_ARCHIVE_BYTES = int(os.getenv("BATCH_MAX_ARCHIVE_BYTES") or 200 * 1024 * 1024)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+class BatchLicensePlateResult(LicensePlateResponse):
+    """배치 번호판 인식 결과 (NDJSON 한 줄)"""
+    index: int = Field(..., description="요청 내 이미지 순번 (0부터)")
+    filename: Optional[str] = None
+
+
+async def collect_batch_images(files: List[UploadFile], archive: Optional[UploadFile]):
+    """
+    배치 입력 수집 → [(파일명, 바이트 로더)]
+
+    스트리밍 응답 시작 전에 업로드가 닫히므로 바이트는 여기서 읽어 둡니다.
+    zip 항목은 파이프라인에서 필요할 때 압축 해제합니다.
+    """
+    import zipfile
+
+    too_large = HTTPException(
+        status_code=413, detail=f"배치 업로드 크기가 제한({BATCH_MAX_ARCHIVE_BYTES} bytes)을 초과했습니다"
+    )
+    items = []
+    total = 0
+    for upload in files:
+        contents = await read_image_upload(upload)
+        total += len(contents)
+        if total > BATCH_MAX_ARCHIVE_BYTES:
+            raise too_large
+        items.append((upload.filename, lambda data=contents: data))
+
+    if archive is not None:
+        remaining = BATCH_MAX_ARCHIVE_BYTES - total
+        archive_bytes = await archive.read(remaining + 1)
+        if len(archive_bytes) > remaining:
+            raise too_large
+        try:
+            zf = zipfile.ZipFile(io.BytesIO(archive_bytes))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="올바른 zip 파일이 아닙니다")
+        for info in zf.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if info.file_size > MAX_IMAGE_SIZE:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"{info.filename}: 이미지 크기가 제한({MAX_IMAGE_SIZE} bytes)을 초과했습니다"
+                )
+            items.append((info.filename, lambda name=info.filename: zf.read(name)))
+
+    if not items:
+        raise HTTPException(status_code=400, detail="처리할 이미지가 없습니다")
+    if len(items) > BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"이미지 수가 제한({BATCH_MAX_IMAGES}장)을 초과했습니다")
+    return items
+
+
+@app.post("/api/v1/license-plate/detect/batch")
+async def detect_license_plate_batch(
+    files: List[UploadFile] = File(default=[], description="차량 이미지 여러 장"),
+    archive: Optional[UploadFile] = File(None, description="차량 이미지 zip"),
+    x_request_id: Optional[str] = Header(None, alias="X-Request-ID"),
+    tier: Optional[Tier] = None
+):
+    """
+    🚗 배치 번호판 인식 API (NDJSON 스트리밍)
+
+    - multipart 이미지 여러 장 또는 zip 한 개로 요청
+    - 이미지별 디코딩·탐지·OCR을 파이프라인으로 겹쳐 처리 (YOLO/OCR은 이미지 간 배치)
+    - 처리가 끝나는 순서대로 이미지당 한 줄씩 LicensePlateResponse(+index, filename) 전송
+    - tier는 이미지마다 선택 (처리 중 대기열이 밀리면 이후 이미지부터 fast로 강등)
+
+    Returns:
+        application/x-ndjson 스트림
+    """
+    batch_id = x_request_id or str(uuid.uuid4())
+    items = await collect_batch_images(files, archive)
+    logger.info(f"[{batch_id}] 배치 번호판 인식 요청 - {len(items)}장")
+
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+    async def process(index, filename, load):
+        request_id = f"{batch_id}-{index}"
+        start_time = time.time()
+        async with semaphore:
+            # 대기열 포화 시 다른 요청에 자리를 양보하며 재시도
+            for attempt in range(3):
+                try:
+                    contents = await run_in_threadpool(load)
+                    result = await process_license_plate(contents, request_id, start_time, tier=tier)
+                    break
+                except QueueFullError as e:
+                    if attempt == 2:
+                        result = LicensePlateResponse(success=False, request_id=request_id, error_message=str(e))
+                    else:
+                        await asyncio.sleep(e.retry_after * (attempt + 1) / 4)
+                except Exception as e:
+                    logger.error(f"[{request_id}] 처리 오류: {str(e)}")
+                    result = LicensePlateResponse(success=False, request_id=request_id, error_message=str(e))
+                    break
+        return BatchLicensePlateResult(**result.model_dump(), index=index, filename=filename)
+
+    async def stream():
+        tasks = [asyncio.create_task(process(i, name, load)) for i, (name, load) in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                yield result.model_dump_json() + "\n"
+        finally:
+            # 클라이언트 연결 종료 시 남은 작업 취소
+            for task in tasks:
+                task.cancel()
+            logger.info(f"[{batch_id}] 배치 번호판 인식 종료 - {sum(t.done() and not t.cancelled() for t in tasks)}/{len(items)}장")
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 # ==================== 📝 텍스트 분석 API ====================
 
+# 감성 사전: 기본 내장 용어 + SENTIMENT_LEXICON_PATHS 파일("용어<TAB>가중치")을 시작 시 한 번 컴파일
+sentiment_lexicon = SentimentLexicon.from_env()
+
+# 키워드 문서 빈도 색인 (SQLite, KEYWORD_INDEX_PATH): 요청 문서를 점진적으로 추가, TF-IDF/BM25 점수 기준
+keyword_extractor = KeywordExtractor.from_env()
+
 @app.post("/api/v1/text/sentiment", response_model=SentimentResponse)
 async def analyze_sentiment(request: TextAnalysisRequest):
     """
@@ -348,38 +1290,14 @@ async def analyze_sentiment(request: TextAnalysisRequest):
     logger.info(f"감성 분석 요청 - 텍스트 길이: {len(request.text)}")
 
     try:
-        # 간단한 키워드 기반 감성 분석 (실제 프로덕션에서는 ML 모델 사용)
-        positive_words = ['좋아', '훌륭', '최고', '감사', '행복', '사랑', 'good', 'great', 'excellent', 'happy', 'love', 'amazing', 'wonderful']
-        negative_words = ['싫어', '나쁜', '최악', '짜증', '화나', '슬퍼', 'bad', 'terrible', 'awful', 'hate', 'angry', 'sad', 'horrible']
-
-        text_lower = request.text.lower()
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
-
-        total = positive_count + negative_count
-        if total == 0:
-            label = "neutral"
-            score = 0.5
-        elif positive_count > negative_count:
-            label = "positive"
-            score = positive_count / total
-        else:
-            label = "negative"
-            score = negative_count / total
+        # 가중치 감성 사전 기반 분석 (실제 프로덕션에서는 ML 모델 사용)
+        result = sentiment_lexicon.score(request.text)
 
         processing_time = int((time.time() - start_time) * 1000)
 
         return SentimentResponse(
             success=True,
-            sentiment=SentimentResult(
-                label=label,
-                score=score,
-                details={
-                    "positive_indicators": positive_count,
-                    "negative_indicators": negative_count,
-                    "text_length": len(request.text)
-                }
-            ),
+            sentiment=SentimentResult(**result),
             processing_time_ms=processing_time
         )
 
@@ -391,12 +1309,53 @@ async def analyze_sentiment(request: TextAnalysisRequest):
         )
 
 
+@app.post("/api/v1/text/sentiment/batch", response_model=SentimentBatchResponse)
+async def analyze_sentiment_batch(request: SentimentBatchRequest):
+    """
+    📝 배치 감성 분석 API
+
+    리뷰 등 여러 텍스트를 한 요청으로 분석합니다 (최대 SENTIMENT_BATCH_MAX_ITEMS개).
+    모든 텍스트를 감성 사전 오토마톤으로 한 번에 훑으므로 텍스트별 요청보다 훨씬 빠릅니다.
+
+    Returns:
+        SentimentBatchResponse: 텍스트 순서대로 감성 분석 결과 + 레이블별 개수
+    """
+    start_time = time.time()
+    logger.info(f"배치 감성 분석 요청 - 텍스트 {len(request.texts)}개")
+
+    try:
+        # CPU 작업이므로 이벤트 루프 밖에서 실행
+        results = await run_in_threadpool(sentiment_lexicon.score_batch, request.texts)
+
+        summary = {"positive": 0, "negative": 0, "neutral": 0}
+        for result in results:
+            summary[result["label"]] += 1
+
+        processing_time = int((time.time() - start_time) * 1000)
+
+        return SentimentBatchResponse(
+            success=True,
+            results=[SentimentResult(**result) for result in results],
+            count=len(results),
+            summary=summary,
+            processing_time_ms=processing_time
+        )
+
+    except Exception as e:
+        logger.error(f"배치 감성 분석 오류: {str(e)}")
+        return SentimentBatchResponse(
+            success=False,
+            error_message=str(e)
+        )
+
+
 @app.post("/api/v1/text/keywords", response_model=KeywordsResponse)
-async def extract_keywords(request: TextAnalysisRequest):
+async def extract_keywords(request: KeywordsRequest):
     """
     🔑 키워드 추출 API
 
     텍스트에서 주요 키워드를 추출합니다.
+    문서 내 빈도에 코퍼스 희소성(지금까지 들어온 문서의 문서 빈도)을 곱한 TF-IDF / BM25 점수로 순위를 매깁니다.
 
     Returns:
         KeywordsResponse: 추출된 키워드 목록
@@ -405,35 +1364,10 @@ async def extract_keywords(request: TextAnalysisRequest):
     logger.info(f"키워드 추출 요청 - 텍스트 길이: {len(request.text)}")
 
     try:
-        import re
-        from collections import Counter
-
-        # 불용어 (한국어 + 영어)
-        stopwords = {
-            '이', '그', '저', '것', '수', '등', '들', '및', '에', '의', '을', '를',
-            '이다', '하다', '있다', '되다', '않다', '없다', '같다', '보다', '위해',
-            'the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-            'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
-            'should', 'may', 'might', 'must', 'can', 'to', 'of', 'in', 'for',
-            'on', 'with', 'at', 'by', 'from', 'as', 'into', 'through', 'during',
-            'and', 'or', 'but', 'if', 'then', 'else', 'when', 'up', 'down', 'out',
-            'it', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'they', 'we'
-        }
-
-        # 단어 추출 (한글 + 영문)
-        words = re.findall(r'[가-힣]{2,}|[a-zA-Z]{3,}', request.text.lower())
-
-        # 불용어 제거 및 빈도 계산
-        filtered_words = [w for w in words if w not in stopwords]
-        word_counts = Counter(filtered_words)
-
-        # 상위 10개 키워드 추출
-        top_keywords = word_counts.most_common(10)
-
-        keywords = [
-            {"word": word, "count": count, "score": count / len(filtered_words) if filtered_words else 0}
-            for word, count in top_keywords
-        ]
+        # 색인 조회/갱신(SQLite)은 이벤트 루프 밖에서
+        keywords = await run_in_threadpool(
+            keyword_extractor.extract, request.text, request.top_k, request.method, request.learn
+        )
 
         processing_time = int((time.time() - start_time) * 1000)
 
@@ -451,6 +1385,42 @@ async def extract_keywords(request: TextAnalysisRequest):
         )
 
 
+@app.post("/api/v1/text/keywords/batch", response_model=KeywordsBatchResponse)
+async def extract_keywords_batch(request: KeywordsBatchRequest):
+    """
+    🔑 배치 키워드 추출 API
+
+    여러 문서를 한 요청으로 처리합니다 (최대 KEYWORDS_BATCH_MAX_ITEMS개).
+    토큰화, 색인 갱신 트랜잭션, 문서 빈도 조회를 배치 전체에 대해 한 번씩만 수행합니다.
+
+    Returns:
+        KeywordsBatchResponse: 문서 순서대로 키워드 목록
+    """
+    start_time = time.time()
+    logger.info(f"배치 키워드 추출 요청 - 문서 {len(request.texts)}개")
+
+    try:
+        results = await run_in_threadpool(
+            keyword_extractor.extract_batch, request.texts, request.top_k, request.method, request.learn
+        )
+
+        processing_time = int((time.time() - start_time) * 1000)
+
+        return KeywordsBatchResponse(
+            success=True,
+            results=results,
+            count=len(results),
+            processing_time_ms=processing_time
+        )
+
+    except Exception as e:
+        logger.error(f"배치 키워드 추출 오류: {str(e)}")
+        return KeywordsBatchResponse(
+            success=False,
+            error_message=str(e)
+        )
+
+
 @app.post("/api/v1/text/summary", response_model=SummaryResponse)
 async def summarize_text(request: SummaryRequest):
     """
@@ -527,70 +1497,73 @@ async def summarize_text(request: SummaryRequest):
         )
 
 
+# OpenAI 호환 API 공유 클라이언트 (keep-alive 연결 풀, lifespan 종료 시 닫힘)
+chat_client = ChatClient.from_env()
+
+
 @app.post("/api/v1/chat", response_model=ChatResponse)
 async def chat_with_ai(request: ChatRequest):
     """
     🤖 ChatGPT 연동 API
 
     OpenAI GPT 모델을 사용하여 대화합니다.
-    OPENAI_API_KEY 환경 변수가 필요합니다.
+    OPENAI_API_KEY 환경 변수가 필요합니다. (OPENAI_BASE_URL로 호환 서버 지정 가능)
+
+    stream=true 이면 SSE(text/event-stream)로 토큰을 도착하는 대로 전달합니다.
+    - event: token  → {content}
+    - event: done   → {response, model}
+    - event: error  → {detail}
 
     Returns:
         ChatResponse: AI 응답
     """
-    logger.info(f"ChatGPT 요청 - 메시지 길이: {len(request.message)}")
+    logger.info(f"ChatGPT 요청 - 메시지 길이: {len(request.message)}, stream={request.stream}")
 
-    api_key = os.getenv("OPENAI_API_KEY")
-
-    if not api_key or api_key == "sk-your-openai-api-key-here":
+    if not chat_client.configured:
         # OpenAI API 키가 없으면 간단한 에코 응답
         logger.warning("OpenAI API 키가 설정되지 않음 - 에코 모드")
+        echo = f"[에코 모드] 입력하신 메시지: {request.message}\n\n(OPENAI_API_KEY를 설정하면 실제 GPT 응답을 받을 수 있습니다)"
+        if request.stream:
+            async def echo_events():
+                for word in echo.split(" "):
+                    yield sse_event("token", {"content": word + " "})
+                yield sse_event("done", {"response": echo, "model": "echo-mode"})
+            return StreamingResponse(echo_events(), media_type="text/event-stream", headers=SSE_HEADERS)
         return ChatResponse(
             success=True,
-            response=f"[에코 모드] 입력하신 메시지: {request.message}\n\n(OPENAI_API_KEY를 설정하면 실제 GPT 응답을 받을 수 있습니다)",
+            response=echo,
             model="echo-mode"
         )
 
-    try:
-        import httpx
-
-        async with httpx.AsyncClient() as client:
-            messages = []
-
-            if request.system_prompt:
-                messages.append({"role": "system", "content": request.system_prompt})
-            else:
-                messages.append({"role": "system", "content": "You are a helpful assistant."})
-
-            messages.append({"role": "user", "content": request.message})
-
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-3.5-turbo",
-                    "messages": messages,
-                    "max_tokens": request.max_tokens,
-                    "temperature": request.temperature
-                },
-                timeout=30.0
-            )
-
-            if response.status_code != 200:
-                error_data = response.json()
-                raise Exception(f"OpenAI API 오류: {error_data.get('error', {}).get('message', 'Unknown error')}")
+    messages = [
+        {"role": "system", "content": request.system_prompt or "You are a helpful assistant."},
+        {"role": "user", "content": request.message},
+    ]
+    params = {"max_tokens": request.max_tokens, "temperature": request.temperature}
+
+    if request.stream:
+        async def events():
+            parts = []
+            try:
+                async for token in chat_client.stream(messages, **params):
+                    parts.append(token)
+                    yield sse_event("token", {"content": token})
+                yield sse_event("done", {"response": "".join(parts), "model": chat_client.model})
+            except Exception as e:
+                logger.error(f"ChatGPT 스트리밍 오류: {str(e)}")
+                yield sse_event("error", {"detail": str(e)})
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
-            data = response.json()
+    try:
+        data = await chat_client.complete(messages, **params)
 
-            return ChatResponse(
-                success=True,
-                response=data["choices"][0]["message"]["content"],
-                model=data["model"],
-                usage=data.get("usage")
-            )
+        return ChatResponse(
+            success=True,
+            response=data["choices"][0]["message"]["content"],
+            model=data["model"],
+            usage=data.get("usage")
+        )
 
     except Exception as e:
         logger.error(f"ChatGPT 오류: {str(e)}")
@@ -603,100 +1576,442 @@ async def chat_with_ai(request: ChatRequest):
 # ==================== 기존 API (호환성 유지) ====================
 
 @app.post("/detect", response_model=DetectionResponse)
-async def detect_objects(file: UploadFile = File(...)):
-    """YOLO 객체 탐지 API"""
+async def detect_objects(
+    response: Response,
+    file: UploadFile = File(...),
+    x_timings: Optional[str] = Header(None, alias="X-Timings"),
+    tier: Optional[Tier] = None
+):
+    """
+    YOLO 객체 탐지 API (X-Timings: 1 이면 단계별 처리 시간 포함)
+
+    tier: fast / standard(기본) / accurate - 대기열이 밀리면 fast로 강등 (응답 tier, X-Model-Tier)
+    """
+    start_time = time.time()
+    timings = metrics.start_timings() if x_timings else None
     try:
-        from PIL import Image
+        contents = await read_image_upload(file)
+
+        choice = yolo_tiers.select(tier)
+        response.headers.update(choice.headers())
+        cache_key = result_cache.make_key("detect", contents, model=choice.version)
+        with stage("cache"):
+            cached = await result_cache.aget(cache_key)
+        if cached is not None:
+            response.headers["X-Cache"] = "HIT"
+            return with_timings(cached_response(DetectionResponse, cached, tier=choice.tier), timings, start_time)
+        if result_cache.enabled:
+            response.headers["X-Cache"] = "MISS"
+
+        async def compute():
+            with stage("decode"):
+                decoded = await run_in_threadpool(decode_image, contents, YOLO_INPUT_SIZE)
+
+            with stage("yolo"):
+                results = [await run_yolo(decoded.image, choice.version)]
+
+            detections = []
+            for r in results:
+                for box in r.boxes:
+                    detections.append(Detection(
+                        class_name=r.names[int(box.cls)],
+                        confidence=float(box.conf),
+                        bbox=decoded.to_full(box.xyxy[0].tolist())
+                    ))
+
+            result = DetectionResponse(
+                success=True,
+                detections=detections,
+                count=len(detections),
+                tier=choice.tier
+            )
+            await result_cache.aset(cache_key, result.model_dump())
+            return result
+
+        result, shared = await single_flight.do(cache_key, compute)
+        if shared:
+            response.headers["X-Coalesced"] = "true"
+        return with_timings(result, timings, start_time)
+    except (QueueFullError, CoalesceTimeoutError, DeadlineExceeded, HTTPException):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
 
-        model = get_yolo_model()
-        results = model(image)
+@app.post("/transcribe", response_model=TranscriptionResponse)
+async def transcribe_audio(response: Response, file: UploadFile = File(...), tier: Optional[Tier] = None):
+    """
+    Whisper 음성 인식 API (임시 파일 없이 ffmpeg 파이프로 디코딩)
 
-        detections = []
-        for r in results:
-            for box in r.boxes:
-                detections.append(Detection(
-                    class_name=r.names[int(box.cls)],
-                    confidence=float(box.conf),
-                    bbox=box.xyxy[0].tolist()
-                ))
+    tier: fast(tiny) / standard(base, 기본) / accurate(small) - 대기열이 밀리면 fast로 강등
+    """
+    try:
+        contents = await read_audio_upload(file, MAX_AUDIO_BYTES)
+
+        choice = whisper_tiers.select(tier)
+        response.headers.update(choice.headers())
+
+        async def compute():
+            with stage("decode"):
+                audio = await run_in_threadpool(decode_audio, contents, MAX_AUDIO_LENGTH)
+            with stage("whisper"):
+                return await whisper_executor.run(
+                    lambda samples: get_whisper_model(choice.version).transcribe(samples),
+                    audio
+                )
+
+        result, shared = await single_flight.do(
+            result_cache.make_key("transcribe", contents, model=choice.version), compute
+        )
+        if shared:
+            response.headers["X-Coalesced"] = "true"
 
-        return DetectionResponse(
+        return TranscriptionResponse(
             success=True,
-            detections=detections,
-            count=len(detections)
+            text=result["text"],
+            language=result.get("language"),
+            tier=choice.tier
         )
+
+    except AudioTooLongError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (HTTPException, QueueFullError, CoalesceTimeoutError, DeadlineExceeded):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/transcribe", response_model=TranscriptionResponse)
-async def transcribe_audio(file: UploadFile = File(...)):
-    """Whisper 음성 인식 API"""
-    try:
-        contents = await file.read()
+async def transcribe_long(audio, language: Optional[str] = None, model_name: str = "base") -> dict:
+    """장시간 음성 구간 병렬 인식 후 병합 (/transcribe/long, 음성 작업 공용, 수락 제어는 호출 측)"""
+    results = []
+    async for result in long_transcriber.transcribe(audio, language, model_name):
+        # 만료되면 아직 시작하지 않은 구간은 취소 (transcribe 종료 시)
+        check_deadline("whisper-long")
+        results.append(result)
+    return stitch(results)
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            tmp.write(contents)
-            tmp_path = tmp.name
 
+@app.post("/transcribe/long", response_model=LongTranscriptionResponse)
+async def transcribe_long_audio(
+    response: Response,
+    file: UploadFile = File(...),
+    stream: bool = False,
+    language: Optional[str] = None,
+    tier: Optional[Tier] = None,
+):
+    """
+    장시간 음성 인식 API
+
+    무음 경계로 분할한 구간을 프로세스 풀에서 병렬 인식합니다.
+    tier: fast(tiny) / standard(base, 기본) / accurate(small) - /transcribe 와 같은 매핑
+    stream=true 이면 구간이 끝나는 대로 SSE(text/event-stream)로 전달합니다.
+    - event: segment  → {index, start, end, text, language, segments}
+    - event: done     → {text, language, duration_s, tier}
+    - event: error    → {detail}
+    """
+    # 수락 제어는 스트리밍 시작 전에 통과해야 429를 응답할 수 있음
+    admission = AsyncExitStack()
+    await admission.enter_async_context(whisper_long_executor.admission())
+    try:
+        contents = await read_audio_upload(file, MAX_LONG_AUDIO_BYTES)
+        with stage("decode"):
+            audio = await run_in_threadpool(decode_audio, contents, MAX_LONG_AUDIO_LENGTH)
+    except AudioTooLongError as e:
+        await admission.aclose()
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioError as e:
+        await admission.aclose()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        await admission.aclose()
+        raise
+
+    duration_s = round(len(audio) / 16000, 2)
+    choice = whisper_long_tiers.select(tier)
+
+    if not stream:
         try:
-            model = get_whisper_model()
-            result = model.transcribe(tmp_path)
+            merged = await transcribe_long(audio, language, choice.version)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await admission.aclose()
+        response.headers.update(choice.headers())
+        return LongTranscriptionResponse(success=True, duration_s=duration_s, tier=choice.tier, **merged)
 
-            return TranscriptionResponse(
-                success=True,
-                text=result["text"],
-                language=result.get("language")
-            )
+    async def events():
+        results = []
+        try:
+            async for result in long_transcriber.transcribe(audio, language, choice.version):
+                results.append(result)
+                yield sse_event("segment", result)
+            merged = stitch(results)
+            yield sse_event("done", {"text": merged["text"], "language": merged["language"],
+                                     "duration_s": duration_s, "tier": choice.tier})
+        except Exception as e:
+            logger.error(f"장시간 음성 인식 오류: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
         finally:
-            os.unlink(tmp_path)
+            await admission.aclose()
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(events(), media_type="text/event-stream", headers={**SSE_HEADERS, **choice.headers()})
+
+
+async def remove_image_background(contents: bytes, image_format: str, mask: bool = False):
+    """배경 제거 + 인코딩 (동일 요청 병합) → (이미지 바이트, 병합 여부) - /remove-background, 작업 공용"""
+    from rembg import remove
+
+    def remove_and_encode(image):
+        result = remove(image, session=get_rembg_session(), only_mask=mask)
+        # 인코딩도 rembg 스레드에서 수행해 이벤트 루프를 막지 않음
+        return encode_image(result, image_format)
+
+    async def compute():
+        with stage("decode"):
+            image = await run_in_threadpool(open_image, contents)
+        with stage("rembg"):
+            return await rembg_executor.run(remove_and_encode, image)
+
+    return await single_flight.do(
+        result_cache.make_key("remove-background", contents, format=image_format, mask=mask), compute
+    )
 
 
 @app.post("/remove-background")
-async def remove_background(file: UploadFile = File(...)):
-    """배경 제거 API"""
+async def remove_background(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    mask: bool = False,
+    accept: Optional[str] = Header(None),
+):
+    """
+    배경 제거 API
+
+    응답 형식은 format 쿼리(json/png/webp) 또는 Accept 헤더(image/png, image/webp)로 선택합니다.
+    - json (기본): {"success": true, "image": base64 PNG} - 기존 클라이언트 호환
+    - png / webp: 이미지 바이트를 그대로 응답 (base64 인코딩/디코딩 생략, 약 33% 작음)
+    - mask=true: RGBA 이미지 대신 단일 채널 알파 마스크만 반환
+    """
     try:
-        from rembg import remove
+        try:
+            output_format = negotiate_image_format(accept, format)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        contents = await file.read()
-        output = remove(contents)
+        contents = await read_image_upload(file)
+        image_format = "png" if output_format == "json" else output_format
 
-        return JSONResponse({
-            "success": True,
-            "image": base64.b64encode(output).decode("utf-8")
-        })
+        output, shared = await remove_image_background(contents, image_format, mask)
+        headers = {"X-Coalesced": "true"} if shared else {}
+
+        if output_format == "json":
+            return JSONResponse({
+                "success": True,
+                "image": base64.b64encode(output).decode("utf-8")
+            }, headers=headers)
+        return Response(
+            content=output,
+            media_type=IMAGE_MEDIA_TYPES[output_format],
+            headers={**headers, "X-Output": "mask" if mask else "image", "Vary": "Accept"},
+        )
+    except (QueueFullError, CoalesceTimeoutError, DeadlineExceeded, HTTPException):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def generate_caption(image):
+    processor, model = get_blip_model()
+
+    inputs = processor(image, return_tensors="pt")
+    output = model.generate(**inputs, max_length=50)
+    return processor.decode(output[0], skip_special_tokens=True)
+
+
+async def caption_image(contents: bytes):
+    """캡션 생성 (동일 요청 병합) → (캡션, 병합 여부) - /caption, 캡션 작업 공용"""
+    async def compute():
+        # BLIP 입력(384px) 근처로 축소 디코딩
+        with stage("decode"):
+            image = (await run_in_threadpool(decode_image, contents, BLIP_INPUT_SIZE)).image
+        with stage("blip"):
+            return await blip_executor.run(generate_caption, image)
+
+    return await single_flight.do(result_cache.make_key("caption", contents), compute)
+
+
 @app.post("/caption")
-async def image_caption(file: UploadFile = File(...)):
+async def image_caption(response: Response, file: UploadFile = File(...)):
     """이미지 캡션 생성 API"""
     try:
-        from transformers import BlipProcessor, BlipForConditionalGeneration
-        from PIL import Image
-
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
+        contents = await read_image_upload(file)
 
-        processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-        model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
-
-        inputs = processor(image, return_tensors="pt")
-        output = model.generate(**inputs, max_length=50)
-        caption = processor.decode(output[0], skip_special_tokens=True)
+        caption, shared = await caption_image(contents)
+        if shared:
+            response.headers["X-Coalesced"] = "true"
 
         return {"success": True, "caption": caption}
+    except (QueueFullError, CoalesceTimeoutError, DeadlineExceeded, HTTPException):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ==================== 📦 비동기 작업 API ====================
+
+# 오래 걸리는 요청(캡션, 장시간 음성, 배경 제거)은 작업으로 접수 → 202 + job_id 즉시 응답
+# 결과는 GET /api/v1/jobs/{job_id} 폴링 또는 callback_url(JOB_CALLBACK_HOSTS의 내부 호스트만)로 수신
+# 작업은 SQLite 큐(JOB_DB_PATH)에 저장되고 gunicorn 워커들이 나눠 처리 (모델 호출은 batch 우선순위)
+job_queue = JobQueue.from_env()
+
+
+async def caption_job(payload: bytes, params: dict) -> dict:
+    try:
+        caption, _ = await caption_image(payload)
+    except UnidentifiedImageError as e:
+        raise PermanentJobError(f"이미지 디코딩 실패: {e}")
+    return {"caption": caption}
+
+
+async def remove_background_job(payload: bytes, params: dict) -> dict:
+    try:
+        output, _ = await remove_image_background(payload, params["format"], params["mask"])
+    except UnidentifiedImageError as e:
+        raise PermanentJobError(f"이미지 디코딩 실패: {e}")
+    return {
+        "format": params["format"],
+        "output": "mask" if params["mask"] else "image",
+        "image": base64.b64encode(output).decode("utf-8"),
+    }
+
+
+async def transcribe_long_job(payload: bytes, params: dict) -> dict:
+    try:
+        audio = await run_in_threadpool(decode_audio, payload, MAX_LONG_AUDIO_LENGTH)
+    except AudioError as e:
+        raise PermanentJobError(str(e))
+    # 동기 /transcribe/long 과 같은 동시 실행 제한 공유 (포화 시 백오프 후 재시도)
+    async with whisper_long_executor.admission():
+        choice = whisper_long_tiers.select(params.get("tier"))
+        merged = await transcribe_long(audio, params.get("language"), choice.version)
+    return {"duration_s": round(len(audio) / 16000, 2), "tier": choice.tier, **merged}
+
+
+# 종류별 동시 실행 수 / 시도 횟수 / 제한 시간: {KIND}_JOB_CONCURRENCY / _MAX_ATTEMPTS / _TIMEOUT_S
+job_queue.register("caption", caption_job, concurrency=2, timeout_s=300)
+job_queue.register("remove-background", remove_background_job, concurrency=2, timeout_s=300)
+job_queue.register("transcribe-long", transcribe_long_job, concurrency=1, timeout_s=1800)
+
+
+class JobResponse(BaseModel):
+    """작업 상태 (result는 종류별 응답 본문: caption / image(base64) / text, segments ...)"""
+    job_id: str
+    kind: str
+    status: str = Field(..., description="queued / running / succeeded / failed / cancelled")
+    params: Dict = {}
+    result: Optional[Dict] = None
+    error: Optional[str] = Field(None, description="마지막 실패 사유 (재시도 대기 중에도 표시)")
+    attempts: int
+    max_attempts: int
+    callback_url: Optional[str] = None
+    callback_status: Optional[str] = Field(None, description="delivered / rejected_{status} / failed")
+    created_at: float
+    updated_at: float
+    expires_at: Optional[float] = Field(None, description="결과 삭제 시각 (Unix epoch 초)")
+    status_url: str
+
+
+def job_response(job: dict) -> JobResponse:
+    return JobResponse(**job, status_url=f"/api/v1/jobs/{job['job_id']}")
+
+
+async def submit_job(response: Response, kind: str, contents: bytes, params: dict,
+                     callback_url: Optional[str]) -> JobResponse:
+    if not job_queue.enabled:
+        raise HTTPException(status_code=503, detail="작업 API가 비활성화되어 있습니다")
+    if not contents:
+        raise HTTPException(status_code=400, detail="빈 파일입니다")
+    try:
+        job = await job_queue.submit(kind, contents, params, callback_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result = job_response(job)
+    response.headers["Location"] = result.status_url
+    return result
+
+
+@app.post("/api/v1/jobs/caption", response_model=JobResponse, status_code=202)
+async def submit_caption_job(
+    response: Response,
+    file: UploadFile = File(...),
+    callback_url: Optional[str] = None,
+):
+    """이미지 캡션 작업 접수 (결과: {"caption": ...})"""
+    contents = await read_image_upload(file)
+    return await submit_job(response, "caption", contents, {}, callback_url)
+
+
+@app.post("/api/v1/jobs/remove-background", response_model=JobResponse, status_code=202)
+async def submit_remove_background_job(
+    response: Response,
+    file: UploadFile = File(...),
+    format: str = "png",
+    mask: bool = False,
+    callback_url: Optional[str] = None,
+):
+    """배경 제거 작업 접수 (결과: {"format", "output", "image": base64})"""
+    try:
+        image_format = negotiate_image_format(None, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    contents = await read_image_upload(file)
+    params = {"format": "png" if image_format == "json" else image_format, "mask": mask}
+    return await submit_job(response, "remove-background", contents, params, callback_url)
+
+
+@app.post("/api/v1/jobs/transcribe-long", response_model=JobResponse, status_code=202)
+async def submit_transcribe_long_job(
+    response: Response,
+    file: UploadFile = File(...),
+    language: Optional[str] = None,
+    tier: Optional[Tier] = None,
+    callback_url: Optional[str] = None,
+):
+    """장시간 음성 인식 작업 접수 (결과: /transcribe/long 응답과 같은 text, language, segments, duration_s, tier)"""
+    contents = await read_audio_upload(file, MAX_LONG_AUDIO_BYTES)
+    return await submit_job(response, "transcribe-long", contents, {"language": language, "tier": tier},
+                            callback_url)
+
+
+@app.get("/api/v1/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """작업 상태 / 결과 조회 (결과는 JOB_RESULT_TTL_S 동안 보관)"""
+    if not job_queue.enabled:
+        raise HTTPException(status_code=503, detail="작업 API가 비활성화되어 있습니다")
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다 (만료되었거나 없는 ID)")
+    return job_response(job)
+
+
+@app.delete("/api/v1/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """대기 중인 작업 취소 (실행 중이거나 끝난 작업은 409)"""
+    if not job_queue.enabled:
+        raise HTTPException(status_code=503, detail="작업 API가 비활성화되어 있습니다")
+    cancelled = await job_queue.cancel(job_id)
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다 (만료되었거나 없는 ID)")
+    if not cancelled:
+        raise HTTPException(status_code=409, detail=f"대기 중인 작업만 취소할 수 있습니다 (현재: {job['status']})")
+    return job_response(job)
+
+
 # ==================== 서버 실행 ====================
 
 if __name__ == "__main__":
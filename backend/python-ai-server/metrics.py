@@ -0,0 +1,168 @@
+"""
+K-MaaS Prometheus 메트릭
+- 엔드포인트별 요청 지연 / 파이프라인 단계별 지연 히스토그램
+- 모델 로드 시간, 대기열 깊이, 처리 중 요청 수, 유형별 오류 수, 캐시 적중/미스
+- 요청 단위 단계별 시간 (X-Timings 헤더 요청 시 응답의 timings 필드)
+- gunicorn 다중 워커: PROMETHEUS_MULTIPROC_DIR가 설정되면 워커별 파일을 합산해 노출
+  (gunicorn.conf.py에서 설정, 워커 종료 시 mark_process_dead)
+"""
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# 모델 추론 구간(수십 ms ~ 수 초)에 맞춘 버킷
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUEST_LATENCY = Histogram(
+    "kmaas_request_duration_seconds", "엔드포인트별 요청 처리 시간 (응답 시작까지)",
+    ["endpoint", "method", "status"], buckets=LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "kmaas_stage_duration_seconds", "파이프라인 단계별 처리 시간",
+    ["endpoint", "stage"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "kmaas_requests_in_flight", "처리 중인 요청 수",
+    ["endpoint"], multiprocess_mode="livesum",
+)
+ERRORS = Counter(
+    "kmaas_errors_total", "유형별 오류 수 (예외 클래스 또는 http_<status>)",
+    ["endpoint", "type"],
+)
+
+MODEL_LOAD_SECONDS = Gauge(
+    "kmaas_model_load_seconds", "모델 로드 시간",
+    ["model"], multiprocess_mode="max",
+)
+MODEL_WARMUP_SECONDS = Gauge(
+    "kmaas_model_warmup_seconds", "모델 워밍업 시간",
+    ["model"], multiprocess_mode="max",
+)
+MODEL_LOADED = Gauge(
+    "kmaas_model_loaded", "상주 중인 모델 (워커 수 합계)",
+    ["model"], multiprocess_mode="livesum",
+)
+
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "kmaas_executor_queue_depth", "모델 실행기 대기열 깊이",
+    ["model"], multiprocess_mode="livesum",
+)
+EXECUTOR_INFLIGHT = Gauge(
+    "kmaas_executor_inflight", "모델 실행기에 수락된 요청 수 (실행 + 대기)",
+    ["model"], multiprocess_mode="livesum",
+)
+EXECUTOR_REJECTED = Counter(
+    "kmaas_executor_rejected_total", "대기열 포화로 거절된 요청 수", ["model"],
+)
+EXPIRED_DROPPED = Counter(
+    "kmaas_expired_dropped_total", "마감 초과/연결 끊김으로 실행하지 않고 버린 대기 작업 수", ["model"],
+)
+SCHEDULER_QUEUED = Gauge(
+    "kmaas_scheduler_queued", "우선순위 클래스별 슬롯 대기 중인 모델 호출 수",
+    ["priority"], multiprocess_mode="livesum",
+)
+SCHEDULER_RUNNING = Gauge(
+    "kmaas_scheduler_running", "우선순위 클래스별 실행 중인 모델 호출 수",
+    ["priority"], multiprocess_mode="livesum",
+)
+BATCHER_PENDING = Gauge(
+    "kmaas_batcher_pending", "배치 대기 중인 항목 수",
+    ["batcher"], multiprocess_mode="livesum",
+)
+
+TIER_SELECTED = Counter(
+    "kmaas_tier_selected_total", "실제로 사용한 모델 tier (강등 반영)", ["model", "tier"],
+)
+TIER_DEGRADED = Counter(
+    "kmaas_tier_degraded_total", "부하로 fast tier로 강등된 요청 수", ["model"],
+)
+
+JOB_EVENTS = Counter(
+    "kmaas_job_events_total", "비동기 작업 처리 이벤트 (submitted/succeeded/failed/retried/callbacks_failed)",
+    ["event"],
+)
+JOBS = Gauge(
+    "kmaas_jobs", "공유 작업 큐의 상태별 작업 수",
+    ["kind", "status"], multiprocess_mode="max",
+)
+
+CACHE_EVENTS = Counter(
+    "kmaas_cache_events_total", "캐시 조회 결과 (적중률 = hit / (hit + miss))",
+    ["cache", "result"],
+)
+
+# 현재 요청의 엔드포인트 (미들웨어에서 설정, stage()가 레이블로 사용)
+current_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("current_endpoint", default="other")
+
+# 현재 요청의 단계별 시간 (ms) - start_timings()로 수집을 켠 요청만
+request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render() -> Tuple[bytes, str]:
+    """노출 형식 텍스트 → (본문, Content-Type)"""
+    if multiprocess_enabled():
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def start_timings() -> Dict[str, float]:
+    """현재 요청의 단계별 시간 수집 시작 → 단계명: ms (stage()가 채움)"""
+    timings: Dict[str, float] = {}
+    request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def stage(name: str, endpoint: Optional[str] = None):
+    """파이프라인 단계 시간 측정 (with stage("decode"): ...)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_LATENCY.labels(endpoint or current_endpoint.get(), name).observe(elapsed)
+        timings = request_timings.get()
+        if timings is not None:
+            timings[name] = round(timings.get(name, 0) + elapsed * 1000, 2)
+
+
+class CounterSync:
+    """
+    누적값(정수 통계) → Counter 증가분 반영
+
+    기존 통계 객체(캐시, 실행기 등)가 세는 누적값을 주기적으로 읽어 차이만큼 inc 하므로
+    호출 지점마다 계측 코드를 넣지 않아도 워커 간 합산되는 Counter가 됩니다.
+    """
+
+    def __init__(self):
+        self._last: Dict[Tuple, float] = {}
+
+    def sync(self, counter: Counter, value: Optional[float], *labels: str):
+        if value is None:
+            return
+        key = (id(counter), *labels)
+        delta = value - self._last.get(key, 0)
+        if delta > 0:
+            counter.labels(*labels).inc(delta)
+        self._last[key] = value
@@ -0,0 +1,304 @@
+"""
+K-MaaS 모델 레지스트리
+- 모델명 + 버전 단위로 로드된 모델을 캐시
+- 메모리(RSS) 예산 초과 시 가장 오래 사용되지 않은 모델부터 해제 (LRU)
+- 상주 모델 / 크기 / 로딩 시간 보고
+- 레지스트리 밖(자식 프로세스)에 상주하는 모델도 크기를 예산에 포함하고 보고 (Whisper 프로세스 풀)
+"""
+import gc
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("ai-server.models")
+
+MB = 1024 * 1024
+
+
+def current_rss_bytes() -> int:
+    """현재 프로세스 RSS (바이트)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # /proc 가 없는 환경: 최대 RSS로 대체 (Linux 기준 KB)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def process_memory() -> Dict[str, float]:
+    """
+    프로세스 메모리 구성 (MB, /proc/self/smaps_rollup 기준)
+
+    - pss: 공유 페이지를 공유 프로세스 수로 나눈 실사용량 (워커 합산 시 정확)
+    - shared: 다른 프로세스(gunicorn 마스터/워커)와 공유 중인 페이지
+    - private: 이 프로세스만 사용하는 페이지 (copy-on-write로 복제된 페이지 포함)
+    """
+    fields = {
+        "Rss": "rss", "Pss": "pss",
+        "Shared_Clean": "shared", "Shared_Dirty": "shared",
+        "Private_Clean": "private", "Private_Dirty": "private",
+    }
+    usage = {"rss": 0.0, "pss": 0.0, "shared": 0.0, "private": 0.0}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in fields:
+                    usage[fields[key]] += int(rest.split()[0]) / 1024  # kB → MB
+    except (OSError, ValueError, IndexError):
+        usage = {"rss": current_rss_bytes() / MB}
+    return {k: round(v, 1) for k, v in usage.items()}
+
+
+def _release_memory():
+    """해제된 모델 메모리를 OS에 반환"""
+    gc.collect()
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class ModelEntry:
+    """레지스트리에 등록된 단일 모델"""
+
+    def __init__(self, name: str, version: str, loader: Callable[[], Any], pinned: bool):
+        self.name = name
+        self.version = version
+        self.loader = loader
+        self.pinned = pinned
+
+        self.model: Any = None
+        self.state = "not_loaded"  # not_loaded → loading → loaded → ready / failed / evicted
+        self.size_bytes: Optional[int] = None
+        self.load_time_ms: Optional[int] = None
+        self.warmup_time_ms: Optional[int] = None
+        self.loaded_at: Optional[float] = None
+        self.last_used: Optional[float] = None
+        self.load_count = 0
+        self.error: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.version}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "state": self.state,
+            "pinned": self.pinned,
+            "size_mb": round(self.size_bytes / MB, 1) if self.size_bytes is not None else None,
+            "load_time_ms": self.load_time_ms,
+            "warmup_time_ms": self.warmup_time_ms,
+            "load_count": self.load_count,
+            "idle_s": round(time.time() - self.last_used, 1) if self.last_used else None,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    """
+    모델명:버전 → 로드된 모델 캐시
+
+    - get(): 필요 시 로드하고 LRU 순서를 갱신
+    - memory_budget_mb: 상주 모델 크기 합의 상한 (0이면 무제한)
+    - pinned 모델은 예산을 초과해도 해제하지 않음
+    """
+
+    def __init__(self, memory_budget_mb: int = 0):
+        self.memory_budget_bytes = max(0, memory_budget_mb) * MB
+        self._entries: Dict[str, ModelEntry] = {}
+        self._defaults: Dict[str, str] = {}
+        # 상주 모델 LRU 순서 (앞쪽이 가장 오래 사용되지 않음)
+        self._lru: "OrderedDict[str, ModelEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 로딩은 직렬화: 동시 로딩 방지 + RSS 증가분으로 크기 측정
+        self._load_lock = threading.Lock()
+        self._evictions = 0
+        # 이름 → (이 프로세스가 소유한 상주 크기(바이트), 보고용 상태)
+        self._external: Dict[str, Tuple[Callable[[], int], Callable[[], Dict[str, Any]]]] = {}
+
+    def attach(self, name: str, resident_bytes: Callable[[], int], report: Callable[[], Dict[str, Any]]):
+        """
+        레지스트리 밖에 상주하는 모델 등록 (예: 자식 프로세스 풀)
+
+        해제할 수는 없으므로 예산 계산에만 포함 → 예산을 넘으면 레지스트리 모델이 대신 해제됩니다.
+        """
+        self._external[name] = (resident_bytes, report)
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        version: str = "default",
+        pinned: bool = False,
+        default: bool = True,
+    ) -> ModelEntry:
+        """모델 로더 등록 (로드는 첫 get() 시점)"""
+        entry = ModelEntry(name, version, loader, pinned)
+        with self._lock:
+            self._entries[entry.key] = entry
+            if default or name not in self._defaults:
+                self._defaults[name] = version
+        return entry
+
+    def entry(self, name: str, version: Optional[str] = None) -> ModelEntry:
+        version = version or self._defaults.get(name)
+        try:
+            return self._entries[f"{name}:{version}"]
+        except KeyError:
+            raise KeyError(f"등록되지 않은 모델: {name}:{version}") from None
+
+    def get(self, name: str, version: Optional[str] = None) -> Any:
+        """모델 반환 (필요 시 로드, LRU 갱신)"""
+        entry = self.entry(name, version)
+        model = entry.model
+        if model is None:
+            model = self._load(entry)
+        with self._lock:
+            entry.last_used = time.time()
+            if entry.key in self._lru:
+                self._lru.move_to_end(entry.key)
+        return model
+
+    def is_loaded(self, name: str, version: Optional[str] = None) -> bool:
+        return self.entry(name, version).model is not None
+
+    def pin(self, name: str, version: Optional[str] = None):
+        """예산 초과 시에도 해제하지 않도록 고정"""
+        self.entry(name, version).pinned = True
+
+    def mark_ready(self, name: str, warmup_time_ms: Optional[int] = None, version: Optional[str] = None):
+        """워밍업 완료 표시"""
+        entry = self.entry(name, version)
+        entry.warmup_time_ms = warmup_time_ms
+        entry.state = "ready"
+
+    def mark_failed(self, name: str, error: str, version: Optional[str] = None):
+        entry = self.entry(name, version)
+        entry.state = "failed"
+        entry.error = error
+
+    def evict(self, name: str, version: Optional[str] = None) -> bool:
+        """모델 해제 (진행 중인 추론은 참조를 유지하므로 안전)"""
+        entry = self.entry(name, version)
+        with self._lock:
+            evicted = self._evict_locked(entry)
+        if evicted:
+            _release_memory()
+        return evicted
+
+    # ==================== 로딩 / 해제 ====================
+
+    def _load(self, entry: ModelEntry) -> Any:
+        with self._load_lock:
+            if entry.model is not None:
+                return entry.model
+
+            # 이전에 측정한 크기가 있으면 로드 전에 공간 확보
+            if entry.size_bytes:
+                self._enforce_budget(incoming_bytes=entry.size_bytes)
+
+            logger.info(f"{entry.key} 모델 로딩 중...")
+            entry.state = "loading"
+            entry.error = None
+            rss_before = current_rss_bytes()
+            started = time.perf_counter()
+            try:
+                model = entry.loader()
+            except Exception as e:
+                entry.state = "failed"
+                entry.error = str(e)
+                logger.error(f"{entry.key} 모델 로딩 실패: {e}")
+                raise
+
+            entry.load_time_ms = int((time.perf_counter() - started) * 1000)
+            entry.size_bytes = max(0, current_rss_bytes() - rss_before)
+            entry.loaded_at = entry.last_used = time.time()
+            entry.load_count += 1
+            entry.state = "loaded"
+            with self._lock:
+                entry.model = model
+                self._lru[entry.key] = entry
+            logger.info(
+                f"{entry.key} 모델 로딩 완료 - {entry.load_time_ms}ms, "
+                f"{entry.size_bytes / MB:.1f}MB"
+            )
+
+            self._enforce_budget(keep=entry.key)
+            return model
+
+    def _enforce_budget(self, incoming_bytes: int = 0, keep: Optional[str] = None):
+        """상주 모델 크기 합이 예산 이하가 될 때까지 LRU 모델 해제"""
+        if not self.memory_budget_bytes:
+            return
+        evicted = False
+        external_bytes = self._external_bytes()
+        with self._lock:
+            while self._resident_bytes() + external_bytes + incoming_bytes > self.memory_budget_bytes:
+                victim = next(
+                    (e for k, e in self._lru.items() if not e.pinned and k != keep),
+                    None,
+                )
+                if victim is None:
+                    logger.warning(
+                        f"모델 메모리 예산 초과 - 해제 가능한 모델 없음 "
+                        f"({(self._resident_bytes() + external_bytes) / MB:.0f}MB / {self.memory_budget_bytes / MB:.0f}MB)"
+                    )
+                    break
+                self._evict_locked(victim)
+                evicted = True
+        if evicted:
+            _release_memory()
+
+    def _evict_locked(self, entry: ModelEntry) -> bool:
+        if entry.model is None:
+            return False
+        logger.info(f"{entry.key} 모델 해제 (LRU, {(entry.size_bytes or 0) / MB:.1f}MB)")
+        entry.model = None
+        entry.state = "evicted"
+        self._lru.pop(entry.key, None)
+        self._evictions += 1
+        return True
+
+    def _resident_bytes(self) -> int:
+        return sum(e.size_bytes or 0 for e in self._lru.values())
+
+    def _external_bytes(self) -> int:
+        total = 0
+        for name, (resident_bytes, _) in self._external.items():
+            try:
+                total += resident_bytes()
+            except Exception as e:
+                logger.warning(f"{name} 상주 크기 확인 실패: {e}")
+        return total
+
+    # ==================== 보고 ====================
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """기본 버전 모델의 상태 (모델명 → 상태)"""
+        return {name: self.entry(name).to_dict() for name in self._defaults}
+
+    def report(self) -> Dict[str, Any]:
+        """상주 모델 / 크기 / 예산 보고"""
+        with self._lock:
+            resident: List[Dict[str, Any]] = [e.to_dict() for e in reversed(self._lru.values())]
+            resident_bytes = self._resident_bytes()
+        external_bytes = self._external_bytes()
+        return {
+            "budget_mb": self.memory_budget_bytes // MB or None,
+            "resident_mb": round((resident_bytes + external_bytes) / MB, 1),
+            "external_mb": round(external_bytes / MB, 1),
+            "process_rss_mb": round(current_rss_bytes() / MB, 1),
+            "process_memory_mb": process_memory(),
+            "evictions": self._evictions,
+            "resident": resident,
+            "external": {name: report() for name, (_, report) in self._external.items()},
+            "registered": sorted(self._entries),
+        }
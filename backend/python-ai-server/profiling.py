@@ -0,0 +1,157 @@
+"""
+K-MaaS 요청 단위 샘플링 프로파일러
+- X-Profile 헤더가 붙은 요청을 처리하는 동안 모든 스레드의 스택을 주기적으로 샘플링
+  (이벤트 루프 + 모델 실행기 스레드가 함께 잡힘)
+- 결과는 collapsed stack 형식 ("스레드;함수 (파일:줄);... 횟수") - flamegraph.pl / speedscope로 시각화
+- 허용 목록(IP/CIDR)에 있는 클라이언트만 사용 가능, 기본은 비활성
+- 동시에 처리 중인 다른 요청의 스택도 섞일 수 있음 (프로세스 전체 샘플링)
+"""
+import ipaddress
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("ai-server.profiling")
+
+
+class StackSampler:
+    """
+    백그라운드 스레드에서 sys._current_frames()를 interval 간격으로 수집
+
+    with StackSampler() as sampler:
+        ...
+    sampler.collapsed()
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "StackSampler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack: List[str] = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def collapsed(self, skip_idle: bool = True) -> str:
+        """collapsed stack 텍스트 (샘플 많은 순)"""
+        lines = []
+        for stack, count in self.samples.most_common():
+            # 작업 대기 중인 스레드(큐 대기, select)는 제외
+            if skip_idle and stack.rsplit(";", 1)[-1].startswith(("wait (threading.py", "select (selectors.py", "_worker (thread.py")):
+                continue
+            lines.append(f"{stack} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class Profiler:
+    """
+    X-Profile 요청 처리 정책
+
+    - allowlist: 허용 클라이언트 IP/CIDR 목록 (비어 있으면 비활성)
+    - directory: 저장 위치 (X-Profile: 1 → 파일 저장, X-Profile: inline → 응답 본문으로 반환)
+    """
+
+    def __init__(self, allowlist: str = "", directory: str = "/tmp/kmaas-profiles",
+                 interval_ms: float = 5.0, keep: int = 100):
+        self.networks = []
+        for item in filter(None, (part.strip() for part in allowlist.split(","))):
+            try:
+                self.networks.append(ipaddress.ip_network(item, strict=False))
+            except ValueError:
+                logger.warning(f"잘못된 PROFILE_ALLOWLIST 항목 무시: {item}")
+        self.directory = directory
+        self.interval = interval_ms / 1000
+        self.keep = keep
+
+    @classmethod
+    def from_env(cls) -> "Profiler":
+        return cls(
+            allowlist=os.getenv("PROFILE_ALLOWLIST", ""),
+            directory=os.getenv("PROFILE_DIR", "/tmp/kmaas-profiles"),
+            interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "5")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.networks)
+
+    def allowed(self, client_host: Optional[str]) -> bool:
+        if not self.enabled or not client_host:
+            return False
+        try:
+            address = ipaddress.ip_address(client_host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.networks)
+
+    def sampler(self) -> StackSampler:
+        return StackSampler(self.interval)
+
+    def save(self, name: str, sampler: StackSampler) -> str:
+        """collapsed stack 파일 저장 → 파일명 (오래된 파일은 keep개만 유지)"""
+        os.makedirs(self.directory, exist_ok=True)
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name(name)}.collapsed"
+        with open(os.path.join(self.directory, filename), "w") as f:
+            f.write(sampler.collapsed())
+
+        files = sorted(os.listdir(self.directory))
+        for old in files[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except OSError:
+                pass
+        return filename
+
+    def path(self, filename: str) -> Optional[str]:
+        """저장된 프로파일 경로 (디렉터리 밖 경로 차단)"""
+        if safe_name(filename) != filename:
+            return None
+        path = os.path.join(self.directory, filename)
+        return path if os.path.isfile(path) else None
+
+    def stats(self) -> Dict[str, object]:
+        return {"enabled": self.enabled, "allowlist": [str(n) for n in self.networks], "directory": self.directory}
+
+
+def safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", name)[:120]
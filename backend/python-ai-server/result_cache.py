@@ -0,0 +1,235 @@
+"""
+K-MaaS 인식 결과 캐시 (Content-Addressed)
+- 키: 이미지 바이트 해시 + 엔드포인트 + 파라미터
+- TTL 만료 + 최대 항목 수 초과 시 LRU 제거
+- 저장소 교체 가능: memory (워커별) / sqlite (/dev/shm 파일, gunicorn 워커 간 공유)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("ai-server.cache")
+
+
+def content_key(endpoint: str, data: bytes, **params: Any) -> str:
+    """요청 내용 기반 캐시 키 (sha256)"""
+    digest = hashlib.sha256()
+    digest.update(endpoint.encode())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    digest.update(data)
+    return f"{endpoint}:{digest.hexdigest()}"
+
+
+class MemoryStore:
+    """프로세스 로컬 LRU + TTL 저장소"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class SqliteStore:
+    """
+    SQLite 파일 저장소 (gunicorn 워커 간 공유)
+
+    기본 경로는 /dev/shm (메모리 기반 tmpfs) 이므로 디스크 I/O 없이 공유됩니다.
+    """
+
+    name = "sqlite"
+
+    # 몇 번의 쓰기마다 만료/초과 항목 정리
+    PRUNE_EVERY = 64
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self.evictions = 0
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_result_cache_accessed ON result_cache(accessed_at)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # 연결은 스레드(및 fork된 워커)별로 생성
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value FROM result_cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE result_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: float):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO result_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, value, now + ttl, now),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self._prune(conn, now)
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        """만료 항목 삭제 후 최대 항목 수를 넘는 오래된 항목 제거 (LRU)"""
+        conn.execute("DELETE FROM result_cache WHERE expires_at <= ?", (now,))
+        cursor = conn.execute(
+            "DELETE FROM result_cache WHERE key IN ("
+            " SELECT key FROM result_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self.evictions += max(0, cursor.rowcount)
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+
+
+class ResultCache:
+    """
+    인식 결과 캐시
+
+    - backend: sqlite (워커 간 공유) / memory (워커별) / off
+    - 저장소 오류는 캐시 미스로 처리하고 요청은 계속 진행
+    """
+
+    def __init__(self, backend: str = "sqlite", ttl: float = 300, max_entries: int = 2048,
+                 path: Optional[str] = None):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.store = None
+        if backend == "memory":
+            self.store = MemoryStore(max_entries)
+        elif backend == "sqlite":
+            path = path or os.path.join(
+                "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                "kmaas-result-cache.db",
+            )
+            try:
+                self.store = SqliteStore(path, max_entries)
+            except sqlite3.Error as e:
+                logger.warning(f"SQLite 캐시 초기화 실패 ({path}) - 메모리 캐시로 대체: {e}")
+                self.store = MemoryStore(max_entries)
+        elif backend != "off":
+            raise ValueError(f"알 수 없는 캐시 backend: {backend}")
+
+    @classmethod
+    def from_env(cls) -> "ResultCache":
+        return cls(
+            backend=os.getenv("RESULT_CACHE_BACKEND", "sqlite"),
+            ttl=float(os.getenv("RESULT_CACHE_TTL_S", "300")),
+            max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "2048")),
+            path=os.getenv("RESULT_CACHE_PATH") or None,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    make_key = staticmethod(content_key)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        try:
+            value = self.store.get(key)
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"캐시 조회 실패: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any]):
+        if not self.enabled:
+            return
+        try:
+            self.store.set(key, json.dumps(value, ensure_ascii=False), self.ttl)
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"캐시 저장 실패: {e}")
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """이벤트 루프를 막지 않는 조회 (저장소 잠금 대기 대비)"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any]):
+        await asyncio.get_running_loop().run_in_executor(None, self.set, key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        stats = {
+            "backend": self.store.name if self.store else "off",
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }
+        if self.store is not None:
+            try:
+                stats.update(entries=self.store.size(), max_entries=self.store.max_entries,
+                             evictions=self.store.evictions)
+            except sqlite3.Error:
+                pass
+        return stats
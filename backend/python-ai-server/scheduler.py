@@ -0,0 +1,238 @@
+"""
+K-MaaS 우선순위 클래스 / 가중 공정 큐잉(WFQ) 스케줄러
+- 라우트별 우선순위 클래스 (critical: 번호판 인식, normal: 탐지/음성, batch: 캡션/배경 제거/배치)
+- 모든 모델 호출(실행기, 마이크로 배치)은 워커 공용 슬롯을 받아야 실행
+- 클래스 간에는 가중치 비율로 CPU 시간을 나눔 (start-time fair queuing, 비용 = 모델별 평균 실행 시간)
+- 클래스별 동시 실행 상한: 하위 클래스가 모든 슬롯을 차지하지 못하게 해 critical 자리를 남겨 둠
+- 모델별 동시 실행 수도 여기서 제한하므로 실행기 스레드 풀에는 대기 작업이 쌓이지 않음
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from deadline import DeadlineExceeded, current_deadline
+
+logger = logging.getLogger("ai-server.scheduler")
+
+# 현재 요청의 우선순위 클래스 (미들웨어에서 라우트별로 설정)
+current_priority: contextvars.ContextVar[str] = contextvars.ContextVar("current_priority", default="normal")
+
+# 기본 클래스 정의 "이름:가중치:동시 실행 상한(0 = 슬롯 수)" - 앞쪽일수록 높은 우선순위
+DEFAULT_CLASSES = "critical:8:0,normal:2:1,batch:1:1"
+
+# 기본 라우트 → 클래스 (등록되지 않은 라우트는 normal)
+DEFAULT_ROUTES = ",".join([
+    "/api/v1/license-plate/detect=critical",
+    "/api/v1/license-plate/detect/batch=batch",
+    "/detect=normal",
+    "/transcribe=normal",
+    "/transcribe/long=batch",
+    "/remove-background=batch",
+    "/caption=batch",
+])
+
+
+@dataclass
+class PriorityClass:
+    name: str
+    weight: float
+    max_concurrency: int
+    rank: int  # 0이 가장 높음 (가상 시각이 같으면 높은 클래스부터)
+
+
+class _Waiter:
+    __slots__ = ("key", "cls", "future", "enqueued_at", "deadline", "cost")
+
+    def __init__(self, key: str, cls: PriorityClass, future: asyncio.Future, deadline, cost: float):
+        self.key = key
+        self.cls = cls
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        self.deadline = deadline
+        self.cost = cost
+
+
+class WeightedFairScheduler:
+    """
+    슬롯 기반 가중 공정 큐잉 (이벤트 루프 단위)
+
+    - slots: 동시에 실행되는 모델 호출 수 (워커 전체)
+    - classes: 우선순위 클래스 (가중치, 동시 실행 상한)
+    - routes: 라우트 경로 → 클래스 이름
+
+    슬롯이 비면 대기 중인 클래스 가운데 가상 시작 시각(start tag)이 가장 작은 클래스를 고릅니다.
+    클래스의 가상 시각은 실행할 때마다 (모델 평균 실행 시간 / 가중치)만큼 전진하므로
+    가중치 8:1이면 critical이 batch보다 CPU 시간을 8배 더 받습니다.
+    """
+
+    # 모델별 실행 시간 지수 이동 평균 가중치
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, slots: int = 3, classes: str = DEFAULT_CLASSES, routes: str = DEFAULT_ROUTES,
+                 enabled: bool = True):
+        self.slots = max(1, slots)
+        self.enabled = enabled
+        self.classes: Dict[str, PriorityClass] = {}
+        for rank, spec in enumerate(filter(None, (part.strip() for part in classes.split(",")))):
+            name, weight, cap = (spec.split(":") + ["1", "0"])[:3]
+            self.classes[name] = PriorityClass(name, max(float(weight), 0.01), int(cap) or self.slots, rank)
+        self.routes: Dict[str, str] = {}
+        for spec in filter(None, (part.strip() for part in routes.split(","))):
+            path, _, name = spec.partition("=")
+            if name not in self.classes:
+                logger.warning(f"알 수 없는 우선순위 클래스 무시: {spec}")
+                continue
+            self.routes[path] = name
+
+        self._capacity: Dict[str, int] = {}
+        self._waiting: List[_Waiter] = []
+        self._running = 0
+        self._running_by_class: Dict[str, int] = {name: 0 for name in self.classes}
+        self._running_by_key: Dict[str, int] = {}
+        self._cost_ms: Dict[str, float] = {}
+
+        # 가상 시각 (SFQ): 전역 시각 = 마지막으로 실행을 시작한 작업의 start tag
+        self._virtual_time = 0.0
+        self._class_finish: Dict[str, float] = {name: 0.0 for name in self.classes}
+
+        # 통계
+        self._granted: Dict[str, int] = {name: 0 for name in self.classes}
+        self._expired: Dict[str, int] = {name: 0 for name in self.classes}
+        self._wait_ewma_ms: Dict[str, float] = {name: 0.0 for name in self.classes}
+
+    @classmethod
+    def from_env(cls) -> "WeightedFairScheduler":
+        return cls(
+            slots=int(os.getenv("SCHEDULER_SLOTS", "3")),
+            classes=os.getenv("SCHEDULER_CLASSES") or DEFAULT_CLASSES,
+            routes=os.getenv("SCHEDULER_ROUTES") or DEFAULT_ROUTES,
+            enabled=os.getenv("SCHEDULER_ENABLED", "true").lower() == "true",
+        )
+
+    def register(self, key: str, capacity: int):
+        """모델(실행기)별 동시 실행 수 등록"""
+        self._capacity[key] = max(1, capacity)
+        self._running_by_key.setdefault(key, 0)
+
+    def priority_for(self, path: str) -> str:
+        return self.routes.get(path, "normal" if "normal" in self.classes else next(iter(self.classes)))
+
+    # ==================== 슬롯 ====================
+
+    @asynccontextmanager
+    async def slot(self, key: str, priority: Optional[str] = None):
+        """
+        모델 호출 슬롯 (async with scheduler.slot("yolo"): ...)
+
+        priority를 생략하면 현재 요청의 클래스를 사용합니다.
+        기다리는 동안 요청 마감이 지나면 DeadlineExceeded로 빠집니다.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        cls = self.classes.get(priority or current_priority.get()) or self.classes[self.priority_for("")]
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(key, cls, loop.create_future(), current_deadline.get(), self._cost_ms.get(key, 10.0))
+        self._waiting.append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except BaseException:
+            if waiter in self._waiting:
+                self._waiting.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                # 슬롯을 받은 직후 취소됨 → 반납
+                self._release(waiter, 0.0)
+            raise
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(waiter, (time.perf_counter() - started) * 1000)
+
+    def _eligible(self, waiter: _Waiter) -> bool:
+        return (self._running_by_class[waiter.cls.name] < waiter.cls.max_concurrency
+                and self._running_by_key.get(waiter.key, 0) < self._capacity.get(waiter.key, self.slots))
+
+    def _dispatch(self):
+        while self._running < self.slots and self._waiting:
+            # 대기 중 만료된 요청 정리
+            for waiter in [w for w in self._waiting if w.future.done() or (w.deadline and w.deadline.expired)]:
+                self._waiting.remove(waiter)
+                if not waiter.future.done():
+                    self._expired[waiter.cls.name] += 1
+                    waiter.future.set_exception(DeadlineExceeded(waiter.deadline.reason, waiter.key))
+
+            # 클래스별 첫 실행 가능 작업 (클래스 안에서는 도착 순서)
+            heads: Dict[str, _Waiter] = {}
+            for waiter in self._waiting:
+                if waiter.cls.name not in heads and self._eligible(waiter):
+                    heads[waiter.cls.name] = waiter
+            if not heads:
+                return
+
+            # start tag = max(전역 가상 시각, 클래스의 마지막 finish tag) 이 가장 작은 클래스
+            def start_tag(w: _Waiter) -> float:
+                return max(self._virtual_time, self._class_finish[w.cls.name])
+
+            chosen = min(heads.values(), key=lambda w: (start_tag(w), w.cls.rank))
+            tag = start_tag(chosen)
+            self._virtual_time = tag
+            self._class_finish[chosen.cls.name] = tag + chosen.cost / chosen.cls.weight
+
+            self._waiting.remove(chosen)
+            self._running += 1
+            self._running_by_class[chosen.cls.name] += 1
+            self._running_by_key[chosen.key] = self._running_by_key.get(chosen.key, 0) + 1
+            self._granted[chosen.cls.name] += 1
+            wait_ms = (time.perf_counter() - chosen.enqueued_at) * 1000
+            self._wait_ewma_ms[chosen.cls.name] += self.EWMA_ALPHA * (wait_ms - self._wait_ewma_ms[chosen.cls.name])
+            chosen.future.set_result(None)
+
+    def _release(self, waiter: _Waiter, elapsed_ms: float):
+        self._running -= 1
+        self._running_by_class[waiter.cls.name] -= 1
+        self._running_by_key[waiter.key] -= 1
+        if elapsed_ms:
+            previous = self._cost_ms.get(waiter.key)
+            self._cost_ms[waiter.key] = (
+                elapsed_ms if previous is None else previous + self.EWMA_ALPHA * (elapsed_ms - previous)
+            )
+        self._dispatch()
+
+    # ==================== 통계 ====================
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "slots": self.slots,
+            "running": self._running,
+            "classes": {
+                name: {
+                    "weight": cls.weight,
+                    "max_concurrency": cls.max_concurrency,
+                    "running": self._running_by_class[name],
+                    "queued": sum(1 for w in self._waiting if w.cls.name == name),
+                    "granted": self._granted[name],
+                    "expired": self._expired[name],
+                    "avg_wait_ms": round(self._wait_ewma_ms[name], 2),
+                }
+                for name, cls in self.classes.items()
+            },
+            "models": {
+                key: {
+                    "capacity": capacity,
+                    "running": self._running_by_key.get(key, 0),
+                    "avg_cost_ms": round(self._cost_ms.get(key, 0.0), 2),
+                }
+                for key, capacity in self._capacity.items()
+            },
+            "routes": self.routes,
+        }
@@ -0,0 +1,114 @@
+"""
+K-MaaS 동일 요청 병합 (Single-Flight)
+- 같은 키(엔드포인트 + 파라미터 + 내용 해시)의 요청이 처리 중이면 새로 추론하지 않고
+  진행 중인 결과를 함께 기다림 (카메라/Spring 재시도가 첫 요청 처리 중에 도착하는 경우)
+- 결과 캐시와 달리 완료된 결과는 보관하지 않음: 동시에 진행 중인 중복만 병합
+- 먼저 온 요청의 연결이 끊겨도 계산은 계속되어 뒤따르는 요청에 전달
+  (공유 작업의 마감은 기다리는 요청 중 가장 늦은 것, 모두 끊기거나 만료되어야 중단)
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from deadline import DeadlineGroup, current_deadline
+
+logger = logging.getLogger("ai-server.singleflight")
+
+
+class CoalesceTimeoutError(Exception):
+    """병합된 요청이 진행 중인 결과를 제한 시간 내에 받지 못함"""
+
+    def __init__(self, key: str, timeout: float):
+        self.key = key
+        self.timeout = timeout
+        super().__init__(f"동일 요청 처리 대기 시간 초과 ({timeout:g}초)")
+
+
+class SingleFlight:
+    """
+    키별 진행 중 작업 테이블 (이벤트 루프 단위)
+
+    - timeout: 병합된 요청이 기다리는 최대 시간 (초, 0 = 제한 없음)
+    - enabled=False 이면 병합 없이 그대로 실행
+    """
+
+    def __init__(self, timeout: float = 30.0, enabled: bool = True):
+        self.timeout = timeout
+        self.enabled = enabled
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._deadlines: Dict[str, DeadlineGroup] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls) -> "SingleFlight":
+        return cls(
+            timeout=float(os.getenv("SINGLE_FLIGHT_TIMEOUT_S", "30")),
+            enabled=os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true",
+        )
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        fn() 실행 또는 진행 중인 같은 키의 결과 대기 → (결과, 병합 여부)
+
+        예외도 병합된 요청 모두에게 그대로 전달됩니다.
+        """
+        if not self.enabled:
+            return await fn(), False
+
+        task = self._inflight.get(key)
+        shared = task is not None
+        deadline = current_deadline.get()
+        if shared:
+            self.coalesced += 1
+            if deadline is not None and key in self._deadlines:
+                self._deadlines[key].join(deadline)
+        else:
+            self.leaders += 1
+            group = DeadlineGroup([deadline]) if deadline is not None else None
+            if group is not None:
+                self._deadlines[key] = group
+            task = asyncio.ensure_future(self._run_shared(fn, group))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+
+        # shield: 이 요청이 취소되거나 시간 초과되어도 공유 작업은 계속 진행
+        try:
+            if shared and self.timeout:
+                return await asyncio.wait_for(asyncio.shield(task), self.timeout), True
+            return await asyncio.shield(task), shared
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise CoalesceTimeoutError(key, self.timeout) from None
+
+    @staticmethod
+    async def _run_shared(fn: Callable[[], Awaitable[Any]], group: Optional[DeadlineGroup]) -> Any:
+        """공유 작업 실행 - 요청별 마감 대신 병합된 요청 전체의 마감을 적용"""
+        if group is not None:
+            current_deadline.set(group)
+        return await fn()
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._deadlines.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "timeout_s": self.timeout,
+            "inflight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else None,
+        }
@@ -0,0 +1,124 @@
+"""
+llm_client.ChatClient 테스트 (httpx.MockTransport - 네트워크 없이 실행)
+
+    cd backend/python-ai-server && python -m pytest
+"""
+import json
+
+import httpx
+import pytest
+
+from llm_client import ChatAPIError, ChatClient
+
+pytestmark = pytest.mark.anyio
+
+MESSAGES = [{"role": "user", "content": "안녕"}]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def make_client(handler, **kwargs) -> ChatClient:
+    return ChatClient(
+        base_url="http://llm.test/v1/", api_key="sk-test", model="test-model",
+        http2=False, transport=httpx.MockTransport(handler), **kwargs,
+    )
+
+
+def sse(*lines: str) -> bytes:
+    return "".join(f"{line}\n" for line in lines).encode()
+
+
+async def test_complete_reuses_pooled_client():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={
+            "model": "test-model",
+            "choices": [{"message": {"role": "assistant", "content": "반갑습니다"}}],
+        })
+
+    chat = make_client(handler)
+    first = await chat.complete(MESSAGES, max_tokens=16)
+    pooled = chat.client
+    second = await chat.complete(MESSAGES)
+
+    assert first["choices"][0]["message"]["content"] == "반갑습니다"
+    assert second["model"] == "test-model"
+    assert chat.client is pooled
+    assert chat.stats()["connected"]
+
+    assert [str(r.url) for r in requests] == ["http://llm.test/v1/chat/completions"] * 2
+    assert requests[0].headers["Authorization"] == "Bearer sk-test"
+    payload = json.loads(requests[0].content)
+    assert payload == {"model": "test-model", "messages": MESSAGES, "max_tokens": 16}
+
+    await chat.aclose()
+    assert not chat.stats()["connected"]
+    assert chat.client is not pooled
+
+
+async def test_complete_error_message():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(401, json={"error": {"message": "Incorrect API key"}})
+
+    chat = make_client(handler)
+    with pytest.raises(ChatAPIError, match="Incorrect API key"):
+        await chat.complete(MESSAGES)
+    await chat.aclose()
+
+
+async def test_stream_parses_sse_until_done():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, content=sse(
+            ": keep-alive",
+            'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+            "",
+            'data: {"choices": [{"delta": {"content": "반갑"}}]}',
+            "",
+            'data:{"choices": [{"delta": {"content": "습니다"}}]}',
+            'data: {"choices": [{"delta": {}, "finish_reason": "stop"}]}',
+            "data: [DONE]",
+            'data: {"choices": [{"delta": {"content": "무시"}}]}',
+        ))
+
+    chat = make_client(handler)
+    tokens = [token async for token in chat.stream(MESSAGES, temperature=0.2)]
+
+    assert tokens == ["반갑", "습니다"]
+    payload = json.loads(requests[0].content)
+    assert payload["stream"] is True
+    assert payload["temperature"] == 0.2
+    await chat.aclose()
+
+
+async def test_stream_error_status():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(500, content=b"upstream unavailable")
+
+    chat = make_client(handler)
+    with pytest.raises(ChatAPIError, match="upstream unavailable"):
+        async for _ in chat.stream(MESSAGES):
+            pass
+    await chat.aclose()
+
+
+async def test_timeouts_map_to_chat_api_error():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    chat = make_client(handler, timeout=12.5)
+    assert chat.client.timeout == httpx.Timeout(12.5, connect=5.0)
+
+    with pytest.raises(ChatAPIError, match="ReadTimeout"):
+        await chat.complete(MESSAGES)
+    with pytest.raises(ChatAPIError, match="ReadTimeout"):
+        async for _ in chat.stream(MESSAGES):
+            pass
+    await chat.aclose()
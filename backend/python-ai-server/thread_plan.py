@@ -0,0 +1,164 @@
+"""
+K-MaaS CPU 스레드 계획
+- 컨테이너 CPU 할당량(cgroup v1/v2)과 CPU affinity로 실제 사용 가능한 코어 수 계산
+- gunicorn 워커 수와 동시에 실행되는 모델 호출 수(스케줄러 슬롯)로 나눠 라이브러리별 스레드 수 결정
+- Whisper 프로세스 풀(장시간 음성)이 쓰는 코어는 먼저 제외 (공유 풀은 호스트에 한 번, 아니면 워커마다)
+  (워커 4개 × PyTorch/OpenCV/BLAS 기본 스레드 = 코어 수 → 과다 구독, 문맥 전환 폭주)
+- BLAS/OpenMP 환경 변수는 numpy/torch import 전에, torch/cv2 설정은 워커 시작 시 적용
+"""
+import logging
+import math
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("ai-server.threads")
+
+# 라이브러리가 import 시점에 읽는 스레드 수 환경 변수
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+# 워커 공용 스케줄러(cpu_scheduler) 슬롯을 받아 실행되는 실행기 (main.py와 같은 목록, 기본 동시 실행 수 1)
+# 계획은 main.py가 실행기를 만들기 전에 세우므로 같은 환경 변수를 직접 읽음
+SCHEDULED_EXECUTORS = ("yolo", "ocr", "whisper", "rembg", "blip")
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """컨테이너 CPU 할당량 (코어 단위, 제한 없으면 None)"""
+    # cgroup v2: "max 100000" 또는 "200000 100000"
+    cpu_max = _read("/sys/fs/cgroup/cpu.max")
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    # cgroup v1
+    quota = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") or _read("/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_quota_us")
+    period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us") or _read("/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def available_cpus() -> Dict[str, Any]:
+    """affinity / cgroup 할당량 / 실제 사용 가능 코어 수"""
+    try:
+        affinity = len(os.sched_getaffinity(0))
+    except AttributeError:
+        affinity = os.cpu_count() or 1
+    quota = cgroup_cpu_limit()
+    # 할당량 2.5코어 → 2코어 (스레드가 할당량을 넘으면 CFS 스로틀링)
+    effective = min(affinity, max(1, math.floor(quota))) if quota else affinity
+    return {"affinity": affinity, "cgroup_quota": quota, "effective": effective}
+
+
+def concurrent_model_calls() -> int:
+    """워커 안에서 동시에 실행될 수 있는 모델 호출 수 (스케줄러 슬롯과 실행기 동시 실행 수 기준)"""
+    capacity = sum(max(1, int(os.getenv(f"{name.upper()}_CONCURRENCY", "1"))) for name in SCHEDULED_EXECUTORS)
+    if os.getenv("SCHEDULER_ENABLED", "true").lower() != "true":
+        return capacity
+    return min(max(1, int(os.getenv("SCHEDULER_SLOTS", "3"))), capacity)
+
+
+@dataclass
+class ThreadPlan:
+    """
+    프로세스(워커)별 스레드 배분
+
+    - cpus: 컨테이너에서 사용 가능한 코어 수
+    - workers: gunicorn 워커 수 (워커마다 같은 계획 적용)
+    - streams: 워커 안에서 동시에 실행되는 모델 호출 수
+      (스케줄러 슬롯 수, 단 실행기별 동시 실행 수 합계를 넘지 않음 / 스케줄러를 끄면 합계)
+      PyTorch intra-op 풀은 호출 스레드마다 따로 생기므로 동시 호출 수로 나눔
+    - pool_processes / pool_threads: Whisper 프로세스 풀 크기 (pool_shared: 호스트에 하나)
+    """
+    cpus: int
+    workers: int
+    streams: int
+    cgroup_quota: Optional[float] = None
+    affinity: Optional[int] = None
+    pool_processes: int = 0
+    pool_threads: int = 1
+    pool_shared: bool = True
+    reserved_cpus: int = field(init=False)
+    per_worker: int = field(init=False)
+    torch_threads: int = field(init=False)
+    torch_interop_threads: int = 1
+    cv2_threads: int = field(init=False)
+    blas_threads: int = field(init=False)
+    applied: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self):
+        # 풀 프로세스 스레드가 쓸 코어를 빼고 워커에 배분 (풀이 코어를 다 쓰더라도 워커당 최소 1)
+        pools = 1 if self.pool_shared else max(1, self.workers)
+        self.reserved_cpus = min(self.cpus, self.pool_processes * self.pool_threads * pools)
+        self.per_worker = max(1, (self.cpus - self.reserved_cpus) // max(1, self.workers))
+        self.torch_threads = max(1, self.per_worker // max(1, self.streams))
+        # OpenCV는 EasyOCR 전처리(작은 번호판 크롭)에만 쓰이므로 병렬화 이득이 작음
+        self.cv2_threads = 1
+        self.blas_threads = self.torch_threads
+
+    @classmethod
+    def from_env(cls) -> "ThreadPlan":
+        cpus = available_cpus()
+        override = os.getenv("THREAD_PLAN_CPUS")
+        streams = concurrent_model_calls()
+        return cls(
+            cpus=int(override) if override else cpus["effective"],
+            workers=int(os.getenv("WORKERS", "1")),
+            streams=streams,
+            cgroup_quota=cpus["cgroup_quota"],
+            affinity=cpus["affinity"],
+            pool_processes=int(os.getenv("WHISPER_PROCESSES", "2")),
+            pool_threads=int(os.getenv("WHISPER_PROCESS_THREADS", "1")),
+            # gunicorn.conf가 공유 풀 주소를 설정하면 호스트에 하나, 없으면(단독 실행) 프로세스마다
+            pool_shared=bool(os.getenv("WHISPER_POOL_SOCKET")) or int(os.getenv("WORKERS", "1")) <= 1,
+        )
+
+    @staticmethod
+    def enabled() -> bool:
+        return os.getenv("THREAD_PLAN_ENABLED", "true").lower() == "true"
+
+    def apply_env(self):
+        """BLAS/OpenMP 스레드 환경 변수 설정 (numpy/torch import 전, 명시된 값은 유지)"""
+        for name in THREAD_ENV_VARS:
+            os.environ.setdefault(name, str(self.blas_threads))
+
+    def apply_runtime(self):
+        """현재 프로세스의 torch / cv2 스레드 수 설정 (워커마다 호출)"""
+        applied: Dict[str, Any] = {"pid": os.getpid()}
+        try:
+            import torch
+            torch.set_num_threads(self.torch_threads)
+            try:
+                torch.set_num_interop_threads(self.torch_interop_threads)
+            except RuntimeError:
+                # 병렬 작업이 한 번이라도 실행된 뒤(preload 워밍업)에는 변경 불가 → fork 전 값 유지
+                pass
+            applied["torch"] = torch.get_num_threads()
+            applied["torch_interop"] = torch.get_num_interop_threads()
+        except ImportError:
+            applied["torch"] = None
+        try:
+            import cv2
+            cv2.setNumThreads(self.cv2_threads)
+            applied["cv2"] = cv2.getNumThreads()
+        except ImportError:
+            applied["cv2"] = None
+        applied["env"] = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+        self.applied = applied
+        logger.info(
+            f"스레드 계획 적용 - 코어 {self.cpus} (Whisper 풀 {self.reserved_cpus} 제외) / 워커 {self.workers} / 동시 호출 {self.streams} "
+            f"→ torch {applied['torch']}, cv2 {applied['cv2']}, BLAS {self.blas_threads}"
+        )
+
+    def report(self) -> Dict[str, Any]:
+        return asdict(self)
@@ -0,0 +1,103 @@
+"""
+K-MaaS 지연 시간 등급(tier)별 모델 선택 / 부하 시 자동 강등
+- 요청별 tier: fast / standard / accurate (생략 시 standard = 기존 기본 모델)
+- 모델 계열별 tier → 변형 매핑 (예: YOLO fast=yolov8n, accurate=yolov8s / Whisper fast=tiny, accurate=small)
+- 실행기 예상 대기 시간이 임계값을 넘으면 fast로 강등하고 실제 사용한 tier를 응답에 표시
+  (피크에는 지연 예산 안에서, 여유 시간에는 정확도 우선)
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Literal, Optional, get_args
+
+logger = logging.getLogger("ai-server.tiers")
+
+# 빠른 순서 (엔드포인트 파라미터 타입으로도 사용 → 잘못된 값은 422)
+Tier = Literal["fast", "standard", "accurate"]
+TIERS = get_args(Tier)
+DEFAULT_TIER = "standard"
+
+
+class UnknownTierError(ValueError):
+    """지원하지 않는 tier 값"""
+
+    def __init__(self, tier: str):
+        self.tier = tier
+        super().__init__(f"알 수 없는 tier: {tier} (사용 가능: {', '.join(TIERS)})")
+
+
+@dataclass
+class TierChoice:
+    """선택된 tier (requested: 요청 값, degraded: 부하로 강등됨)"""
+    tier: str
+    version: str
+    requested: str
+    degraded: bool = False
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"X-Model-Tier": self.tier}
+        if self.degraded:
+            headers["X-Tier-Degraded"] = self.requested
+        return headers
+
+
+class TierPolicy:
+    """
+    모델 계열 하나의 tier 정책
+
+    - variants: tier → 레지스트리 버전 (같은 버전을 여러 tier가 공유해도 됨)
+    - executor: 예상 대기 시간을 읽을 ModelExecutor
+    - degrade_wait_ms: 예상 대기 시간이 이 값을 넘으면 fast로 강등 (0 = 강등 안 함)
+    """
+
+    def __init__(self, name: str, variants: Dict[str, str], executor, degrade_wait_ms: float = 0):
+        missing = [tier for tier in TIERS if tier not in variants]
+        if missing:
+            raise ValueError(f"{name} tier 변형 누락: {', '.join(missing)}")
+        self.name = name
+        self.variants = variants
+        self.executor = executor
+        self.degrade_wait_ms = degrade_wait_ms
+        self._chosen: Dict[str, int] = {tier: 0 for tier in TIERS}
+        self._degraded = 0
+
+    @staticmethod
+    def parse_variants(spec: str, defaults: Dict[str, str]) -> Dict[str, str]:
+        """'fast=yolov8n.pt,accurate=yolov8s.pt' → 기본값에 덮어쓴 tier 매핑"""
+        variants = dict(defaults)
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            tier, _, value = item.partition("=")
+            if tier not in TIERS or not value:
+                logger.warning(f"잘못된 tier 매핑 무시: {item}")
+                continue
+            variants[tier] = value
+        return variants
+
+    def select(self, requested: Optional[str] = None) -> TierChoice:
+        """요청 tier + 현재 부하 → 사용할 tier"""
+        requested = requested or DEFAULT_TIER
+        if requested not in TIERS:
+            raise UnknownTierError(requested)
+
+        tier = requested
+        # fast 변형이 요청 변형과 같으면 강등해도 이득이 없으므로 그대로
+        if (self.degrade_wait_ms and self.variants["fast"] != self.variants[tier]
+                and self.executor.estimated_wait_ms() > self.degrade_wait_ms):
+            tier = "fast"
+        choice = TierChoice(tier, self.variants[tier], requested, degraded=tier != requested)
+
+        self._chosen[tier] += 1
+        if choice.degraded:
+            self._degraded += 1
+            logger.info(f"{self.name} tier 강등 - {requested} → {tier} "
+                        f"(예상 대기 {self.executor.estimated_wait_ms():.0f}ms > {self.degrade_wait_ms:.0f}ms)")
+        return choice
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "variants": self.variants,
+            "degrade_wait_ms": self.degrade_wait_ms,
+            "estimated_wait_ms": round(self.executor.estimated_wait_ms(), 2),
+            "chosen": dict(self._chosen),
+            "degraded": self._degraded,
+        }
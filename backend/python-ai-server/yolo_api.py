@@ -45,9 +45,9 @@ def load_yolo_model():
     global yolo_model
     if yolo_model is None:
         try:
-            from ultralytics import YOLO
+            from yolo_backend import load_yolo
             logger.info("YOLO 모델 로딩 중...")
-            yolo_model = YOLO('yolov8n.pt')  # nano 모델 (가볍고 빠름)
+            yolo_model = load_yolo()  # 기본 nano 모델, YOLO_BACKEND로 onnx/openvino 선택
             logger.info("YOLO 모델 로드 완료!")
         except Exception as e:
             logger.error(f"YOLO 모델 로드 실패: {e}")
@@ -0,0 +1,194 @@
+"""
+K-MaaS YOLO 추론 백엔드 선택
+- torch (기본): ultralytics PyTorch 가중치 (.pt)
+- onnx: ONNX Runtime CPU (선택적으로 INT8 양자화)
+- openvino: OpenVINO IR (선택적으로 NNCF INT8 양자화)
+
+ONNX / OpenVINO 파일은 ultralytics exporter로 최초 1회 생성해 YOLO_EXPORT_DIR에 보관하고,
+로드는 모두 ultralytics.YOLO()를 거치므로 Results(boxes, names) 형식과 후처리(NMS)가 동일합니다.
+"""
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger("ai-server.yolo-backend")
+
+BACKENDS = ("torch", "onnx", "openvino")
+# 기본 입력 크기 (다른 입력 크기는 레지스트리 버전에 크기를 붙여 구분)
+DEFAULT_IMGSZ = 640
+
+
+@dataclass
+class YoloBackendConfig:
+    """
+    - model_path: .pt 가중치 또는 이미 변환된 .onnx 파일 / *_openvino_model 디렉터리
+    - backend: 비어 있으면 model_path 확장자로 판단
+    - int8: INT8 양자화 (onnx: ONNX Runtime 양자화, openvino: NNCF)
+    - calibration: INT8 보정 데이터 (onnx: 이미지 디렉터리 → 정적 양자화, 없으면 동적 양자화 /
+      openvino: ultralytics 데이터셋 yaml)
+    - imgsz: 추론 / 변환 입력 크기 (기본 YOLO_INPUT_SIZE, fast tier는 더 작게)
+    """
+    model_path: str = "yolov8n.pt"
+    backend: str = ""
+    int8: bool = False
+    calibration: Optional[str] = None
+    imgsz: int = DEFAULT_IMGSZ
+    export_dir: str = os.path.join(tempfile.gettempdir(), "kmaas-yolo")
+
+    @classmethod
+    def from_env(cls, imgsz: int = DEFAULT_IMGSZ) -> "YoloBackendConfig":
+        return cls(
+            model_path=os.getenv("YOLO_MODEL_PATH") or "yolov8n.pt",
+            backend=os.getenv("YOLO_BACKEND", "").lower(),
+            int8=os.getenv("YOLO_INT8", "false").lower() == "true",
+            calibration=os.getenv("YOLO_CALIBRATION_DATA") or None,
+            imgsz=imgsz,
+            # models 디렉터리는 읽기 전용으로 마운트되므로 변환 결과는 별도 디렉터리에 보관
+            export_dir=os.getenv("YOLO_EXPORT_DIR") or os.path.join(tempfile.gettempdir(), "kmaas-yolo"),
+        )
+
+    def resolved_backend(self) -> str:
+        if self.backend:
+            if self.backend not in BACKENDS:
+                raise ValueError(f"알 수 없는 YOLO_BACKEND: {self.backend} (사용 가능: {', '.join(BACKENDS)})")
+            return self.backend
+        if self.model_path.endswith(".onnx"):
+            return "onnx"
+        if self.model_path.rstrip("/").endswith("_openvino_model"):
+            return "openvino"
+        return "torch"
+
+    @property
+    def version(self) -> str:
+        """레지스트리 버전 문자열 (예: yolov8n-onnx-int8, 입력 480이면 yolov8n-480)"""
+        stem = os.path.splitext(os.path.basename(self.model_path.rstrip("/")))[0].replace("_openvino_model", "")
+        if self.imgsz != DEFAULT_IMGSZ:
+            stem = f"{stem}-{self.imgsz}"
+        backend = self.resolved_backend()
+        if backend == "torch":
+            return stem
+        return f"{stem}-{backend}" + ("-int8" if self.int8 else "")
+
+
+def _export_path(config: YoloBackendConfig, backend: str) -> str:
+    stem = os.path.splitext(os.path.basename(config.model_path))[0]
+    suffix = f"-{config.imgsz}" + ("-int8" if config.int8 else "")
+    if backend == "onnx":
+        return os.path.join(config.export_dir, f"{stem}{suffix}.onnx")
+    return os.path.join(config.export_dir, f"{stem}{suffix}_openvino_model")
+
+
+def _quantize_onnx(source: str, target: str, calibration: Optional[str], imgsz: int):
+    """
+    ONNX INT8 양자화
+
+    보정 이미지 디렉터리가 있으면 정적(QDQ) 양자화로 활성값까지 INT8,
+    없으면 가중치만 INT8인 동적 양자화 (정확도 손실은 적지만 속도 이득도 작음)
+    """
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    if not calibration or not os.path.isdir(calibration):
+        quantize_dynamic(source, target, weight_type=QuantType.QUInt8)
+        return
+
+    import numpy as np
+    import onnxruntime
+    from onnxruntime.quantization import CalibrationDataReader
+    from PIL import Image
+
+    input_name = onnxruntime.InferenceSession(source, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    images = sorted(
+        os.path.join(calibration, name) for name in os.listdir(calibration)
+        if name.lower().endswith((".jpg", ".jpeg", ".png"))
+    )[:200]
+
+    class ImageReader(CalibrationDataReader):
+        def __init__(self):
+            self._images = iter(images)
+
+        def get_next(self):
+            path = next(self._images, None)
+            if path is None:
+                return None
+            image = Image.open(path).convert("RGB").resize((imgsz, imgsz))
+            array = np.asarray(image, dtype=np.float32).transpose(2, 0, 1)[None] / 255.0
+            return {input_name: array}
+
+    quantize_static(
+        source, target, ImageReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+
+
+def export_model(config: YoloBackendConfig) -> str:
+    """
+    .pt → ONNX / OpenVINO 변환 (이미 있으면 재사용) → 변환된 모델 경로
+
+    배치 크기가 요청마다 달라지므로(마이크로 배칭) 동적 배치 축으로 변환합니다.
+    워커들이 동시에 시작해도 파일 잠금으로 한 번만 변환합니다.
+    """
+    backend = config.resolved_backend()
+    target = _export_path(config, backend)
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(config.export_dir, exist_ok=True)
+    with open(os.path.join(config.export_dir, ".export.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(target):
+            _export_locked(config, backend, target)
+    return target
+
+
+def _export_locked(config: YoloBackendConfig, backend: str, target: str):
+    from ultralytics import YOLO
+
+    # exporter는 가중치 옆에 결과를 쓰므로 쓰기 가능한 변환 디렉터리로 복사해 변환
+    weights = os.path.join(config.export_dir, os.path.basename(config.model_path))
+    if os.path.exists(config.model_path) and not os.path.exists(weights):
+        shutil.copy(config.model_path, weights)
+    elif not os.path.exists(config.model_path):
+        weights = os.path.basename(config.model_path)
+
+    logger.info(f"YOLO {backend} 변환 시작 - {config.model_path} → {target}")
+    model = YOLO(weights)
+
+    if backend == "onnx":
+        exported = model.export(format="onnx", imgsz=config.imgsz, dynamic=True, simplify=True)
+        if config.int8:
+            _quantize_onnx(exported, target, config.calibration, config.imgsz)
+        else:
+            shutil.move(exported, target)
+    else:
+        kwargs = {"int8": True, "data": config.calibration} if config.int8 and config.calibration else {"int8": config.int8}
+        exported = model.export(format="openvino", imgsz=config.imgsz, dynamic=True, **kwargs)
+        shutil.move(exported, target)
+
+    logger.info(f"YOLO {backend} 변환 완료 - {target}")
+
+
+def load_yolo(config: Optional[YoloBackendConfig] = None):
+    """설정된 백엔드로 YOLO 모델 로드 (ultralytics.YOLO 인터페이스 동일)"""
+    from ultralytics import YOLO
+
+    config = config or YoloBackendConfig.from_env()
+    backend = config.resolved_backend()
+
+    path = config.model_path
+    if path.endswith(".pt") and not os.path.exists(path):
+        # 마운트된 가중치가 없으면 ultralytics 기본 모델명으로 (자동 다운로드)
+        logger.warning(f"{path} 없음 - {os.path.basename(path)} 사용")
+        path = os.path.basename(path)
+    if backend != "torch" and path.endswith(".pt"):
+        path = export_model(config)
+
+    logger.info(f"YOLO 로드 - backend={backend}, int8={config.int8}, path={path}")
+    # 변환된 모델은 task를 메타데이터에서 읽지 못할 수 있으므로 명시
+    return YOLO(path, task="detect") if backend != "torch" else YOLO(path)
@@ -41,11 +41,14 @@ public class AiService {
     private static final Logger log = LoggerFactory.getLogger(AiService.class);
 
     private final WebClient webClient;
+    private final int readTimeout;
 
     public AiService(@Value("${ai.python.server.url:http://localhost:8000}") String pythonServerUrl,
                      @Value("${ai.timeout.connect:5000}") int connectTimeout,
                      @Value("${ai.timeout.read:30000}") int readTimeout) {
 
+        this.readTimeout = readTimeout;
+
         // HttpClient 타임아웃 설정
         HttpClient httpClient = HttpClient.create()
                 .responseTimeout(Duration.ofMillis(readTimeout));
@@ -140,6 +143,7 @@ public class AiService {
      * Python AI 서버 호출 공통 메서드
      * - Multipart 파일 전송
      * - Request ID 기반 추적
+     * - X-Request-Deadline: 응답 타임아웃 시각 전달 (Python 서버가 만료된 요청을 대기열에서 버림)
      * - 에러 핸들링
      */
     private <T> Mono<T> callPythonApi(String endpoint, MultipartFile file,
@@ -153,29 +157,33 @@ public class AiService {
                 }
             });
 
-            long startTime = System.currentTimeMillis();
-
-            return webClient.post()
-                    .uri(endpoint)
-                    .header("X-Request-ID", requestId)
-                    .contentType(MediaType.MULTIPART_FORM_DATA)
-                    .body(BodyInserters.fromMultipartData(builder.build()))
-                    .retrieve()
-                    .onStatus(status -> status.is4xxClientError(),
-                            response -> Mono.error(new RuntimeException(
-                                    "클라이언트 에러: " + response.statusCode())))
-                    .onStatus(status -> status.is5xxServerError(),
-                            response -> Mono.error(new RuntimeException(
-                                    "AI 서버 에러: " + response.statusCode())))
-                    .bodyToMono(responseType)
-                    .doOnSuccess(response -> {
-                        long elapsed = System.currentTimeMillis() - startTime;
-                        log.info("[{}] API 호출 완료 - endpoint: {}, 소요시간: {}ms",
-                                requestId, endpoint, elapsed);
-                    })
-                    .doOnError(WebClientResponseException.class, e ->
-                            log.error("[{}] API 호출 실패 - status: {}, body: {}",
-                                    requestId, e.getStatusCode(), e.getResponseBodyAsString()));
+            // Retry 재구독마다 새 마감 시각을 계산하도록 defer
+            return Mono.defer(() -> {
+                long startTime = System.currentTimeMillis();
+
+                return webClient.post()
+                        .uri(endpoint)
+                        .header("X-Request-ID", requestId)
+                        .header("X-Request-Deadline", String.valueOf(startTime + readTimeout))
+                        .contentType(MediaType.MULTIPART_FORM_DATA)
+                        .body(BodyInserters.fromMultipartData(builder.build()))
+                        .retrieve()
+                        .onStatus(status -> status.is4xxClientError(),
+                                response -> Mono.error(new RuntimeException(
+                                        "클라이언트 에러: " + response.statusCode())))
+                        .onStatus(status -> status.is5xxServerError(),
+                                response -> Mono.error(new RuntimeException(
+                                        "AI 서버 에러: " + response.statusCode())))
+                        .bodyToMono(responseType)
+                        .doOnSuccess(response -> {
+                            long elapsed = System.currentTimeMillis() - startTime;
+                            log.info("[{}] API 호출 완료 - endpoint: {}, 소요시간: {}ms",
+                                    requestId, endpoint, elapsed);
+                        })
+                        .doOnError(WebClientResponseException.class, e ->
+                                log.error("[{}] API 호출 실패 - status: {}, body: {}",
+                                        requestId, e.getStatusCode(), e.getResponseBodyAsString()));
+            });
 
         } catch (IOException e) {
             log.error("[{}] 파일 읽기 실패: {}", requestId, e.getMessage());